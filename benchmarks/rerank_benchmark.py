@@ -0,0 +1,55 @@
+"""
+LocalReranker latency vs. candidate count.
+
+Usage:
+    python -m benchmarks.rerank_benchmark --candidates 10 20 50 100 200 --dim 1536
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from src.services.reranker import LocalReranker
+
+WORDS = "billing invoice refund error card declined shipping order account password reset sku".split()
+
+def make_candidates(n: int, dim: int, rng: random.Random):
+    return [
+        {
+            "point_id": str(i),
+            "text": " ".join(rng.choice(WORDS) for _ in range(80)),
+            "vector": [rng.uniform(-1, 1) for _ in range(dim)],
+        } for i in range(n)
+    ]
+
+async def measure(n: int, dim: int, runs: int, top_k: int):
+    rng = random.Random(n)
+    documents = make_candidates(n, dim, rng)
+    query_vector = [rng.uniform(-1, 1) for _ in range(dim)]
+    cold, warm = [], []
+    for run in range(runs):
+        reranker = LocalReranker(cache_size=100_000)
+        query = f"card declined refund {run}"
+        started = time.perf_counter()
+        await reranker.rerank(query, documents, top_k=top_k, query_vector=query_vector)
+        cold.append((time.perf_counter() - started) * 1000)
+        started = time.perf_counter()
+        await reranker.rerank(query, documents, top_k=top_k, query_vector=query_vector)
+        warm.append((time.perf_counter() - started) * 1000)
+    return statistics.median(cold), statistics.median(warm)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--candidates", type=int, nargs="+", default=[10, 20, 50, 100, 200])
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--top-k", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'candidates':>10} {'cold p50 ms':>12} {'cached p50 ms':>14}")
+    for n in args.candidates:
+        cold, warm = asyncio.run(measure(n, args.dim, args.runs, args.top_k))
+        print(f"{n:>10} {cold:>12.3f} {warm:>14.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Recall vs. latency (and resident vector memory) per storage profile, against a running Qdrant.
+
+Usage:
+    docker run -p 6333:6333 qdrant/qdrant
+    python -m benchmarks.storage_profile_benchmark --url http://localhost:6333 --points 50000 \
+        --profiles default scalar_int8 binary on_disk high_recall
+
+Each profile gets its own throwaway collection (bench_<profile>), loaded with the same clustered
+synthetic embeddings. Recall@k is measured against exact (brute-force) cosine neighbours.
+Searches take the default two-stage path (prefix prefetch, full-vector rescore) unless
+--single-stage is given, and the RAM column counts every dense text vector a point stores.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+import numpy as np
+from src.core.config import settings
+from src.services.storage_profiles import get_storage_profile
+from src.services.tenant_router import TenantRouter
+from src.services.vector_store import VectorStore
+
+DIM = 1536
+TENANT = "bench"
+
+def make_vectors(n: int, clusters: int, rng: np.random.Generator) -> np.ndarray:
+    """Embedding-like data: points scattered around a few hundred topic centroids."""
+    centers = rng.normal(size=(clusters, DIM)).astype(np.float32)
+    data = centers[rng.integers(0, clusters, n)] + 0.6 * rng.normal(size=(n, DIM)).astype(np.float32)
+    return data / np.linalg.norm(data, axis=1, keepdims=True)
+
+async def wait_until_indexed(store: VectorStore, collection_name: str):
+    while True:
+        info = await store.client.get_collection(collection_name)
+        if info.status == "green":
+            return
+        await asyncio.sleep(0.5)
+
+async def bench_profile(
+    url: str, profile: str, data: np.ndarray, queries: np.ndarray, truth: np.ndarray, k: int, batch: int, two_stage: bool
+):
+    collection_name = f"bench_{profile}"
+    store = VectorStore(
+        url=url,
+        collection_name=collection_name,
+        hybrid=False,
+        router=TenantRouter(collection_name, local=True),
+        storage_profile=profile,
+        two_stage=two_stage
+    )
+    try:
+        await store.client.delete_collection(collection_name)
+        ids = [str(uuid.uuid4()) for _ in range(len(data))]
+        for start in range(0, len(data), batch):
+            rows = data[start:start + batch]
+            await store.upsert_batch(TENANT, rows.tolist(), [{"row": start + i} for i in range(len(rows))], ids[start:start + batch])
+        await wait_until_indexed(store, collection_name)
+
+        latencies, recalls = [], []
+        for query, expected in zip(queries, truth):
+            started = time.perf_counter()
+            hits = await store.search(TENANT, query.tolist(), limit=k, score_threshold=None)
+            latencies.append((time.perf_counter() - started) * 1000)
+            found = {hit["payload"]["row"] for hit in hits}
+            recalls.append(len(found & set(expected.tolist())) / k)
+        latencies.sort()
+        return {
+            "recall": statistics.mean(recalls),
+            "p50": latencies[len(latencies) // 2],
+            "p99": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))],
+            # Collections always store the prefix vector, whether or not this run searches on it
+            "ram_mb": get_storage_profile(profile).ram_bytes_per_point(DIM, settings.VECTOR_PREFIX_DIM)
+            * len(data) / (1024 * 1024),
+        }
+    finally:
+        await store.client.delete_collection(collection_name)
+        await store.close()
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://localhost:6333")
+    parser.add_argument("--points", type=int, default=50_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--clusters", type=int, default=256)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--batch", type=int, default=512)
+    parser.add_argument("--single-stage", action="store_true", help="search the full vector only")
+    parser.add_argument("--profiles", nargs="+", default=["default", "scalar_int8", "binary", "on_disk", "high_recall"])
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(7)
+    data = make_vectors(args.points + args.queries, args.clusters, rng)
+    data, queries = data[:args.points], data[args.points:]
+    truth = np.argsort(-(queries @ data.T), axis=1)[:, :args.k]
+
+    print(f"{'profile':>12} {'recall@' + str(args.k):>10} {'p50 ms':>8} {'p99 ms':>8} {'vector RAM MB':>14}")
+    for profile in args.profiles:
+        r = asyncio.run(bench_profile(args.url, profile, data, queries, truth, args.k, args.batch, not args.single_stage))
+        print(f"{profile:>12} {r['recall']:>10.3f} {r['p50']:>8.2f} {r['p99']:>8.2f} {r['ram_mb']:>14.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Two-stage search (prefix-vector prefetch + full-vector rescore) vs. a single full-dimension search.
+
+Usage:
+    docker run -p 6333:6333 qdrant/qdrant
+    python -m benchmarks.two_stage_benchmark --url http://localhost:6333 --points 100000 --multipliers 2 4 8
+
+The synthetic embeddings put most of their variance in the leading dimensions, as Matryoshka-trained
+models (e.g. text-embedding-3) do, so the prefix is a meaningful first-stage signal. Recall@k is
+measured against exact cosine neighbours; the last line reports the p99 gain of the cheapest
+multiplier whose recall is within --recall-tolerance of the single-stage search.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+import numpy as np
+from src.core.config import settings
+from src.services.tenant_router import TenantRouter
+from src.services.vector_store import VectorStore
+
+TENANT = "bench"
+COLLECTION = "bench_two_stage"
+
+def make_vectors(n: int, clusters: int, rng: np.random.Generator) -> np.ndarray:
+    dim = settings.EMBEDDING_DIM
+    decay = 1.0 / np.sqrt(1.0 + np.arange(dim) / 64.0)
+    centers = rng.normal(size=(clusters, dim)) * decay
+    data = centers[rng.integers(0, clusters, n)] + 0.5 * rng.normal(size=(n, dim)) * decay
+    data = data.astype(np.float32)
+    return data / np.linalg.norm(data, axis=1, keepdims=True)
+
+def make_store(url: str, two_stage: bool) -> VectorStore:
+    return VectorStore(
+        url=url,
+        collection_name=COLLECTION,
+        hybrid=False,
+        router=TenantRouter(COLLECTION, local=True),
+        two_stage=two_stage
+    )
+
+async def run_queries(store: VectorStore, queries: np.ndarray, truth: np.ndarray, k: int):
+    latencies, recalls = [], []
+    for query, expected in zip(queries, truth):
+        started = time.perf_counter()
+        hits = await store.search(TENANT, query.tolist(), limit=k, score_threshold=None)
+        latencies.append((time.perf_counter() - started) * 1000)
+        recalls.append(len({hit["payload"]["row"] for hit in hits} & set(expected.tolist())) / k)
+    latencies.sort()
+    return {
+        "recall": statistics.mean(recalls),
+        "p50": latencies[len(latencies) // 2],
+        "p99": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))],
+    }
+
+async def bench(args, data: np.ndarray, queries: np.ndarray, truth: np.ndarray):
+    loader = make_store(args.url, two_stage=True)
+    try:
+        await loader.client.delete_collection(COLLECTION)
+        ids = [str(uuid.uuid4()) for _ in range(len(data))]
+        for start in range(0, len(data), args.batch):
+            rows = data[start:start + args.batch]
+            await loader.upsert_batch(TENANT, rows.tolist(), [{"row": start + i} for i in range(len(rows))], ids[start:start + args.batch])
+        while (await loader.client.get_collection(COLLECTION)).status != "green":
+            await asyncio.sleep(0.5)
+
+        results = {"single-stage": await run_queries(make_store(args.url, two_stage=False), queries, truth, args.k)}
+        for multiplier in args.multipliers:
+            settings.TWO_STAGE_PREFETCH_MULTIPLIER = multiplier
+            results[f"two-stage x{multiplier}"] = await run_queries(make_store(args.url, two_stage=True), queries, truth, args.k)
+        return results
+    finally:
+        await loader.client.delete_collection(COLLECTION)
+        await loader.close()
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default="http://localhost:6333")
+    parser.add_argument("--points", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--clusters", type=int, default=256)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--batch", type=int, default=512)
+    parser.add_argument("--multipliers", type=int, nargs="+", default=[2, 4, 8])
+    parser.add_argument("--recall-tolerance", type=float, default=0.01)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(11)
+    data = make_vectors(args.points + args.queries, args.clusters, rng)
+    data, queries = data[:args.points], data[args.points:]
+    truth = np.argsort(-(queries @ data.T), axis=1)[:, :args.k]
+
+    results = asyncio.run(bench(args, data, queries, truth))
+    print(f"{'mode':>16} {'recall@' + str(args.k):>10} {'p50 ms':>8} {'p99 ms':>8}")
+    for mode, r in results.items():
+        print(f"{mode:>16} {r['recall']:>10.3f} {r['p50']:>8.2f} {r['p99']:>8.2f}")
+
+    baseline = results.pop("single-stage")
+    matching = [(mode, r) for mode, r in results.items() if r["recall"] >= baseline["recall"] - args.recall_tolerance]
+    if matching:
+        mode, r = matching[0]
+        print(f"p99 at equal recall: {baseline['p99']:.2f} -> {r['p99']:.2f} ms "
+              f"({(1 - r['p99'] / baseline['p99']) * 100:.1f}% lower, {mode})")
+    else:
+        print("No multiplier reached single-stage recall; try larger --multipliers")
+
+if __name__ == "__main__":
+    main()
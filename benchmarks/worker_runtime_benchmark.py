@@ -0,0 +1,100 @@
+"""
+Celery tasks/sec with a per-task event loop and engine vs. the persistent per-process WorkerRuntime.
+
+Usage:
+    python -m benchmarks.worker_runtime_benchmark --tasks 500
+    python -m benchmarks.worker_runtime_benchmark --broker redis://localhost:6379/0 --database-url postgresql+asyncpg://...
+
+Each task does what an ingestion job's status bookkeeping does: a few short DB round trips. "per-task"
+bridges the way the worker used to, with a new event loop per invocation (asyncio.run); pooled
+connections can't outlive their loop, so it needs an engine per task. "runtime" runs every task on the
+worker process's persistent loop and engine. Tasks go through a real broker and an in-process worker
+(memory:// by default, or --broker for a local Redis).
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from celery import Celery
+from celery.contrib.testing.worker import start_worker
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from src.core import database
+from src.worker.runtime import WorkerRuntime
+
+QUERIES_PER_TASK = 3
+
+def engine_options(url: str) -> dict:
+    # aiosqlite defaults to NullPool; give it a real pool so both modes pool connections
+    return {"poolclass": AsyncAdaptedQueuePool} if url.startswith("sqlite") else {}
+
+async def task_body(session_factory):
+    async with session_factory() as session:
+        for _ in range(QUERIES_PER_TASK):
+            await session.execute(text("SELECT 1"))
+
+def make_app(broker: str, url: str, runtime: WorkerRuntime) -> Celery:
+    app = Celery("worker_runtime_benchmark", broker=broker, backend="cache+memory://")
+    app.conf.update(task_acks_late=True, worker_prefetch_multiplier=1)
+
+    @app.task(name="bench.per_task")
+    def per_task():
+        async def body():
+            engine = create_async_engine(url, pool_size=50, max_overflow=100, **engine_options(url))
+            try:
+                await task_body(database.async_sessionmaker(bind=engine))
+            finally:
+                await engine.dispose()
+        asyncio.run(body())
+
+    @app.task(name="bench.runtime")
+    def with_runtime():
+        runtime.run(task_body(database.AsyncSessionLocal))
+
+    # What worker_process_init / worker_process_shutdown do, run in the worker's own thread
+    @app.task(name="bench.start")
+    def start_runtime():
+        runtime.start(url, **engine_options(url))
+
+    @app.task(name="bench.stop")
+    def stop_runtime():
+        runtime.shutdown()
+
+    return app
+
+def bench(app: Celery, name: str, tasks: int) -> float:
+    signature = app.signature(name)
+    signature.delay().get(timeout=30)  # warm-up
+    started = time.perf_counter()
+    results = [signature.delay() for _ in range(tasks)]
+    for result in results:
+        result.get(timeout=120)
+    return tasks / (time.perf_counter() - started)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--broker", default="memory://")
+    parser.add_argument("--database-url", default=None)
+    parser.add_argument("--tasks", type=int, default=300)
+    args = parser.parse_args()
+
+    url = args.database_url or f"sqlite+aiosqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    runtime = WorkerRuntime()
+    app = make_app(args.broker, url, runtime)
+
+    # Solo pool: the worker thread runs the tasks itself, so the runtime's loop lives in that thread
+    with start_worker(app, pool="solo", perform_ping_check=False, shutdown_timeout=30):
+        app.signature("bench.start").delay().get(timeout=30)
+        per_task = bench(app, "bench.per_task", args.tasks)
+        persistent = bench(app, "bench.runtime", args.tasks)
+        app.signature("bench.stop").delay().get(timeout=30)
+
+    print(f"{'mode':<10} {'tasks/s':>10}")
+    print(f"{'per-task':<10} {per_task:>10.1f}")
+    print(f"{'runtime':<10} {persistent:>10.1f}")
+    print(f"speedup: {persistent / per_task:.2f}x")
+
+if __name__ == "__main__":
+    main()
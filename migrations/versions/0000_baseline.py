@@ -0,0 +1,103 @@
+"""Baseline: the schema as it stood before migrations were introduced
+
+Revision ID: 0000
+Revises:
+Create Date: 2026-10-18
+
+Creates the tenants, ingestion_jobs, conversations, messages, evaluation_reports and audit_logs
+tables.
+Databases created before migrations existed already have them: each table is only created if it
+is missing, so `alembic upgrade head` brings both a fresh and an existing database up to date.
+(`alembic stamp 0000` followed by `alembic upgrade head` does the same for an existing one.)
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0000"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+TABLES = ["audit_logs", "messages", "conversations", "evaluation_reports", "ingestion_jobs", "tenants"]
+
+def _create_table(existing, name, *columns, indexes=()):
+    if name in existing:
+        return
+    op.create_table(name, *columns)
+    for column in indexes:
+        op.create_index(f"ix_{name}_{column}", name, [column])
+
+def upgrade():
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+    _create_table(
+        existing, "tenants",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        indexes=["id"],
+    )
+    _create_table(
+        existing, "ingestion_jobs",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("tenant_id", sa.String(), sa.ForeignKey("tenants.id"), nullable=False),
+        # SQLAlchemy stores enum members by name
+        sa.Column("status", sa.Enum("PENDING", "PROCESSING", "COMPLETED", "FAILED", name="jobstatus"), nullable=True),
+        sa.Column("media_type", sa.Enum("TEXT", "AUDIO", "IMAGE", "VIDEO", name="mediatype"), nullable=False),
+        sa.Column("file_path", sa.String(), nullable=False),
+        sa.Column("filename", sa.String(), nullable=False),
+        sa.Column("error_message", sa.Text(), nullable=True),
+        sa.Column("metadata_json", sa.JSON(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        indexes=["id", "tenant_id"],
+    )
+    _create_table(
+        existing, "conversations",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("tenant_id", sa.String(), nullable=False),
+        sa.Column("user_id", sa.String(), nullable=True),
+        sa.Column("title", sa.String(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+        indexes=["id", "tenant_id", "user_id"],
+    )
+    _create_table(
+        existing, "messages",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("conversation_id", sa.String(), sa.ForeignKey("conversations.id"), nullable=False),
+        sa.Column("role", sa.String(), nullable=False),
+        sa.Column("content", sa.Text(), nullable=False),
+        sa.Column("metadata_json", sa.JSON(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        indexes=["id", "conversation_id"],
+    )
+    _create_table(
+        existing, "evaluation_reports",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("tenant_id", sa.String(), nullable=False),
+        sa.Column("avg_faithfulness", sa.Float(), nullable=True),
+        sa.Column("avg_answer_relevance", sa.Float(), nullable=True),
+        sa.Column("avg_context_precision", sa.Float(), nullable=True),
+        sa.Column("report_json", sa.JSON(), nullable=True),
+        sa.Column("summary_md", sa.String(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        indexes=["id", "tenant_id"],
+    )
+    _create_table(
+        existing, "audit_logs",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("tenant_id", sa.String(), nullable=False),
+        sa.Column("action", sa.String(), nullable=False),
+        sa.Column("resource_id", sa.String(), nullable=True),
+        sa.Column("actor_id", sa.String(), nullable=True),
+        sa.Column("payload", sa.JSON(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        indexes=["id", "tenant_id"],
+    )
+
+def downgrade():
+    for name in TABLES:
+        op.drop_table(name)
+    if op.get_bind().dialect.name == "postgresql":
+        sa.Enum(name="jobstatus").drop(op.get_bind(), checkfirst=True)
+        sa.Enum(name="mediatype").drop(op.get_bind(), checkfirst=True)
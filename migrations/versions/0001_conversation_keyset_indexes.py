@@ -0,0 +1,36 @@
+"""Composite indexes for keyset pagination of conversations and messages
+
+Revision ID: 0001
+Revises: 0000
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0001"
+down_revision = "0000"
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ("ix_conversations_tenant_updated_id", "conversations", ["tenant_id", "updated_at", "id"]),
+    ("ix_messages_conversation_created_id", "messages", ["conversation_id", "created_at", "id"]),
+]
+
+def upgrade():
+    if op.get_bind().dialect.name == "postgresql":
+        # Built without locking writes on large tables; CONCURRENTLY can't run inside a transaction
+        with op.get_context().autocommit_block():
+            for name, table, columns in INDEXES:
+                op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True)
+    else:
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, if_not_exists=True)
+
+def downgrade():
+    if op.get_bind().dialect.name == "postgresql":
+        with op.get_context().autocommit_block():
+            for name, table, _ in INDEXES:
+                op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+    else:
+        for name, table, _ in INDEXES:
+            op.drop_index(name, table_name=table, if_exists=True)
@@ -0,0 +1,41 @@
+"""Ingestion batches: the ingestion_batches table and ingestion_jobs.batch_id
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.create_table(
+        "ingestion_batches",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("tenant_id", sa.String(), sa.ForeignKey("tenants.id"), nullable=False),
+        sa.Column("total_jobs", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("metadata_json", sa.JSON(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("finished_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_ingestion_batches_id", "ingestion_batches", ["id"])
+    op.create_index("ix_ingestion_batches_tenant_id", "ingestion_batches", ["tenant_id"])
+
+    # Nullable, no default: a metadata-only change on Postgres, existing jobs are left as they are
+    with op.batch_alter_table("ingestion_jobs") as batch:
+        batch.add_column(sa.Column("batch_id", sa.String(), nullable=True))
+        batch.create_foreign_key("fk_ingestion_jobs_batch_id", "ingestion_batches", ["batch_id"], ["id"])
+        batch.create_index("ix_ingestion_jobs_batch_id", ["batch_id"])
+
+def downgrade():
+    with op.batch_alter_table("ingestion_jobs") as batch:
+        batch.drop_index("ix_ingestion_jobs_batch_id")
+        batch.drop_constraint("fk_ingestion_jobs_batch_id", type_="foreignkey")
+        batch.drop_column("batch_id")
+    op.drop_index("ix_ingestion_batches_tenant_id", table_name="ingestion_batches")
+    op.drop_index("ix_ingestion_batches_id", table_name="ingestion_batches")
+    op.drop_table("ingestion_batches")
@@ -0,0 +1,26 @@
+"""ingestion_batches.done_jobs: jobs of the batch that reached a final state
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+def upgrade():
+    op.add_column("ingestion_batches", sa.Column("done_jobs", sa.Integer(), nullable=False, server_default="0"))
+    # Batches already under way start from what their jobs have reached so far
+    op.execute(
+        "UPDATE ingestion_batches SET done_jobs = ("
+        "SELECT COUNT(*) FROM ingestion_jobs WHERE ingestion_jobs.batch_id = ingestion_batches.id "
+        "AND ingestion_jobs.status IN ('COMPLETED', 'FAILED'))"
+    )
+
+def downgrade():
+    with op.batch_alter_table("ingestion_batches") as batch:
+        batch.drop_column("done_jobs")
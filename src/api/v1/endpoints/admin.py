@@ -4,7 +4,7 @@ from fastapi.security import HTTPBasic, HTTPBasicCredentials
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from typing import List
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from src.core.database import get_db
 from src.core.config import settings
 from src.models.ingestion import Tenant
@@ -22,6 +22,13 @@ class TenantRead(BaseModel):
     name: str
     created_at: str
 
+class VectorLayoutUpdate(BaseModel):
+    dedicated: bool
+
+class RetrievalSettings(BaseModel):
+    dense_weight: float = Field(default=settings.HYBRID_DENSE_WEIGHT, ge=0)
+    sparse_weight: float = Field(default=settings.HYBRID_SPARSE_WEIGHT, ge=0)
+
 def get_admin_user(credentials: HTTPBasicCredentials = Depends(security)):
     current_username_bytes = credentials.username.encode("utf8")
     correct_username_bytes = settings.ADMIN_USERNAME.encode("utf8")
@@ -87,3 +94,45 @@ async def delete_tenant(
     await db.delete(tenant)
     await db.commit()
     return {"status": "deleted", "tenant_id": tenant_id}
+
+@router.put("/tenants/{tenant_id}/retrieval")
+async def set_retrieval_settings(
+    tenant_id: str,
+    retrieval: RetrievalSettings,
+    admin_user: str = Depends(get_admin_user)
+):
+    """Set the tenant's hybrid retrieval fusion weights (dense vs. sparse/lexical)."""
+    from src.services.cache import semantic_cache
+    await semantic_cache.redis.hset(f"retrieval:{tenant_id}", mapping=retrieval.model_dump())
+    return {"tenant_id": tenant_id, **retrieval.model_dump()}
+
+@router.get("/tenants/{tenant_id}/vector-layout")
+async def get_vector_layout(
+    tenant_id: str,
+    admin_user: str = Depends(get_admin_user)
+):
+    """Show which collection(s) the tenant's vectors are read from and written to."""
+    from src.services.vector_store import vector_store
+    layout = await vector_store.router.get(tenant_id)
+    return {
+        "tenant_id": tenant_id,
+        "dedicated": layout["collection"] != vector_store.collection_name,
+        **layout
+    }
+
+@router.put("/tenants/{tenant_id}/vector-layout", status_code=status.HTTP_202_ACCEPTED)
+async def set_vector_layout(
+    tenant_id: str,
+    update: VectorLayoutUpdate,
+    admin_user: str = Depends(get_admin_user)
+):
+    """Move the tenant to its own collection (or back to the shared one). Runs online in the worker."""
+    from src.worker.tasks import move_tenant_layout
+    job = move_tenant_layout.delay(tenant_id, update.dedicated)
+    return {"tenant_id": tenant_id, "dedicated": update.dedicated, "task_id": job.id}
+
+@router.get("/ingestion/queues")
+async def get_ingestion_queues(admin_user: str = Depends(get_admin_user)):
+    """Per media-type queue: wait-time percentiles, broker depth, and each tenant's in-flight and backlogged jobs."""
+    from src.services.ingestion.scheduling import ingestion_scheduler
+    return await ingestion_scheduler.stats()
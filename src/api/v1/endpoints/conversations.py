@@ -1,38 +1,137 @@
-from fastapi import APIRouter, Depends, Header, HTTPException
+import json
+from typing import Any, List, Literal, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from typing import List
-from src.core.database import get_db
+from src.core.config import settings
+from src.core.database import AsyncSessionLocal, get_db
+from src.core.pagination import InvalidCursorError, decode_cursor, encode_cursor, keyset_after
 from src.models.chat import Conversation, Message
+from src.services.conversation_state import conversation_state
 
 router = APIRouter()
 
+def _page_size(limit: Optional[int]) -> int:
+    return min(limit or settings.PAGE_SIZE_DEFAULT, settings.PAGE_SIZE_MAX)
+
+def _keyset(stmt, timestamp_column, id_column, cursor, descending: bool):
+    """`stmt` restricted to the rows after `cursor`, in (timestamp, id) order."""
+    try:
+        after = keyset_after(timestamp_column, id_column, cursor, descending)
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if after is not None:
+        stmt = stmt.where(after)
+    order = (timestamp_column.desc(), id_column.desc()) if descending else (timestamp_column.asc(), id_column.asc())
+    return stmt.order_by(*order)
+
+def _pending_after(pending: List[Any], timestamp_key: str, cursor, descending: bool) -> List[Any]:
+    """Rows not written to the database yet (the hot tier's), after `cursor` in keyset order."""
+    if cursor:
+        try:
+            position = decode_cursor(cursor)
+        except InvalidCursorError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        pending = [
+            r for r in pending
+            if ((getattr(r, timestamp_key), r.id) < position if descending else (getattr(r, timestamp_key), r.id) > position)
+        ]
+    return sorted(pending, key=lambda r: (getattr(r, timestamp_key), r.id), reverse=descending)
+
+async def _page(
+    db: AsyncSession, stmt, timestamp_column, id_column, cursor, limit: int, descending: bool, pending: List[Any] = ()
+):
+    """
+    One keyset page of `stmt` (already filtered) plus the cursor for the next one. `pending` rows
+    (not written behind yet) are merged in; ids already in the database are taken from there.
+    """
+    stmt = _keyset(stmt, timestamp_column, id_column, cursor, descending)
+    # One extra row tells whether there is a next page
+    rows = (await db.execute(stmt.limit(limit + 1))).scalars().all()
+    if pending:
+        merged = {r.id: r for r in _pending_after(list(pending), timestamp_column.key, cursor, descending)}
+        merged.update((r.id, r) for r in rows)
+        key = lambda r: (getattr(r, timestamp_column.key), r.id)
+        rows = sorted(merged.values(), key=key, reverse=descending)[:limit + 1]
+    items, more = rows[:limit], len(rows) > limit
+    next_cursor = encode_cursor(getattr(items[-1], timestamp_column.key), items[-1].id) if more else None
+    return {"items": items, "next_cursor": next_cursor}
+
+def _ndjson(stmt, timestamp_column, id_column, cursor, descending: bool, pending: List[Any] = ()) -> StreamingResponse:
+    """
+    Streams every row from `cursor` on as NDJSON, read through a server-side cursor in batches, so
+    neither the query nor the response is held in memory. Uses its own session: the request's is
+    closed once the handler returns, before the body is streamed. `pending` rows (few, not written
+    behind yet) are merged into the stream in order.
+    """
+    stmt = _keyset(stmt, timestamp_column, id_column, cursor, descending).execution_options(yield_per=settings.STREAM_BATCH_SIZE)
+    pending = _pending_after(list(pending), timestamp_column.key, cursor, descending)
+    key = lambda r: (getattr(r, timestamp_column.key), r.id)
+
+    async def lines():
+        waiting = list(pending)
+        async with AsyncSessionLocal() as session:
+            result = await session.stream_scalars(stmt)
+            async for row in result:
+                while waiting and (key(waiting[0]) > key(row) if descending else key(waiting[0]) < key(row)):
+                    yield json.dumps(jsonable_encoder(waiting.pop(0))) + "\n"
+                if waiting and waiting[0].id == row.id:
+                    waiting.pop(0)
+                yield json.dumps(jsonable_encoder(row)) + "\n"
+        for row in waiting:
+            yield json.dumps(jsonable_encoder(row)) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
 @router.get("/")
 async def list_conversations(
     x_tenant_id: str = Header(..., alias="X-Tenant-ID"),
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(default=None, ge=1),
+    format: Literal["json", "ndjson"] = "json",
     db: AsyncSession = Depends(get_db)
 ):
-    """List all conversations for a tenant."""
-    stmt = select(Conversation).where(Conversation.tenant_id == x_tenant_id).order_by(Conversation.updated_at.desc())
-    result = await db.execute(stmt)
-    return result.scalars().all()
+    """
+    List a tenant's conversations, most recently active first, one page at a time.
+    Pass the returned `next_cursor` to get the next page. `format=ndjson` streams all of them instead.
+    """
+    # Conversations and turns still queued for write-behind go to the database first
+    await conversation_state.drain()
+    stmt = select(Conversation).where(Conversation.tenant_id == x_tenant_id)
+    if format == "ndjson":
+        return _ndjson(stmt, Conversation.updated_at, Conversation.id, cursor, descending=True)
+    return await _page(db, stmt, Conversation.updated_at, Conversation.id, cursor, _page_size(limit), descending=True)
 
 @router.get("/{conversation_id}/history")
 async def get_chat_history(
     conversation_id: str,
     x_tenant_id: str = Header(..., alias="X-Tenant-ID"),
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(default=None, ge=1),
+    order: Literal["asc", "desc"] = "asc",
+    format: Literal["json", "ndjson"] = "json",
     db: AsyncSession = Depends(get_db)
 ):
-    """Retrieve all messages in a conversation."""
-    # Ensure ownership
-    stmt = select(Conversation).where(Conversation.id == conversation_id, Conversation.tenant_id == x_tenant_id)
+    """
+    Retrieve the messages of a conversation one page at a time: oldest first, or newest first with
+    `order=desc`. Pass the returned `next_cursor` to continue. `format=ndjson` streams all of them instead.
+    """
+    # Ensure ownership; a new conversation may exist only in the hot tier so far
+    stmt = select(Conversation.id).where(Conversation.id == conversation_id, Conversation.tenant_id == x_tenant_id)
     result = await db.execute(stmt)
-    if not result.scalar_one_or_none():
+    hot = await conversation_state.get_meta(conversation_id)
+    if not result.scalar_one_or_none() and not (hot and hot["tenant_id"] == x_tenant_id):
         raise HTTPException(status_code=404, detail="Conversation not found")
+    # Its latest turns may not have been written behind yet
+    pending = await conversation_state.recent_messages(db, conversation_id) if hot else []
 
-    stmt = select(Message).where(Message.conversation_id == conversation_id).order_by(Message.created_at.asc())
-    result = await db.execute(stmt)
-    return result.scalars().all()
+    stmt = select(Message).where(Message.conversation_id == conversation_id)
+    descending = order == "desc"
+    if format == "ndjson":
+        return _ndjson(stmt, Message.created_at, Message.id, cursor, descending, pending)
+    return await _page(db, stmt, Message.created_at, Message.id, cursor, _page_size(limit), descending, pending)
 
 @router.delete("/{conversation_id}")
 async def delete_conversation(
@@ -44,6 +143,10 @@ async def delete_conversation(
     stmt = select(Conversation).where(Conversation.id == conversation_id, Conversation.tenant_id == x_tenant_id)
     result = await db.execute(stmt)
     conv = result.scalar_one_or_none()
+    # It may not have been written behind yet
+    hot = await conversation_state.get_meta(conversation_id)
+    if conv or (hot and hot["tenant_id"] == x_tenant_id):
+        await conversation_state.forget(conversation_id)
     
     if conv:
         await db.delete(conv)
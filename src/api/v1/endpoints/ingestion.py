@@ -1,8 +1,10 @@
+from typing import List, Optional
 from fastapi import APIRouter, Depends, UploadFile, File, Header, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from src.core.database import get_db
 from src.models.ingestion import MediaType
-from src.services.ingestion.service import ingestion_service
+from src.services.ingestion.service import BatchTooLargeError, ingestion_service
+from src.services.storage import UploadTooLargeError
 
 router = APIRouter()
 
@@ -16,13 +18,16 @@ async def upload_file(
     """
     Upload a file for ingestion. The file will be processed asynchronously based on its media type.
     """
-    job = await ingestion_service.create_job(
-        db=db,
-        tenant_id=x_tenant_id,
-        media_type=media_type,
-        file=file,
-        filename=file.filename
-    )
+    try:
+        job = await ingestion_service.create_job(
+            db=db,
+            tenant_id=x_tenant_id,
+            media_type=media_type,
+            file=file,
+            filename=file.filename
+        )
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
     
     return {
         "job_id": job.id,
@@ -30,3 +35,44 @@ async def upload_file(
         "media_type": job.media_type,
         "filename": job.filename
     }
+
+@router.post("/batches", status_code=202)
+async def upload_batch(
+    files: List[UploadFile] = File(...),
+    media_type: Optional[MediaType] = None,
+    x_tenant_id: str = Header(..., alias="X-Tenant-ID"),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Upload many files, or zip/tar archives of them, for ingestion in one request.
+    Without `media_type`, each file's type is inferred from its name.
+    Progress is aggregated under the returned batch ID.
+    """
+    try:
+        batch = await ingestion_service.create_batch(
+            db=db,
+            tenant_id=x_tenant_id,
+            files=files,
+            media_type=media_type
+        )
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except BatchTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+    return batch
+
+@router.get("/batches/{batch_id}")
+async def get_batch(
+    batch_id: str,
+    x_tenant_id: str = Header(..., alias="X-Tenant-ID"),
+    db: AsyncSession = Depends(get_db)
+):
+    """Aggregated progress of a bulk ingestion: job counts per status."""
+    progress = await ingestion_service.batch_progress(db, batch_id, tenant_id=x_tenant_id)
+    if progress is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    if progress["finished"] and progress["finished_at"] is None:
+        # Normally stamped by the batch's last job; settle it on read if that worker was lost
+        progress = await ingestion_service.finish_batch(db, batch_id)
+    return progress
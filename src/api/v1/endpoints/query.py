@@ -1,6 +1,9 @@
-from fastapi import APIRouter, Depends, Header
+from fastapi import APIRouter, Depends, Header, HTTPException
 from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.core.database import AsyncSessionLocal, get_db
 from src.services.rag_orchestrator import rag_orchestrator
+from src.services.conversation_state import conversation_state
 import json
 
 router = APIRouter()
@@ -15,23 +18,22 @@ async def chat(
 ):
     """
     Query the RAG system and get a response with context from the chat history.
+
+    Streams NDJSON events by default. With `stream=false` the response is a single JSON document:
+    {"answer", "references", "sources", "cached"}.
     """
-    import uuid
-    from src.models.chat import Conversation
-    from sqlalchemy import select
+    # Ensure conversation exists (served from the hot tier; a new one is written behind)
+    conv = await conversation_state.ensure(db, conversation_id, x_tenant_id, title=f"Chat {query[:20]}...")
+    if conv is None:
+        raise HTTPException(status_code=404, detail="Conversation not found")
 
-    # Ensure conversation exists
-    stmt = select(Conversation).where(Conversation.id == conversation_id, Conversation.tenant_id == x_tenant_id)
-    result = await db.execute(stmt)
-    conv = result.scalar_one_or_none()
-    
-    if not conv:
-        conv = Conversation(id=conversation_id, tenant_id=x_tenant_id, title=f"Chat {query[:20]}...")
-        db.add(conv)
-        await db.commit()
+    if not stream:
+        return await rag_orchestrator.answer(x_tenant_id, query, conversation_id, db)
 
     async def response_generator():
-        async for item in rag_orchestrator.query(x_tenant_id, query, conversation_id, db, stream=stream):
-            yield json.dumps(item) + "\n"
+        # Own session: the request's is closed once the handler returns, before the body is streamed
+        async with AsyncSessionLocal() as session:
+            async for item in rag_orchestrator.query(x_tenant_id, query, conversation_id, session, stream=True):
+                yield json.dumps(item) + "\n"
 
     return StreamingResponse(response_generator(), media_type="application/x-ndjson")
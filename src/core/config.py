@@ -17,9 +17,93 @@ class Settings(BaseSettings):
     REDIS_URL: str = "redis://redis:6379/0"
     CELERY_BROKER_URL: str = "redis://redis:6379/0"
     CELERY_RESULT_BACKEND: str = "redis://redis:6379/0"
+    WORKER_DB_POOL_SIZE: int = 5       # Per worker process; a process runs one task at a time
+    WORKER_DB_MAX_OVERFLOW: int = 5
+
+    # Retrieval
+    RETRIEVAL_CANDIDATE_LIMIT: int = 20       # First-stage candidates passed to the reranker
+    HYBRID_SEARCH_ENABLED: bool = True        # Dense + sparse (BM25-style) retrieval with RRF
+    HYBRID_RRF_K: int = 60
+    HYBRID_DENSE_WEIGHT: float = 1.0          # Defaults; overridable per tenant
+    HYBRID_SPARSE_WEIGHT: float = 1.0
+    SPARSE_BM25_K1: float = 1.2
+    SPARSE_BM25_B: float = 0.75
+    SPARSE_BM25_AVG_DOC_LEN: float = 80.0     # Approx. terms per chunk
+
+    # Reranking
+    RERANKER_PROVIDER: str = "local"          # "local" (CPU, no network) or "mock"
+    RERANK_LEXICAL_WEIGHT: float = 0.5
+    RERANK_EMBEDDING_WEIGHT: float = 0.5
+    RERANK_SCORE_CACHE_SIZE: int = 50_000     # (query hash, chunk id) -> score entries
+
+    # Pagination
+    PAGE_SIZE_DEFAULT: int = 50
+    PAGE_SIZE_MAX: int = 500
+    STREAM_BATCH_SIZE: int = 500  # rows fetched per round trip when streaming NDJSON
+
+    # Context Packing
+    CONTEXT_CANDIDATES: int = 10                # reranked chunks offered to the packer
+    CONTEXT_TOKEN_BUDGET: int = 2000            # prompt tokens for retrieved passages
+    CONTEXT_NEAR_DUPLICATE_DISTANCE: int = 3    # SimHash bits within which passages are duplicates
+
+    # Semantic Cache
+    SEMANTIC_CACHE_TTL: int = 3600                      # 1 hour
+    SEMANTIC_CACHE_THRESHOLD: float = 0.95              # Min cosine similarity for a hit
+    SEMANTIC_CACHE_NEAR_MISS_MARGIN: float = 0.05       # Scores this far below the threshold count as near-misses
+    SEMANTIC_CACHE_TENANT_MAX_BYTES: int = 16_777_216   # Per-tenant memory cap (16MB)
+    SEMANTIC_CACHE_EVICTION: str = "lru"                # "lru" or "lfu"
 
     # Qdrant
     QDRANT_URL: str = "http://qdrant:6333"
+    QDRANT_PREFER_GRPC: bool = False
+    QDRANT_GRPC_PORT: int = 6334
+    QDRANT_TIMEOUT: int = 10
+    QDRANT_MAX_CONNECTIONS: int = 100
+    QDRANT_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    # Storage profile for new collections: default | scalar_int8 | binary | on_disk | high_recall
+    QDRANT_STORAGE_PROFILE: str = "default"
+    # Optional search-time overrides of the profile's values
+    QDRANT_HNSW_EF: Optional[int] = None
+    QDRANT_QUANTIZATION_OVERSAMPLING: Optional[float] = None
+
+    # Vector Schema (named vectors per point)
+    EMBEDDING_DIM: int = 1536
+    VECTOR_PREFIX_DIM: int = 256  # Matryoshka prefix of the text embedding, used for prefetch
+    IMAGE_EMBEDDING_DIM: int = 512
+    TWO_STAGE_SEARCH_ENABLED: bool = True
+    TWO_STAGE_PREFETCH_MULTIPLIER: int = 4  # prefix candidates fetched per requested result
+
+    # Tenant Layout
+    TENANT_DEDICATED_MIN_POINTS: int = 1000000  # tenants this large move to their own collection
+    TENANT_LAYOUT_CACHE_TTL: int = 30  # seconds a process may act on a stale tenant layout
+    TENANT_MIGRATION_BATCH_SIZE: int = 1000
+
+    # Conversation Memory
+    CONVERSATION_HISTORY_TOKEN_BUDGET: int = 1500  # recent turns kept verbatim in the prompt
+    CONVERSATION_SUMMARY_TOKEN_BUDGET: int = 300   # rolling summary of the turns before them
+    CONVERSATION_HISTORY_MAX_MESSAGES: int = 50    # most recent messages considered for the window
+    CONVERSATION_SUMMARY_FOLD_MAX: int = 50        # messages folded into the summary per refresh
+    CONVERSATION_SUMMARY_TTL: int = 604_800        # cached summary lifetime (7 days)
+
+    # Conversation Hot State (Redis tier for active conversations, write-behind to the database)
+    CONVERSATION_STATE_TTL: int = 3600              # seconds after the last turn a conversation stays hot
+    CONVERSATION_FLUSH_BATCH_SIZE: int = 500        # rows written per commit
+    CONVERSATION_FLUSH_INTERVAL_MS: int = 200       # how long a flush waits for a burst to accumulate
+    CONVERSATION_FLUSH_CLAIM_IDLE_MS: int = 30_000  # unacknowledged writes of a dead process are taken over after this
+
+    # PII Scrubbing
+    PII_SCRUB_PROCESSES: int = 1                 # >1: process pool for large documents (non-daemon workers, e.g. --pool=threads)
+    PII_SCRUB_SEGMENT_SIZE: int = 20_000         # Sentence-aligned segment size (chars)
+    PII_SCRUB_PARALLEL_MIN_CHARS: int = 200_000  # Smaller texts are scrubbed in-process
+
+    # Ingestion Chunking & Indexing
+    INGEST_CHUNK_SIZE: int = 500
+    INGEST_CHUNK_OVERLAP: int = 50
+    INGEST_READ_WINDOW_SIZE: int = 1_048_576  # Characters read (and scrubbed) per window
+    INGEST_EMBED_BATCH_SIZE: int = 64     # Chunks per embed_batch call / bulk upsert
+    INGEST_EMBED_CONCURRENCY: int = 4     # Batches in flight per ingestion job
+    INGEST_DEDUP_ENABLED: bool = True     # Skip chunks that (nearly) duplicate already indexed ones
+    INGEST_DEDUP_MAX_DISTANCE: int = 3    # SimHash bits (of 64) within which chunks count as duplicates
 
     # API Keys
     OPENAI_API_KEY: str = "sk-..."
@@ -29,6 +113,18 @@ class Settings(BaseSettings):
     LLM_PROVIDER: str = "mock"
     EMBEDDING_PROVIDER: str = "mock"
 
+    # Embedding Cache
+    EMBEDDING_CACHE_ENABLED: bool = True
+    EMBEDDING_CACHE_LOCAL_SIZE: int = 10_000   # Entries kept in the in-process LRU
+    EMBEDDING_CACHE_TTL: int = 604_800         # Redis tier TTL (7 days)
+
+    # Audit Logging
+    AUDIT_LOG_MODE: str = "write_behind"     # "write_behind" or "sync"
+    AUDIT_LOG_QUEUE_SIZE: int = 10_000       # Bounded in-memory queue
+    AUDIT_LOG_BATCH_SIZE: int = 500          # Flush when this many rows are waiting...
+    AUDIT_LOG_FLUSH_INTERVAL_MS: int = 200   # ...or after this long
+    AUDIT_LOG_OVERFLOW: str = "block"        # "block", "sync" or "drop" when the queue is full
+
     # AWS & S3 (Optional, defaults to local)
     AWS_ACCESS_KEY_ID: Optional[str] = None
     AWS_SECRET_ACCESS_KEY: Optional[str] = None
@@ -36,6 +132,29 @@ class Settings(BaseSettings):
     S3_BUCKET_NAME: Optional[str] = None
     CLOUDFRONT_DOMAIN: Optional[str] = None
     STORAGE_TYPE: str = "local"  # "local" or "s3"
+    LOCAL_STORAGE_DIR: str = "storage"
+    S3_ENDPOINT_URL: Optional[str] = None  # S3-compatible endpoint (MinIO, LocalStack); None for AWS
+    S3_UPLOAD_CONCURRENCY: int = 4  # Multipart parts uploaded in parallel per file
+
+    # Ingestion Scheduling (one queue and worker pool per media type)
+    INGEST_QUEUE_PREFIX: str = "ingestion"  # queues are <prefix>.text, <prefix>.audio, ...
+    INGEST_TENANT_MAX_INFLIGHT: int = 4  # jobs per tenant per queue sent to the broker or running
+    INGEST_INFLIGHT_TTL: int = 21600  # seconds before an idle tenant's slot count resets (lost workers)
+    INGEST_WAIT_SAMPLE_SIZE: int = 1000  # recent jobs per queue behind the wait-time percentiles
+    INGEST_LARGE_TEXT_MIN_BYTES: int = 0  # text uploads this large go to <prefix>.text_large; 0 keeps them on .text
+
+    # Uploads
+    UPLOAD_PART_SIZE: int = 8 * 1024 * 1024  # Read / multipart part size (S3 minimum is 5 MiB)
+    UPLOAD_MAX_BYTES: int = 5 * 1024 * 1024 * 1024  # Per-file limit; 0 disables it
+    INGEST_BATCH_MAX_FILES: int = 10_000  # Files (or archive members) per bulk ingestion request
+    INGEST_BATCH_UPLOAD_CONCURRENCY: int = 8  # Files of a bulk request stored in parallel
+    INGEST_BATCH_MAX_BYTES: int = 50 * 1024 * 1024 * 1024  # Whole bulk request body; 0 disables it
+
+    # Source Downloads (worker)
+    DOWNLOAD_DIR: str = "downloads"  # Worker-local copies of URL sources, kept across retries to resume
+    DOWNLOAD_CHUNK_SIZE: int = 1024 * 1024  # Bytes streamed to disk per write
+    DOWNLOAD_TIMEOUT: float = 60.0  # Connect/read timeout (seconds)
+    DOWNLOAD_MAX_CONNECTIONS: int = 10  # Pooled keep-alive connections per worker process
 
     # Security
     SECRET_KEY: str = "secret"
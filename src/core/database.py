@@ -22,6 +22,17 @@ AsyncSessionLocal = async_sessionmaker(
 
 Base = declarative_base()
 
+def configure_engine(url: str = None, **pool_options):
+    """
+    Replaces the engine behind AsyncSessionLocal (e.g. a smaller pool for a worker process).
+    Sessions opened afterwards - including through modules that imported AsyncSessionLocal - use it.
+    """
+    global engine
+    options = {"pool_pre_ping": True, "echo": False, "pool_timeout": 30, "pool_recycle": 1800, **pool_options}
+    engine = create_async_engine(url or settings.DATABASE_URL, **options)
+    AsyncSessionLocal.configure(bind=engine)
+    return engine
+
 async def get_db():
     async with AsyncSessionLocal() as session:
         try:
@@ -0,0 +1,33 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Optional, Tuple
+from sqlalchemy import tuple_
+
+class InvalidCursorError(ValueError):
+    pass
+
+def encode_cursor(timestamp: datetime, row_id: str) -> str:
+    """Opaque cursor for the position just after (timestamp, row_id) in a keyset-ordered listing."""
+    raw = json.dumps([timestamp.isoformat(), row_id], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        timestamp, row_id = json.loads(raw)
+        return datetime.fromisoformat(timestamp), str(row_id)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursorError("Invalid pagination cursor") from e
+
+def keyset_after(timestamp_column, id_column, cursor: Optional[str], descending: bool) -> Optional[Any]:
+    """
+    WHERE clause for the rows after `cursor` in (timestamp, id) order. Together with a composite
+    index on (..., timestamp, id), each page is an index range scan: cost doesn't grow with the offset.
+    """
+    if not cursor:
+        return None
+    timestamp, row_id = decode_cursor(cursor)
+    # Row-value comparison: Postgres matches it to the composite index as a single range
+    key = tuple_(timestamp_column, id_column)
+    return key < tuple_(timestamp, row_id) if descending else key > tuple_(timestamp, row_id)
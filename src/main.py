@@ -1,6 +1,8 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from src.api.v1.router import api_v3_router
+from src.core.config import settings
 
 app = FastAPI(
     title="Multi-Modal RAG API",
@@ -20,6 +22,30 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Multipart overhead allowed on top of UPLOAD_MAX_BYTES when checking Content-Length
+UPLOAD_ENVELOPE_BYTES = 64 * 1024
+
+@app.middleware("http")
+async def limit_upload_size(request: Request, call_next):
+    """
+    Rejects uploads whose declared size is over the limit before the body is read at all.
+
+    Starlette spools a multipart body to a temporary file before the endpoint sees it, so the
+    declared size is the only check that runs before that happens. Multipart requests without a
+    Content-Length (chunked transfer encoding) are refused, as they could otherwise spool an
+    unbounded body.
+    """
+    limit = settings.UPLOAD_MAX_BYTES
+    if request.url.path.endswith("/ingest/batches"):
+        # Many files per request; each one is still held to UPLOAD_MAX_BYTES while it streams
+        limit = settings.INGEST_BATCH_MAX_BYTES
+    content_length = request.headers.get("content-length")
+    if limit and not content_length and request.headers.get("content-type", "").startswith("multipart/form-data"):
+        return JSONResponse(status_code=411, content={"detail": "Uploads must declare a Content-Length"})
+    if limit and content_length and content_length.isdigit() and int(content_length) > limit + UPLOAD_ENVELOPE_BYTES:
+        return JSONResponse(status_code=413, content={"detail": f"File exceeds the upload limit of {limit} bytes"})
+    return await call_next(request)
+
 @app.get("/api/health")
 async def health_check():
     return {
@@ -34,6 +60,17 @@ async def health_check():
 
 app.include_router(api_v3_router, prefix="/api/v1")
 
+@app.on_event("shutdown")
+async def shutdown():
+    from src.services.vector_store import vector_store
+    from src.services.audit_logger import audit_logger
+    from src.services.conversation_memory import conversation_memory
+    from src.services.conversation_state import conversation_state
+    await conversation_memory.close()
+    await conversation_state.close()
+    await audit_logger.close()
+    await vector_store.close()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
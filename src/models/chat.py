@@ -1,10 +1,14 @@
 from datetime import datetime
-from sqlalchemy import Column, String, DateTime, ForeignKey, Text, JSON
+from sqlalchemy import Column, String, DateTime, ForeignKey, Index, Text, JSON
 from sqlalchemy.orm import relationship
 from src.core.database import Base
 
 class Conversation(Base):
     __tablename__ = "conversations"
+    __table_args__ = (
+        # Keyset pagination of a tenant's conversations, most recently active first
+        Index("ix_conversations_tenant_updated_id", "tenant_id", "updated_at", "id"),
+    )
     
     id = Column(String, primary_key=True, index=True)
     tenant_id = Column(String, nullable=False, index=True)
@@ -18,6 +22,10 @@ class Conversation(Base):
 
 class Message(Base):
     __tablename__ = "messages"
+    __table_args__ = (
+        # Keyset pagination of a conversation's history (either direction) and recent-turn lookups
+        Index("ix_messages_conversation_created_id", "conversation_id", "created_at", "id"),
+    )
     
     id = Column(String, primary_key=True, index=True)
     conversation_id = Column(String, ForeignKey("conversations.id"), nullable=False, index=True)
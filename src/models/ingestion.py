@@ -1,7 +1,7 @@
 from datetime import datetime
 from enum import Enum
 from typing import Optional
-from sqlalchemy import Column, String, DateTime, Enum as SQLEnum, ForeignKey, Text, JSON
+from sqlalchemy import Column, Integer, String, DateTime, Enum as SQLEnum, ForeignKey, Text, JSON
 from sqlalchemy.orm import relationship
 from src.core.database import Base
 
@@ -26,11 +26,28 @@ class Tenant(Base):
     
     jobs = relationship("IngestionJob", back_populates="tenant")
 
+class IngestionBatch(Base):
+    """Many files (or an archive's members) submitted in one request; progress is aggregated over its jobs."""
+    __tablename__ = "ingestion_batches"
+
+    id = Column(String, primary_key=True, index=True)
+    tenant_id = Column(String, ForeignKey("tenants.id"), nullable=False, index=True)
+    total_jobs = Column(Integer, nullable=False, default=0)
+    # Jobs that reached a final state, counted atomically as they do (see IngestionService.count_finished_job)
+    done_jobs = Column(Integer, nullable=False, default=0, server_default="0")
+    metadata_json = Column(JSON, nullable=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True)
+
+    jobs = relationship("IngestionJob", back_populates="batch")
+
 class IngestionJob(Base):
     __tablename__ = "ingestion_jobs"
     
     id = Column(String, primary_key=True, index=True)
     tenant_id = Column(String, ForeignKey("tenants.id"), nullable=False, index=True)
+    batch_id = Column(String, ForeignKey("ingestion_batches.id"), nullable=True, index=True)
     status = Column(SQLEnum(JobStatus), default=JobStatus.PENDING)
     media_type = Column(SQLEnum(MediaType), nullable=False)
     
@@ -44,3 +61,4 @@ class IngestionJob(Base):
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     tenant = relationship("Tenant", back_populates="jobs")
+    batch = relationship("IngestionBatch", back_populates="jobs")
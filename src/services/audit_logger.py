@@ -1,6 +1,13 @@
+import asyncio
+import logging
+import uuid
 from datetime import datetime
-from sqlalchemy import Column, String, DateTime, JSON, Text
+from typing import List, Dict, Any, Optional
+from sqlalchemy import Column, String, DateTime, JSON, Text, insert
 from src.core.database import Base, AsyncSessionLocal
+from src.core.config import settings
+
+logger = logging.getLogger(__name__)
 
 class AuditLog(Base):
     __tablename__ = "audit_logs"
@@ -14,25 +21,140 @@ class AuditLog(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
 
 class AuditLogger:
-    @staticmethod
+    """
+    Audit log writer.
+
+    In "write_behind" mode (default) `log` only enqueues the row on a bounded in-memory queue;
+    a background flusher bulk-inserts rows once AUDIT_LOG_BATCH_SIZE rows are waiting or
+    AUDIT_LOG_FLUSH_INTERVAL_MS has passed. When the queue is full, AUDIT_LOG_OVERFLOW decides:
+    "block" waits for room, "sync" writes the row inline, "drop" discards it.
+    In "sync" mode every call commits its own insert, as before.
+    """
+
+    def __init__(
+        self,
+        mode: Optional[str] = None,
+        queue_size: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        flush_interval_ms: Optional[int] = None,
+        overflow: Optional[str] = None,
+        session_factory=None
+    ):
+        self.mode = mode or settings.AUDIT_LOG_MODE
+        self.queue_size = queue_size or settings.AUDIT_LOG_QUEUE_SIZE
+        self.batch_size = batch_size or settings.AUDIT_LOG_BATCH_SIZE
+        self.flush_interval = (flush_interval_ms or settings.AUDIT_LOG_FLUSH_INTERVAL_MS) / 1000
+        self.overflow = overflow or settings.AUDIT_LOG_OVERFLOW
+        self.session_factory = session_factory or AsyncSessionLocal
+        self.dropped = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._batch_ready: Optional[asyncio.Event] = None
+        self._flusher: Optional[asyncio.Task] = None
+        self._inflight: Optional[asyncio.Future] = None
+        self._pending: List[Dict[str, Any]] = []
+        self._loop = None
+
     async def log(
-        tenant_id: str, 
-        action: str, 
-        resource_id: str = None, 
-        actor_id: str = None, 
+        self,
+        tenant_id: str,
+        action: str,
+        resource_id: str = None,
+        actor_id: str = None,
         payload: dict = None
     ):
-        import uuid
-        async with AsyncSessionLocal() as session:
-            new_log = AuditLog(
-                id=str(uuid.uuid4()),
-                tenant_id=tenant_id,
-                action=action,
-                resource_id=resource_id,
-                actor_id=actor_id,
-                payload=payload
-            )
-            session.add(new_log)
+        row = {
+            "id": str(uuid.uuid4()),
+            "tenant_id": tenant_id,
+            "action": action,
+            "resource_id": resource_id,
+            "actor_id": actor_id,
+            "payload": payload,
+            # Stamp at log time, not at (deferred) insert time
+            "created_at": datetime.utcnow(),
+        }
+        if self.mode != "write_behind":
+            await self._insert([row])
+            return
+
+        self._ensure_flusher()
+        try:
+            self._queue.put_nowait(row)
+        except asyncio.QueueFull:
+            if self.overflow == "drop":
+                self.dropped += 1
+                logger.warning(f"Audit queue full, dropped '{action}' event for tenant {tenant_id}")
+                return
+            if self.overflow == "sync":
+                await self._insert([row])
+                return
+            await self._queue.put(row)
+        if self._queue.qsize() >= self.batch_size:
+            self._batch_ready.set()
+
+    def _ensure_flusher(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._flusher and not self._flusher.done():
+            return
+        if self._loop is not loop:
+            self._queue = asyncio.Queue(maxsize=self.queue_size)
+            self._batch_ready = asyncio.Event()
+            self._loop = loop
+        self._flusher = loop.create_task(self._run_flusher())
+
+    async def _run_flusher(self):
+        while True:
+            # Rows taken off the queue live in self._pending until written, so close() can't lose them
+            self._pending = [await self._queue.get()]
+            self._drain_into(self._pending)
+            if len(self._pending) < self.batch_size:
+                # Size trigger or time trigger, whichever comes first
+                try:
+                    await asyncio.wait_for(self._batch_ready.wait(), timeout=self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._drain_into(self._pending)
+            self._batch_ready.clear()
+            batch, self._pending = self._pending, []
+            self._inflight = asyncio.ensure_future(self._write(batch))
+            await asyncio.shield(self._inflight)
+
+    def _drain_into(self, batch: List[Dict[str, Any]]):
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+
+    async def _write(self, batch: List[Dict[str, Any]]):
+        try:
+            await self._insert(batch)
+        except Exception as e:
+            logger.error(f"Failed to flush {len(batch)} audit log rows: {e}")
+
+    async def _insert(self, rows: List[Dict[str, Any]]):
+        # executemany of a single INSERT: SQLAlchemy batches this into multi-row VALUES statements
+        async with self.session_factory() as session:
+            await session.execute(insert(AuditLog), rows)
             await session.commit()
 
+    async def close(self):
+        """Stops the flusher and writes everything still queued (call on shutdown)."""
+        if self._flusher and not self._flusher.done():
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+        self._flusher = None
+        if self._inflight is not None:
+            await self._inflight
+            self._inflight = None
+        batch, self._pending = self._pending, []
+        while self._queue is not None and not self._queue.empty():
+            self._drain_into(batch)
+            await self._write(batch)
+            batch = []
+        if batch:
+            await self._write(batch)
+
 audit_logger = AuditLogger()
@@ -1,26 +1,271 @@
+import hashlib
 import json
-from typing import Optional, Dict, Any
-import redis.asyncio as redis
+import time
+import uuid
+from typing import Optional, Dict, Any, List, Tuple
 from src.core.config import settings
 
+HIT = "hit"
+MISS = "miss"
+NEAR_MISS = "near_miss"
+# Expired entries removed per lookup / insert
+PRUNE_BATCH = 100
+
+def classify_score(score: Optional[float], threshold: float, near_miss_margin: float) -> str:
+    """Buckets the best similarity score of a lookup into hit / near-miss / miss."""
+    if score is None:
+        return MISS
+    if score >= threshold:
+        return HIT
+    if score >= threshold - near_miss_margin:
+        return NEAR_MISS
+    return MISS
+
+def query_hash(query_text: str) -> str:
+    return hashlib.sha256(" ".join(query_text.split()).encode("utf-8")).hexdigest()
+
 class SemanticCache:
-    def __init__(self):
-        self.redis = redis.from_url(settings.REDIS_URL, decode_responses=True)
-        self.ttl = 3600  # 1 hour
-
-    async def get(self, tenant_id: str, query_vector_hash: str) -> Optional[Dict[str, Any]]:
-        key = f"cache:{tenant_id}:{query_vector_hash}"
-        data = await self.redis.get(key)
-        if data:
-            return json.loads(data)
-        return None
-
-    async def set(self, tenant_id: str, query_vector_hash: str, response: Dict[str, Any]):
-        key = f"cache:{tenant_id}:{query_vector_hash}"
-        await self.redis.setex(
-            key,
-            self.ttl,
-            json.dumps(response)
-        )
+    """
+    Per-tenant answer cache keyed by query-embedding similarity.
+
+    Query vectors live in a dedicated Qdrant collection (filtered by tenant). Redis holds the cached
+    responses, an exact-match index on the normalized query text, the per-tenant byte accounting,
+    the LRU/LFU eviction order and hit/miss counters. `local=True` keeps all of that in memory
+    instead (single process, tests).
+
+    Only the responses and exact-match ids expire by TTL; an `expiry` sorted set tracks when, so
+    lookups and inserts prune the expired entries' sizes, LRU/LFU members and vectors, and they
+    don't count toward the byte cap.
+    """
+
+    def __init__(self, index=None, redis_client=None, local: bool = False):
+        self._redis = redis_client
+        self.local = local
+        self.ttl = settings.SEMANTIC_CACHE_TTL
+        self.threshold = settings.SEMANTIC_CACHE_THRESHOLD
+        self.near_miss_margin = settings.SEMANTIC_CACHE_NEAR_MISS_MARGIN
+        self.max_bytes = settings.SEMANTIC_CACHE_TENANT_MAX_BYTES
+        self.eviction = settings.SEMANTIC_CACHE_EVICTION
+        self._index = index
+        # Local mode: key -> (expires_at, value) for entries and exact-match ids, plus the
+        # per-tenant hashes (sizes, stats), sorted sets (lru, lfu) and byte counters
+        self._local_values: Dict[str, Tuple[float, str]] = {}
+        self._local_hashes: Dict[str, Dict[str, int]] = {}
+        self._local_zsets: Dict[str, Dict[str, float]] = {}
+        self._local_bytes: Dict[str, int] = {}
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            import redis.asyncio as redis
+            self._redis = redis.from_url(settings.REDIS_URL, decode_responses=True)
+        return self._redis
+
+    @property
+    def index(self):
+        if self._index is None:
+            from src.services.vector_store import VectorStore
+            # Query vectors only: no document payload indexes, image space or storage profile
+            self._index = VectorStore(collection_name="semantic_cache", plain=True)
+        return self._index
+
+    def _key(self, tenant_id: str, name: str) -> str:
+        return f"semcache:{tenant_id}:{name}"
+
+    async def _value(self, key: str) -> Optional[str]:
+        if not self.local:
+            return await self.redis.get(key)
+        value = self._local_values.get(key)
+        if value is None or value[0] <= time.monotonic():
+            self._local_values.pop(key, None)
+            return None
+        return value[1]
+
+    async def _count(self, tenant_id: str, outcome: str):
+        key = self._key(tenant_id, "stats")
+        if self.local:
+            counters = self._local_hashes.setdefault(key, {})
+            counters[outcome] = counters.get(outcome, 0) + 1
+        else:
+            await self.redis.hincrby(key, outcome, 1)
+
+    async def get_exact(self, tenant_id: str, query_text: str) -> Optional[Dict[str, Any]]:
+        """Cheap short-circuit: a byte-for-byte (whitespace-normalized) repeat needs no embedding."""
+        await self._prune_expired(tenant_id)
+        entry_id = await self._value(self._key(tenant_id, f"exact:{query_hash(query_text)}"))
+        if not entry_id:
+            return None
+        response = await self._touch(tenant_id, entry_id)
+        if response is not None:
+            await self._count(tenant_id, HIT)
+        return response
+
+    async def get(self, tenant_id: str, query_vector: List[float]) -> Optional[Dict[str, Any]]:
+        await self._prune_expired(tenant_id)
+        floor = self.threshold - self.near_miss_margin
+        hits = await self.index.search(tenant_id, query_vector, limit=1, score_threshold=floor)
+        best = hits[0] if hits else None
+
+        outcome = classify_score(best["score"] if best else None, self.threshold, self.near_miss_margin)
+        response = None
+        if outcome == HIT:
+            response = await self._touch(tenant_id, str(best["id"]))
+            if response is None:
+                # Response expired out of Redis; drop the orphaned vector
+                await self._remove(tenant_id, [str(best["id"])])
+                outcome = MISS
+        await self._count(tenant_id, outcome)
+        return response
+
+    async def _touch(self, tenant_id: str, entry_id: str) -> Optional[Dict[str, Any]]:
+        """Loads an entry and records the access for LRU/LFU."""
+        data = await self._value(self._key(tenant_id, f"entry:{entry_id}"))
+        if data is None:
+            return None
+        if self.local:
+            self._local_zsets.setdefault(self._key(tenant_id, "lru"), {})[entry_id] = time.time()
+            lfu = self._local_zsets.setdefault(self._key(tenant_id, "lfu"), {})
+            lfu[entry_id] = lfu.get(entry_id, 0) + 1
+        else:
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.zadd(self._key(tenant_id, "lru"), {entry_id: time.time()})
+            pipe.zincrby(self._key(tenant_id, "lfu"), 1, entry_id)
+            await pipe.execute()
+        return json.loads(data)["response"]
+
+    async def set(
+        self,
+        tenant_id: str,
+        query_text: str,
+        query_vector: List[float],
+        response: Dict[str, Any]
+    ):
+        """Stores a complete response (answer, references, ...) under the query's embedding."""
+        entry_id = str(uuid.uuid4())
+        qhash = query_hash(query_text)
+        encoded = json.dumps({"query_hash": qhash, "response": response})
+        # Approximate footprint: float32 vector + serialized entry
+        size = len(query_vector) * 4 + len(encoded)
+
+        if size > self.max_bytes:
+            return
+        await self._prune_expired(tenant_id)
+        await self.index.upsert(tenant_id, query_vector, {"query": query_text}, point_id=entry_id)
+        if self.local:
+            expires_at = time.monotonic() + self.ttl
+            self._local_values[self._key(tenant_id, f"entry:{entry_id}")] = (expires_at, encoded)
+            self._local_values[self._key(tenant_id, f"exact:{qhash}")] = (expires_at, entry_id)
+            self._local_hashes.setdefault(self._key(tenant_id, "sizes"), {})[entry_id] = size
+            bytes_key = self._key(tenant_id, "bytes")
+            used = self._local_bytes[bytes_key] = self._local_bytes.get(bytes_key, 0) + size
+            self._local_zsets.setdefault(self._key(tenant_id, "lru"), {})[entry_id] = time.time()
+            self._local_zsets.setdefault(self._key(tenant_id, "lfu"), {})[entry_id] = 0
+            self._local_zsets.setdefault(self._key(tenant_id, "expiry"), {})[entry_id] = expires_at
+        else:
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.setex(self._key(tenant_id, f"entry:{entry_id}"), self.ttl, encoded)
+            pipe.setex(self._key(tenant_id, f"exact:{qhash}"), self.ttl, entry_id)
+            pipe.hset(self._key(tenant_id, "sizes"), entry_id, size)
+            pipe.incrby(self._key(tenant_id, "bytes"), size)
+            pipe.zadd(self._key(tenant_id, "lru"), {entry_id: time.time()})
+            pipe.zadd(self._key(tenant_id, "lfu"), {entry_id: 0})
+            pipe.zadd(self._key(tenant_id, "expiry"), {entry_id: time.time() + self.ttl})
+            used = int((await pipe.execute())[3])
+        await self._evict(tenant_id, used, keep=entry_id)
+
+    async def _prune_expired(self, tenant_id: str):
+        """Removes up to PRUNE_BATCH entries whose response has expired."""
+        key = self._key(tenant_id, "expiry")
+        if self.local:
+            expiry = self._local_zsets.get(key, {})
+            now = time.monotonic()
+            expired = sorted((m for m, at in expiry.items() if at <= now), key=expiry.get)[:PRUNE_BATCH]
+        else:
+            expired = await self.redis.zrangebyscore(key, "-inf", time.time(), start=0, num=PRUNE_BATCH)
+        if expired:
+            await self._remove(tenant_id, expired)
+
+    async def _evict(self, tenant_id: str, used_bytes: int, keep: Optional[str] = None):
+        """Drops least recently (LRU) or least frequently (LFU) used entries until under the cap."""
+        order_key = self._key(tenant_id, "lfu" if self.eviction == "lfu" else "lru")
+        victims = []
+        offset = 0
+        while used_bytes > self.max_bytes:
+            # Oldest / coldest first; fetch in small pages to avoid re-reading the whole set
+            if self.local:
+                # Same order as ZRANGE: by score, ties by member
+                order = self._local_zsets.get(order_key, {})
+                candidates = sorted(order, key=lambda m: (order[m], m))[offset:offset + 16]
+                local_sizes = self._local_hashes.get(self._key(tenant_id, "sizes"), {})
+                sizes = [local_sizes.get(c) for c in candidates]
+            else:
+                candidates = await self.redis.zrange(order_key, offset, offset + 15)
+                sizes = await self.redis.hmget(self._key(tenant_id, "sizes"), candidates) if candidates else []
+            if not candidates:
+                break
+            offset += len(candidates)
+            for entry_id, entry_size in zip(candidates, sizes):
+                if entry_id == keep:
+                    # Never evict the entry being inserted (LFU would rank it coldest)
+                    continue
+                victims.append(entry_id)
+                used_bytes -= int(entry_size or 0)
+                if used_bytes <= self.max_bytes:
+                    break
+        if victims:
+            await self._remove(tenant_id, victims)
+
+    async def _remove(self, tenant_id: str, entry_ids: List[str]):
+        if self.local:
+            self._remove_local(tenant_id, entry_ids)
+            await self.index.delete(tenant_id, entry_ids)
+            return
+        # Reading and dropping the sizes in one transaction claims the entries: if several processes
+        # prune or evict the same ones, only one of them subtracts their bytes
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.hmget(self._key(tenant_id, "sizes"), entry_ids)
+        pipe.hdel(self._key(tenant_id, "sizes"), *entry_ids)
+        sizes, _ = await pipe.execute()
+        entries = await self.redis.mget([self._key(tenant_id, f"entry:{i}") for i in entry_ids])
+        freed = sum(int(s or 0) for s in sizes)
+        pipe = self.redis.pipeline(transaction=False)
+        for entry_id, data in zip(entry_ids, entries):
+            pipe.delete(self._key(tenant_id, f"entry:{entry_id}"))
+            if data:
+                pipe.delete(self._key(tenant_id, f"exact:{json.loads(data)['query_hash']}"))
+        pipe.zrem(self._key(tenant_id, "lru"), *entry_ids)
+        pipe.zrem(self._key(tenant_id, "lfu"), *entry_ids)
+        pipe.zrem(self._key(tenant_id, "expiry"), *entry_ids)
+        pipe.decrby(self._key(tenant_id, "bytes"), freed)
+        await pipe.execute()
+        await self.index.delete(tenant_id, entry_ids)
+
+    def _remove_local(self, tenant_id: str, entry_ids: List[str]):
+        sizes = self._local_hashes.get(self._key(tenant_id, "sizes"), {})
+        freed = 0
+        for entry_id in entry_ids:
+            entry = self._local_values.pop(self._key(tenant_id, f"entry:{entry_id}"), None)
+            if entry:
+                self._local_values.pop(self._key(tenant_id, f"exact:{json.loads(entry[1])['query_hash']}"), None)
+            freed += sizes.pop(entry_id, 0)
+            for order in ("lru", "lfu", "expiry"):
+                self._local_zsets.get(self._key(tenant_id, order), {}).pop(entry_id, None)
+        bytes_key = self._key(tenant_id, "bytes")
+        self._local_bytes[bytes_key] = self._local_bytes.get(bytes_key, 0) - freed
+
+    async def stats(self, tenant_id: str) -> Dict[str, int]:
+        """Hit / miss / near-miss counters and current byte usage for a tenant."""
+        if self.local:
+            counters = self._local_hashes.get(self._key(tenant_id, "stats"), {})
+            used = self._local_bytes.get(self._key(tenant_id, "bytes"))
+        else:
+            counters = await self.redis.hgetall(self._key(tenant_id, "stats"))
+            used = await self.redis.get(self._key(tenant_id, "bytes"))
+        return {
+            HIT: int(counters.get(HIT, 0)),
+            MISS: int(counters.get(MISS, 0)),
+            NEAR_MISS: int(counters.get(NEAR_MISS, 0)),
+            "bytes": int(used or 0),
+        }
 
 semantic_cache = SemanticCache()
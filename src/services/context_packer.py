@@ -0,0 +1,111 @@
+from typing import Any, Dict, List, Optional
+from src.core.config import settings
+from src.services.ingestion.dedup import hamming, simhash
+from src.services.tokens import estimate_tokens, truncate_to_tokens
+
+def merge_overlapping(left: str, right: str, max_overlap: int) -> str:
+    """`left` followed by `right`, without the text they share at the seam (chunks overlap by design)."""
+    if right in left:
+        return left
+    for k in range(min(len(left), len(right), max_overlap), 0, -1):
+        if left.endswith(right[:k]):
+            return left + right[k:]
+    return f"{left} {right}"
+
+class ContextPacker:
+    """
+    Turns reranked chunks (best first) into the passages a prompt cites.
+
+    1. Chunks of the same document with consecutive chunk_index are merged into one passage, and
+       the INGEST_CHUNK_OVERLAP characters they share are dropped. A passage ranks as its best chunk.
+    2. Passages within CONTEXT_NEAR_DUPLICATE_DISTANCE SimHash bits of a better-ranked one (the same
+       text in another file, a re-upload) are dropped.
+    3. Passages are taken best first while they fit CONTEXT_TOKEN_BUDGET; ones that don't fit are
+       skipped in favour of smaller ones further down. If even the best one is too large, it is
+       truncated to the budget.
+
+    The result is in citation order: passage i is cited as [i + 1] in the prompt and in the references.
+    """
+
+    def __init__(
+        self,
+        budget: Optional[int] = None,
+        max_overlap: Optional[int] = None,
+        near_duplicate_distance: Optional[int] = None
+    ):
+        self.budget = budget or settings.CONTEXT_TOKEN_BUDGET
+        # Chunk overlap plus slack for the whitespace chunking may have shifted
+        self.max_overlap = max_overlap or settings.INGEST_CHUNK_OVERLAP * 2
+        self.near_duplicate_distance = (
+            settings.CONTEXT_NEAR_DUPLICATE_DISTANCE if near_duplicate_distance is None else near_duplicate_distance
+        )
+
+    @staticmethod
+    def _source(doc: Dict[str, Any]) -> Any:
+        metadata = doc.get("metadata") or {}
+        return doc.get("document_id") or metadata.get("file_url") or metadata.get("filename")
+
+    def _merge_adjacent(self, docs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        passages = []
+        by_source: Dict[Any, List[Dict[str, Any]]] = {}
+        for rank, doc in enumerate(docs):
+            index = (doc.get("metadata") or {}).get("chunk_index")
+            source = self._source(doc)
+            entry = {**doc, "rank": rank, "chunk_indices": [index] if index is not None else []}
+            if source is None or index is None:
+                passages.append(entry)
+            else:
+                by_source.setdefault(source, []).append(entry)
+
+        for chunks in by_source.values():
+            chunks.sort(key=lambda c: c["chunk_indices"][0])
+            current = chunks[0]
+            for chunk in chunks[1:]:
+                last = current["chunk_indices"][-1]
+                index = chunk["chunk_indices"][0]
+                if index == last:
+                    current["rank"] = min(current["rank"], chunk["rank"])
+                elif index == last + 1:
+                    current = {
+                        **current,
+                        "text": merge_overlapping(current.get("text", ""), chunk.get("text", ""), self.max_overlap),
+                        "rank": min(current["rank"], chunk["rank"]),
+                        "chunk_indices": current["chunk_indices"] + [index],
+                    }
+                else:
+                    passages.append(current)
+                    current = chunk
+            passages.append(current)
+        return sorted(passages, key=lambda p: p["rank"])
+
+    def _drop_near_duplicates(self, passages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        kept, hashes = [], []
+        for passage in passages:
+            text = passage.get("text", "")
+            value = simhash(text)
+            if any(text in other.get("text", "") for other in kept):
+                continue
+            if any(hamming(value, other) <= self.near_duplicate_distance for other in hashes):
+                continue
+            kept.append(passage)
+            hashes.append(value)
+        return kept
+
+    def pack(self, docs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Passages to put in the prompt, in citation order. Each keeps its chunks' payload plus `chunk_indices`."""
+        passages = self._drop_near_duplicates(self._merge_adjacent(docs))
+        packed, remaining = [], self.budget
+        for passage in passages:
+            tokens = estimate_tokens(passage.get("text", ""))
+            if tokens <= remaining:
+                packed.append(passage)
+                remaining -= tokens
+            elif not packed:
+                packed.append({**passage, "text": truncate_to_tokens(passage.get("text", ""), remaining)})
+                remaining = 0
+        for passage in packed:
+            passage.pop("rank", None)
+            passage.pop("vector", None)
+        return packed
+
+context_packer = ContextPacker()
@@ -0,0 +1,222 @@
+import asyncio
+import json
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from sqlalchemy import and_, or_, select
+from src.core.config import settings
+from src.core.database import AsyncSessionLocal
+from src.models.chat import Message
+from src.services.conversation_state import conversation_state
+from src.services.tokens import estimate_tokens, truncate_to_tokens
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_SYSTEM_PROMPT = (
+    "You maintain a running summary of a conversation between a user and an assistant. "
+    "Merge the new turns into the existing summary. Keep facts, decisions, names, numbers and open "
+    "questions the user may refer back to; drop pleasantries. Reply with the updated summary only."
+)
+
+class MemoryContext:
+    """What a prompt carries of the conversation so far: a summary of older turns plus recent turns verbatim."""
+
+    def __init__(self, summary: str, turns: List[Any]):
+        self.summary = summary
+        self.turns = turns
+
+    @property
+    def tokens(self) -> int:
+        return estimate_tokens(self.summary) + sum(estimate_tokens(m.content) for m in self.turns)
+
+    def format_turns(self) -> str:
+        return "\n".join(f"{m.role}: {m.content}" for m in self.turns)
+
+class ConversationMemory:
+    """
+    Token-budgeted conversation history.
+
+    `load` returns the most recent turns that fit CONVERSATION_HISTORY_TOKEN_BUDGET, newest first
+    until the budget is spent, plus a rolling summary of the turns before them. The summary is
+    capped at CONVERSATION_SUMMARY_TOKEN_BUDGET. Prompt size therefore stays flat however long the
+    conversation gets.
+
+    The summary is updated incrementally after each turn in the background (`schedule_refresh`).
+    Turns that have fallen out of the recent window are folded into it with one LLM call. The result
+    is cached per conversation in Redis, with a watermark of the last folded message. Each turn
+    only folds what is new since then.
+
+    With a hot `state` tier (ConversationState), `load` reads recent turns from it rather than the
+    database, and `refresh` merges them into what it reads from the database, so turns not yet
+    written behind are folded on time.
+    """
+
+    def __init__(
+        self,
+        llm=None,
+        redis_client=None,
+        session_factory=None,
+        history_budget: Optional[int] = None,
+        summary_budget: Optional[int] = None,
+        state=None,
+        local: bool = False
+    ):
+        self._llm = llm
+        self._redis = redis_client
+        self.session_factory = session_factory or AsyncSessionLocal
+        self.history_budget = history_budget or settings.CONVERSATION_HISTORY_TOKEN_BUDGET
+        self.summary_budget = summary_budget or settings.CONVERSATION_SUMMARY_TOKEN_BUDGET
+        self.state = state
+        self.local = local
+        self._local_cache: Dict[str, str] = {}
+        self._refreshing: Dict[str, asyncio.Task] = {}
+
+    @property
+    def llm(self):
+        if self._llm is None:
+            from src.services.factory import LLMFactory
+            import src.services.providers  # noqa: F401 (registers providers)
+            self._llm = LLMFactory.get_provider()
+        return self._llm
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            import redis.asyncio as redis
+            self._redis = redis.from_url(settings.REDIS_URL, decode_responses=True)
+        return self._redis
+
+    @staticmethod
+    def _key(conversation_id: str) -> str:
+        return f"conversation_summary:{conversation_id}"
+
+    async def get_summary(self, conversation_id: str) -> Dict[str, Any]:
+        """The cached summary state: {"summary", "through_at", "through_id"} (empty when nothing is folded yet)."""
+        if self.local:
+            raw = self._local_cache.get(conversation_id)
+        else:
+            raw = await self.redis.get(self._key(conversation_id))
+        return json.loads(raw) if raw else {"summary": "", "through_at": None, "through_id": None}
+
+    async def _set_summary(self, conversation_id: str, state: Dict[str, Any]):
+        raw = json.dumps(state)
+        if self.local:
+            self._local_cache[conversation_id] = raw
+        else:
+            await self.redis.set(self._key(conversation_id), raw, ex=settings.CONVERSATION_SUMMARY_TTL)
+
+    @staticmethod
+    def _is_after(message, state: Dict[str, Any]) -> bool:
+        """`_after` for a message already in memory."""
+        if not state.get("through_at"):
+            return True
+        return (message.created_at, message.id) > (datetime.fromisoformat(state["through_at"]), state["through_id"])
+
+    @staticmethod
+    def _after(state: Dict[str, Any]):
+        """Condition for messages newer than the summary's watermark."""
+        if not state.get("through_at"):
+            return None
+        through_at = datetime.fromisoformat(state["through_at"])
+        return or_(
+            Message.created_at > through_at,
+            and_(Message.created_at == through_at, Message.id > state["through_id"])
+        )
+
+    async def _unsummarized(self, db, conversation_id: str, state: Dict[str, Any], limit: int) -> List[Any]:
+        """Up to `limit` most recent messages the summary doesn't cover yet, oldest first."""
+        stmt = select(Message).where(Message.conversation_id == conversation_id)
+        after = self._after(state)
+        if after is not None:
+            stmt = stmt.where(after)
+        stmt = stmt.order_by(Message.created_at.desc(), Message.id.desc()).limit(limit)
+        return list(reversed((await db.execute(stmt)).scalars().all()))
+
+    def _window(self, messages: List[Any], budget: int) -> int:
+        """Index into `messages` (oldest first) where the recent window that fits `budget` starts."""
+        used = 0
+        start = len(messages)
+        for i in range(len(messages) - 1, -1, -1):
+            used += estimate_tokens(messages[i].content)
+            if used > budget:
+                break
+            start = i
+        return start
+
+    async def load(self, db, conversation_id: str) -> MemoryContext:
+        """Summary plus the most recent turns, within the token budgets. Database reads use the caller's session."""
+        state = await self.get_summary(conversation_id)
+        summary = truncate_to_tokens(state["summary"], self.summary_budget)
+        if self.state is not None:
+            recent = await self.state.recent_messages(db, conversation_id)
+            messages = [m for m in recent if self._is_after(m, state)]
+        else:
+            messages = await self._unsummarized(db, conversation_id, state, settings.CONVERSATION_HISTORY_MAX_MESSAGES)
+        start = self._window(messages, self.history_budget)
+        turns = messages[start:]
+        if not turns and messages:
+            # A single oversized latest message: keep its beginning rather than nothing
+            latest = messages[-1]
+            turns = [Message(
+                id=latest.id, conversation_id=latest.conversation_id, role=latest.role,
+                content=truncate_to_tokens(latest.content, self.history_budget), created_at=latest.created_at
+            )]
+        return MemoryContext(summary, turns)
+
+    async def refresh(self, conversation_id: str) -> Dict[str, Any]:
+        """Folds turns that have left the recent window into the summary. Returns the new summary state."""
+        state = await self.get_summary(conversation_id)
+        limit = settings.CONVERSATION_HISTORY_MAX_MESSAGES + settings.CONVERSATION_SUMMARY_FOLD_MAX
+        async with self.session_factory() as db:
+            messages = await self._unsummarized(db, conversation_id, state, limit)
+            if self.state is not None:
+                # The newest turns may not have been written behind yet
+                recent = await self.state.recent_messages(db, conversation_id)
+                merged = {m.id: m for m in messages}
+                merged.update((m.id, m) for m in recent if self._is_after(m, state))
+                messages = sorted(merged.values(), key=lambda m: (m.created_at, m.id))[-limit:]
+        # Keep the window `load` would use verbatim; everything before it gets folded
+        fold = messages[:self._window(messages, self.history_budget)]
+        fold = fold[:settings.CONVERSATION_SUMMARY_FOLD_MAX]
+        if not fold:
+            return state
+
+        turns = "\n".join(f"{m.role}: {m.content}" for m in fold)
+        prompt = (
+            f"Existing summary:\n{state['summary'] or '(none)'}\n\n"
+            f"New turns:\n{turns}\n\n"
+            f"Updated summary (at most about {self.summary_budget} tokens):"
+        )
+        summary = await self.llm.generate(prompt, system_prompt=SUMMARY_SYSTEM_PROMPT)
+        state = {
+            "summary": truncate_to_tokens(summary.strip(), self.summary_budget),
+            "through_at": fold[-1].created_at.isoformat(),
+            "through_id": fold[-1].id,
+        }
+        await self._set_summary(conversation_id, state)
+        logger.info(f"Folded {len(fold)} messages into the summary of conversation {conversation_id}")
+        return state
+
+    def schedule_refresh(self, conversation_id: str) -> Optional[asyncio.Task]:
+        """Starts `refresh` in the background, unless one is already running for the conversation."""
+        running = self._refreshing.get(conversation_id)
+        if running is not None and not running.done():
+            return None
+        task = asyncio.create_task(self._refresh_quietly(conversation_id))
+        self._refreshing[conversation_id] = task
+        task.add_done_callback(lambda _: self._refreshing.pop(conversation_id, None))
+        return task
+
+    async def _refresh_quietly(self, conversation_id: str):
+        try:
+            await self.refresh(conversation_id)
+        except Exception as e:
+            # The recent window still bounds the prompt; the next turn retries the fold
+            logger.warning(f"Summary refresh failed for conversation {conversation_id}: {e}")
+
+    async def close(self):
+        """Waits for background refreshes (call on shutdown)."""
+        if self._refreshing:
+            await asyncio.gather(*self._refreshing.values(), return_exceptions=True)
+
+conversation_memory = ConversationMemory(state=conversation_state)
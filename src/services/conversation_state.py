@@ -0,0 +1,504 @@
+import asyncio
+import json
+import logging
+import os
+import socket
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import bindparam, or_, select, update
+from sqlalchemy.exc import InterfaceError, OperationalError
+from src.core.config import settings
+from src.core.database import AsyncSessionLocal
+from src.models.chat import Conversation, Message
+
+logger = logging.getLogger(__name__)
+
+OUTBOX = "conversation_outbox"
+OUTBOX_GROUP = "flusher"
+DEAD_LETTERS = "conversation_outbox:dead"
+DEAD_LETTERS_MAX = 100_000
+
+# Loads a conversation into the hot tier unless it is already there (another request may have
+# warmed it and appended messages the database doesn't have yet)
+# KEYS: meta, messages  ARGV: meta json, ttl, message json...
+_WARM = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+  return 0
+end
+redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+redis.call('DEL', KEYS[2])
+if #ARGV > 2 then
+  redis.call('RPUSH', KEYS[2], unpack(ARGV, 3))
+  redis.call('EXPIRE', KEYS[2], ARGV[2])
+end
+return 1
+"""
+
+# Appends a message to the hot list and queues it, with a copy of the conversation's metadata so the
+# flusher can create the conversation row even if the hot metadata expires before the entry is written
+# KEYS: meta, messages, outbox  ARGV: message json, max messages, ttl
+_APPEND = """
+redis.call('RPUSH', KEYS[2], ARGV[1])
+redis.call('LTRIM', KEYS[2], -tonumber(ARGV[2]), -1)
+redis.call('EXPIRE', KEYS[2], ARGV[3])
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+local meta = redis.call('GET', KEYS[1])
+if meta then
+  return redis.call('XADD', KEYS[3], '*', 'kind', 'message', 'data', ARGV[1], 'conversation', meta)
+end
+return redis.call('XADD', KEYS[3], '*', 'kind', 'message', 'data', ARGV[1])
+"""
+
+def _encode_message(message: Dict[str, Any]) -> str:
+    return json.dumps({**message, "created_at": message["created_at"].isoformat()})
+
+def _decode_message(raw: str) -> Dict[str, Any]:
+    message = json.loads(raw)
+    message["created_at"] = datetime.fromisoformat(message["created_at"])
+    return message
+
+def _as_dict(row) -> Dict[str, Any]:
+    return {column.name: getattr(row, column.key) for column in row.__table__.columns}
+
+def _is_transient(error: Exception) -> bool:
+    """Database unreachable or connection lost, as opposed to a row the database will never accept."""
+    if getattr(error, "connection_invalidated", False):
+        return True
+    return isinstance(error, (OperationalError, InterfaceError, ConnectionError, OSError, asyncio.TimeoutError))
+
+def _conversation_row(meta: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "id": meta["id"],
+        "tenant_id": meta["tenant_id"],
+        "title": meta.get("title"),
+        "created_at": datetime.fromisoformat(meta["created_at"]),
+        "updated_at": datetime.fromisoformat(meta.get("updated_at") or meta["created_at"]),
+    }
+
+def _insert_ignore(session, model):
+    """INSERT ... ON CONFLICT (id) DO NOTHING, so a redelivered row is a no-op."""
+    dialect = session.bind.dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f"No idempotent insert for dialect {dialect}")
+    return insert(model).on_conflict_do_nothing(index_elements=["id"])
+
+class ConversationState:
+    """
+    Hot tier for active conversations: metadata and the last CONVERSATION_HISTORY_MAX_MESSAGES
+    messages live in Redis for CONVERSATION_STATE_TTL after the last turn. Chat reads and writes
+    are served from there and a turn touches Postgres only when a conversation is cold.
+
+    Writes go to Postgres write-behind. `append_message` adds the message to the hot list and to an
+    outbox (a Redis stream) in one transaction; a background flusher in each process reads the
+    stream through a consumer group and bulk-inserts up to CONVERSATION_FLUSH_BATCH_SIZE rows per
+    commit, acknowledging entries only after the commit. Delivery is at-least-once: entries left
+    unacknowledged by a failed write or a dead process are taken over after
+    CONVERSATION_FLUSH_CLAIM_IDLE_MS. Message ids are assigned on append and inserts ignore existing
+    ids, so writing an entry twice is harmless.
+
+    If a batch is rejected for a reason other than the database being unreachable, its entries
+    are retried one at a time. Entries that fail on their own (a NUL byte in the content, say)
+    are moved to a dead-letter stream and acknowledged, so one bad row can't hold up the rest.
+    """
+
+    def __init__(
+        self,
+        redis_client=None,
+        session_factory=None,
+        ttl: Optional[int] = None,
+        max_messages: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        flush_interval_ms: Optional[int] = None,
+        claim_idle_ms: Optional[int] = None,
+        local: bool = False
+    ):
+        self._redis = redis_client
+        self.session_factory = session_factory or AsyncSessionLocal
+        self.ttl = ttl or settings.CONVERSATION_STATE_TTL
+        self.max_messages = max_messages or settings.CONVERSATION_HISTORY_MAX_MESSAGES
+        self.batch_size = batch_size or settings.CONVERSATION_FLUSH_BATCH_SIZE
+        self.flush_interval_ms = flush_interval_ms or settings.CONVERSATION_FLUSH_INTERVAL_MS
+        self.claim_idle_ms = claim_idle_ms or settings.CONVERSATION_FLUSH_CLAIM_IDLE_MS
+        self.local = local
+        self.consumer = f"{socket.gethostname()}-{os.getpid()}"
+        self._group_ready = False
+        # Re-read this consumer's unacknowledged entries once before new ones (startup, shutdown);
+        # the cursor moves past each page, so entries that fail again wait for a claim
+        self._recover = True
+        self._recover_from = "0"
+        self.dead_letters: List[Dict[str, Any]] = []
+        self._last_claim = 0.0
+        self._flusher: Optional[asyncio.Task] = None
+        self._inflight: Optional[asyncio.Future] = None
+        self._loop = None
+        self._local_meta: Dict[str, str] = {}
+        self._local_messages: Dict[str, List[str]] = {}
+        self._local_deleted: set = set()
+        self._local_outbox: Dict[str, Dict[str, str]] = {}
+        self._append_script = None
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            import redis.asyncio as redis
+            self._redis = redis.from_url(settings.REDIS_URL, decode_responses=True)
+        return self._redis
+
+    @property
+    def append_script(self):
+        # Sent by SHA (EVALSHA) after the first call
+        if self._append_script is None:
+            self._append_script = self.redis.register_script(_APPEND)
+        return self._append_script
+
+    @staticmethod
+    def _keys(conversation_id: str) -> Tuple[str, str]:
+        return f"conversation_state:{conversation_id}", f"conversation_state:{conversation_id}:messages"
+
+    @staticmethod
+    def _tombstone(conversation_id: str) -> str:
+        return f"conversation_state:{conversation_id}:deleted"
+
+    # Reads
+
+    async def ensure(
+        self, db, conversation_id: str, tenant_id: str, title: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        The conversation's metadata, loading it into the hot tier or creating it (write-behind) if
+        needed. None when the id belongs to another tenant.
+        """
+        self._ensure_flusher()
+        meta = await self.get_meta(conversation_id)
+        if meta is None:
+            meta = await self._warm(db, conversation_id)
+        if meta is None:
+            now = datetime.utcnow().isoformat()
+            meta = {"id": conversation_id, "tenant_id": tenant_id, "title": title, "created_at": now, "updated_at": now}
+            await self._create(meta)
+        return meta if meta["tenant_id"] == tenant_id else None
+
+    async def recent_messages(self, db, conversation_id: str) -> List[Message]:
+        """The conversation's most recent messages, oldest first, as (unattached) Message objects."""
+        if self.local:
+            if conversation_id not in self._local_meta:
+                await self._warm(db, conversation_id)
+            raw = self._local_messages.get(conversation_id, [])
+        else:
+            _, messages_key = self._keys(conversation_id)
+            raw = await self.redis.lrange(messages_key, 0, -1)
+            if not raw and await self.get_meta(conversation_id) is None:
+                await self._warm(db, conversation_id)
+                raw = await self.redis.lrange(messages_key, 0, -1)
+        return [Message(**_decode_message(r)) for r in raw]
+
+    async def get_meta(self, conversation_id: str) -> Optional[Dict[str, Any]]:
+        """The conversation's metadata if it is hot, else None."""
+        meta_key, _ = self._keys(conversation_id)
+        raw = self._local_meta.get(conversation_id) if self.local else await self.redis.get(meta_key)
+        return json.loads(raw) if raw else None
+
+    async def _warm(self, db, conversation_id: str) -> Optional[Dict[str, Any]]:
+        """Loads a cold conversation from the database into the hot tier. None if it doesn't exist."""
+        conversation = (await db.execute(select(Conversation).where(Conversation.id == conversation_id))).scalar_one_or_none()
+        if conversation is None:
+            return None
+        stmt = (
+            select(Message)
+            .where(Message.conversation_id == conversation_id)
+            .order_by(Message.created_at.desc(), Message.id.desc())
+            .limit(self.max_messages)
+        )
+        messages = [_encode_message(_as_dict(m)) for m in reversed((await db.execute(stmt)).scalars().all())]
+        meta = {
+            "id": conversation.id,
+            "tenant_id": conversation.tenant_id,
+            "title": conversation.title,
+            "created_at": conversation.created_at.isoformat() if conversation.created_at else None,
+            "updated_at": conversation.updated_at.isoformat() if conversation.updated_at else None,
+        }
+        if self.local:
+            if conversation_id not in self._local_meta:
+                self._local_meta[conversation_id] = json.dumps(meta)
+                self._local_messages[conversation_id] = messages
+        else:
+            await self.redis.eval(_WARM, 2, *self._keys(conversation_id), json.dumps(meta), self.ttl, *messages)
+        return meta
+
+    # Writes
+
+    async def _create(self, meta: Dict[str, Any]):
+        conversation_id = meta["id"]
+        entry = {"kind": "conversation", "data": json.dumps(meta)}
+        if self.local:
+            self._local_meta.setdefault(conversation_id, json.dumps(meta))
+            self._local_messages.setdefault(conversation_id, [])
+            self._local_outbox[str(uuid.uuid4())] = entry
+            return
+        meta_key, _ = self._keys(conversation_id)
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.set(meta_key, json.dumps(meta), ex=self.ttl, nx=True)
+        pipe.xadd(OUTBOX, entry)
+        await pipe.execute()
+
+    async def append_message(
+        self,
+        conversation_id: str,
+        role: str,
+        content: str,
+        metadata_json: Optional[Dict[str, Any]] = None,
+        message_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Adds a message to the hot tier and queues it for the database. One Redis round trip. The
+        queued entry carries the conversation's metadata, so the message never loses its parent row.
+        """
+        self._ensure_flusher()
+        message = {
+            "id": message_id or str(uuid.uuid4()),
+            "conversation_id": conversation_id,
+            "role": role,
+            "content": content,
+            "metadata_json": metadata_json,
+            "created_at": datetime.utcnow(),
+        }
+        raw = _encode_message(message)
+        if self.local:
+            messages = self._local_messages.setdefault(conversation_id, [])
+            messages.append(raw)
+            del messages[:-self.max_messages]
+            entry = {"kind": "message", "data": raw}
+            if conversation_id in self._local_meta:
+                entry["conversation"] = self._local_meta[conversation_id]
+            self._local_outbox[str(uuid.uuid4())] = entry
+            return message
+
+        await self.append_script(keys=[*self._keys(conversation_id), OUTBOX], args=[raw, self.max_messages, self.ttl])
+        return message
+
+    async def forget(self, conversation_id: str):
+        """
+        Drops a conversation from the hot tier (call when deleting it). Writes for it that are still
+        queued are discarded by the flusher instead of recreating it.
+        """
+        if self.local:
+            self._local_meta.pop(conversation_id, None)
+            self._local_messages.pop(conversation_id, None)
+            self._local_deleted.add(conversation_id)
+            return
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.delete(*self._keys(conversation_id))
+        pipe.set(self._tombstone(conversation_id), 1, ex=max(self.ttl, self.claim_idle_ms // 1000 * 2))
+        await pipe.execute()
+
+    # Write-behind flusher
+
+    def _ensure_flusher(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._flusher and not self._flusher.done():
+            return
+        self._loop = loop
+        self._flusher = loop.create_task(self._run_flusher())
+
+    async def _run_flusher(self):
+        while True:
+            try:
+                written = await self.flush(block_ms=self.flush_interval_ms)
+            except Exception as e:
+                # Entries stay unacknowledged and are read again
+                logger.error(f"Conversation write-behind flush failed: {e}")
+                written = 0
+                await asyncio.sleep(self.flush_interval_ms / 1000)
+            if written < self.batch_size and (self.local or written):
+                # Let a burst accumulate into the next batch instead of committing message by message
+                await asyncio.sleep(self.flush_interval_ms / 1000)
+
+    async def drain(self):
+        """Writes what is queued right now to the database, for reads that must see it (e.g. listings)."""
+        while await self.flush() >= self.batch_size:
+            pass
+
+    async def flush(self, block_ms: Optional[int] = None) -> int:
+        """Writes one batch of queued rows to the database and acknowledges it. Returns how many entries it covered."""
+        entries = await self._read(block_ms)
+        if not entries:
+            return 0
+        # Stopping the flusher mustn't abandon a write halfway; close() waits for it instead
+        self._inflight = asyncio.ensure_future(self._commit(entries))
+        await asyncio.shield(self._inflight)
+        return len(entries)
+
+    async def _commit(self, entries: List[Tuple[str, Dict[str, str]]]):
+        try:
+            await self._write([fields for _, fields in entries])
+        except Exception as e:
+            if _is_transient(e):
+                # Left unacknowledged: claimed again after CONVERSATION_FLUSH_CLAIM_IDLE_MS
+                raise
+            logger.warning(f"Conversation write-behind batch of {len(entries)} rejected, retrying row by row: {e}")
+            await self._commit_one_by_one(entries)
+            return
+        await self._ack([entry_id for entry_id, _ in entries])
+
+    async def _commit_one_by_one(self, entries: List[Tuple[str, Dict[str, str]]]):
+        # Conversations first, so their messages find them
+        ordered = sorted(entries, key=lambda entry: entry[1]["kind"] != "conversation")
+        for entry_id, fields in ordered:
+            try:
+                await self._write([fields])
+            except Exception as e:
+                if _is_transient(e):
+                    raise
+                await self._dead_letter(entry_id, fields, e)
+            await self._ack([entry_id])
+
+    async def _dead_letter(self, entry_id: str, fields: Dict[str, str], error: Exception):
+        logger.error(f"Conversation write-behind entry {entry_id} rejected, moved to {DEAD_LETTERS}: {error}")
+        letter = {**fields, "entry_id": entry_id, "error": str(error)[:1000]}
+        if self.local:
+            self.dead_letters.append(letter)
+            return
+        await self.redis.xadd(DEAD_LETTERS, letter, maxlen=DEAD_LETTERS_MAX, approximate=True)
+
+    async def _read(self, block_ms: Optional[int]) -> List[Tuple[str, Dict[str, str]]]:
+        if self.local:
+            return list(self._local_outbox.items())[:self.batch_size]
+
+        if not self._group_ready:
+            try:
+                await self.redis.xgroup_create(OUTBOX, OUTBOX_GROUP, id="0", mkstream=True)
+            except Exception as e:
+                if "BUSYGROUP" not in str(e):
+                    raise
+            self._group_ready = True
+
+        if self._recover:
+            # This consumer's own unacknowledged entries, one pass
+            reply = await self.redis.xreadgroup(
+                OUTBOX_GROUP, self.consumer, {OUTBOX: self._recover_from}, count=self.batch_size
+            )
+            entries = reply[0][1] if reply else []
+            if entries:
+                self._recover_from = entries[-1][0]
+                return entries
+            self._recover = False
+            self._recover_from = "0"
+
+        if time.monotonic() - self._last_claim >= self.claim_idle_ms / 1000:
+            # Entries another process read but never acknowledged (it died mid-flush)
+            self._last_claim = time.monotonic()
+            _, claimed, *_ = await self.redis.xautoclaim(
+                OUTBOX, OUTBOX_GROUP, self.consumer, min_idle_time=self.claim_idle_ms, count=self.batch_size
+            )
+            if claimed:
+                return claimed
+
+        reply = await self.redis.xreadgroup(OUTBOX_GROUP, self.consumer, {OUTBOX: ">"}, count=self.batch_size, block=block_ms)
+        return reply[0][1] if reply else []
+
+    async def _ack(self, entry_ids: List[str]):
+        if self.local:
+            for entry_id in entry_ids:
+                self._local_outbox.pop(entry_id, None)
+            return
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.xack(OUTBOX, OUTBOX_GROUP, *entry_ids)
+        pipe.xdel(OUTBOX, *entry_ids)
+        await pipe.execute()
+
+    async def _hot_metas(self, conversation_ids: List[str]) -> List[Optional[Dict[str, Any]]]:
+        if not conversation_ids:
+            return []
+        if self.local:
+            raw = [self._local_meta.get(c) for c in conversation_ids]
+        else:
+            raw = await self.redis.mget([self._keys(c)[0] for c in conversation_ids])
+        return [json.loads(r) if r else None for r in raw]
+
+    async def _deleted(self, conversation_ids: List[str]) -> set:
+        if self.local:
+            return self._local_deleted & set(conversation_ids)
+        flags = await self.redis.mget([self._tombstone(c) for c in conversation_ids])
+        return {c for c, flag in zip(conversation_ids, flags) if flag}
+
+    async def _write(self, entries: List[Dict[str, str]]):
+        conversations: Dict[str, Dict[str, Any]] = {}
+        messages: Dict[str, Dict[str, Any]] = {}
+        parents: Dict[str, Dict[str, Any]] = {}
+        for fields in entries:
+            if fields["kind"] == "conversation":
+                meta = json.loads(fields["data"])
+                conversations[meta["id"]] = _conversation_row(meta)
+            else:
+                message = _decode_message(fields["data"])
+                messages[message["id"]] = message
+                if fields.get("conversation"):
+                    parents[message["conversation_id"]] = json.loads(fields["conversation"])
+
+        deleted = await self._deleted(list({*conversations, *(m["conversation_id"] for m in messages.values())}))
+        # A message whose conversation entry is still queued (or held by a dead process) brings the
+        # conversation along, from the copy in its entry or else the hot tier, so it doesn't depend
+        # on that entry, nor on the hot metadata outliving it
+        missing = [c for c in {m["conversation_id"] for m in messages.values()} if c not in conversations]
+        for conversation_id in missing:
+            if parents.get(conversation_id, {}).get("created_at"):
+                conversations[conversation_id] = _conversation_row(parents[conversation_id])
+        missing = [c for c in missing if c not in conversations]
+        for conversation_id, meta in zip(missing, await self._hot_metas(missing)):
+            if meta and meta.get("created_at"):
+                conversations[conversation_id] = _conversation_row(meta)
+        conversation_rows = [c for c in conversations.values() if c["id"] not in deleted]
+        message_rows = [m for m in messages.values() if m["conversation_id"] not in deleted]
+        latest: Dict[str, datetime] = {}
+        for m in message_rows:
+            latest[m["conversation_id"]] = max(latest.get(m["conversation_id"], m["created_at"]), m["created_at"])
+
+        async with self.session_factory() as session:
+            if conversation_rows:
+                await session.execute(_insert_ignore(session, Conversation), conversation_rows)
+            if message_rows:
+                await session.execute(_insert_ignore(session, Message), message_rows)
+            if latest:
+                # Last activity, for the most-recently-active listing
+                table = Conversation.__table__
+                connection = await session.connection()
+                await connection.execute(
+                    update(table)
+                    .where(
+                        table.c.id == bindparam("conversation_id"),
+                        or_(table.c.updated_at.is_(None), table.c.updated_at < bindparam("active_at"))
+                    )
+                    .values(updated_at=bindparam("active_at")),
+                    [{"conversation_id": c, "active_at": at} for c, at in latest.items()]
+                )
+            await session.commit()
+        if message_rows or conversation_rows:
+            logger.debug(f"Flushed {len(conversation_rows)} conversations and {len(message_rows)} messages")
+
+    async def close(self):
+        """Stops the flusher and writes everything still queued (call on shutdown)."""
+        if self._flusher and not self._flusher.done():
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+        self._flusher = None
+        self._recover = True
+        try:
+            if self._inflight is not None:
+                await self._inflight
+            while await self.flush():
+                pass
+        except Exception as e:
+            # Still queued in Redis; another process (or the next start) writes it
+            logger.error(f"Conversation write-behind drain failed on shutdown: {e}")
+        self._inflight = None
+
+conversation_state = ConversationState()
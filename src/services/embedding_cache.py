@@ -0,0 +1,124 @@
+import hashlib
+import logging
+from collections import OrderedDict
+from typing import List, Optional, Dict
+import numpy as np
+from src.services.base import BaseEmbedder
+from src.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+def normalize_text(text: str) -> str:
+    """Whitespace-insensitive form of the text used for cache keys."""
+    return " ".join(text.split())
+
+class CachedEmbedder(BaseEmbedder):
+    """
+    Content-addressed caching decorator for any BaseEmbedder.
+
+    Tier 1 is an in-process LRU, tier 2 a shared Redis keyspace. Keys are
+    (provider, model, sha256(normalized text)); values are raw float32 bytes.
+    Redis errors degrade to a cache miss, never to a failed embedding.
+    """
+
+    def __init__(
+        self,
+        inner: BaseEmbedder,
+        provider: str,
+        redis_client=None,
+        local_size: Optional[int] = None,
+        ttl: Optional[int] = None
+    ):
+        self.inner = inner
+        self.provider = provider
+        self.model = getattr(inner, "model", None) or provider
+        self.redis = redis_client
+        self.local_size = settings.EMBEDDING_CACHE_LOCAL_SIZE if local_size is None else local_size
+        self.ttl = ttl or settings.EMBEDDING_CACHE_TTL
+        self._local: "OrderedDict[str, bytes]" = OrderedDict()
+
+    def _key(self, text: str) -> str:
+        digest = hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+        return f"emb:{self.provider}:{self.model}:{digest}"
+
+    @staticmethod
+    def _encode(vector: List[float]) -> bytes:
+        return np.asarray(vector, dtype=np.float32).tobytes()
+
+    @staticmethod
+    def _decode(data: bytes) -> List[float]:
+        return np.frombuffer(data, dtype=np.float32).tolist()
+
+    def _local_get(self, key: str) -> Optional[bytes]:
+        data = self._local.get(key)
+        if data is not None:
+            self._local.move_to_end(key)
+        return data
+
+    def _local_put(self, key: str, data: bytes):
+        if self.local_size <= 0:
+            return
+        self._local[key] = data
+        self._local.move_to_end(key)
+        while len(self._local) > self.local_size:
+            self._local.popitem(last=False)
+
+    async def _remote_get(self, keys: List[str]) -> List[Optional[bytes]]:
+        if self.redis is None or not keys:
+            return [None] * len(keys)
+        try:
+            return await self.redis.mget(keys)
+        except Exception as e:
+            logger.warning(f"Embedding cache read failed: {e}")
+            return [None] * len(keys)
+
+    async def _remote_put(self, items: Dict[str, bytes]):
+        if self.redis is None or not items:
+            return
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            for key, data in items.items():
+                pipe.setex(key, self.ttl, data)
+            await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Embedding cache write failed: {e}")
+
+    async def embed_text(self, text: str) -> List[float]:
+        return (await self.embed_batch([text]))[0]
+
+    async def embed_batch(self, texts: List[str]) -> List[List[float]]:
+        keys = [self._key(text) for text in texts]
+        found: Dict[str, bytes] = {}
+
+        # Tier 1: in-process LRU
+        remote_keys = []
+        for key in dict.fromkeys(keys):
+            data = self._local_get(key)
+            if data is not None:
+                found[key] = data
+            else:
+                remote_keys.append(key)
+
+        # Tier 2: shared Redis
+        for key, data in zip(remote_keys, await self._remote_get(remote_keys)):
+            if data is not None:
+                found[key] = data
+                self._local_put(key, data)
+
+        # Only unique misses go to the provider
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in missing:
+                missing[key] = text
+        if missing:
+            vectors = await self.inner.embed_batch(list(missing.values()))
+            fresh = {key: self._encode(vector) for key, vector in zip(missing, vectors)}
+            for key, data in fresh.items():
+                found[key] = data
+                self._local_put(key, data)
+            await self._remote_put(fresh)
+
+        return [self._decode(found[key]) for key in keys]
+
+    async def embed_image(self, image_path: str) -> List[float]:
+        return await self.inner.embed_image(image_path)
@@ -1,4 +1,4 @@
-from typing import Dict, Type
+from typing import Dict, Type, Optional
 from src.services.base import BaseLLM, BaseEmbedder
 from src.core.config import settings
 
@@ -29,3 +29,14 @@ class EmbedderFactory:
         if name not in cls._providers:
             raise ValueError(f"Embedding provider '{name}' not found.")
         return cls._providers[name]()
+
+    @classmethod
+    def get_cached_provider(cls, name: Optional[str] = None) -> BaseEmbedder:
+        """Returns the provider wrapped in the two-tier (LRU + Redis) embedding cache, if enabled."""
+        name = name or settings.EMBEDDING_PROVIDER
+        provider = cls.get_provider(name)
+        if not settings.EMBEDDING_CACHE_ENABLED:
+            return provider
+        import redis.asyncio as redis
+        from src.services.embedding_cache import CachedEmbedder
+        return CachedEmbedder(provider, provider=name, redis_client=redis.from_url(settings.REDIS_URL))
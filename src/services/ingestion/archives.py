@@ -0,0 +1,64 @@
+import mimetypes
+import posixpath
+import tarfile
+import zipfile
+from typing import BinaryIO, Iterator, Optional
+from starlette.datastructures import Headers, UploadFile
+from src.models.ingestion import MediaType
+
+ARCHIVE_SUFFIXES = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz")
+
+# Text formats mimetypes doesn't classify as text/*
+TEXT_EXTENSIONS = {".md", ".markdown", ".rst", ".csv", ".tsv", ".json", ".jsonl", ".log", ".yaml", ".yml", ".xml"}
+
+def is_archive(filename: Optional[str]) -> bool:
+    return bool(filename) and filename.lower().endswith(ARCHIVE_SUFFIXES)
+
+def infer_media_type(filename: str) -> Optional[MediaType]:
+    """The media type a file is ingested as, from its name; None if it isn't one we process."""
+    extension = posixpath.splitext(filename.lower())[1]
+    if extension in TEXT_EXTENSIONS:
+        return MediaType.TEXT
+    guessed, _ = mimetypes.guess_type(filename)
+    kind = (guessed or "").split("/")[0]
+    return {"text": MediaType.TEXT, "audio": MediaType.AUDIO, "image": MediaType.IMAGE, "video": MediaType.VIDEO}.get(kind)
+
+def member_filename(name: str) -> Optional[str]:
+    """
+    Storage filename for an archive member: its path inside the archive, flattened, so that
+    docs/a/readme.md and docs/b/readme.md stay distinct documents. None for entries to skip
+    (unsafe paths, hidden files, OS metadata).
+    """
+    path = posixpath.normpath(name.replace("\\", "/"))
+    parts = path.split("/")
+    if path.startswith("/") or ".." in parts or any(p.startswith(".") or p == "__MACOSX" for p in parts):
+        return None
+    return "_".join(parts)
+
+def _as_upload(fileobj: BinaryIO, filename: str, size: int) -> UploadFile:
+    content_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    return UploadFile(file=fileobj, filename=filename, size=size, headers=Headers({"content-type": content_type}))
+
+def iter_archive_members(archive: BinaryIO, filename: str) -> Iterator[UploadFile]:
+    """
+    Yields the regular files of a zip or tar archive one at a time, as uploads streamed straight out
+    of the archive (nothing is extracted to disk first). Each must be consumed before the next is
+    requested. Directories, links and skipped entries are not yielded.
+    """
+    if filename.lower().endswith(".zip"):
+        with zipfile.ZipFile(archive) as bundle:
+            for info in bundle.infolist():
+                name = None if info.is_dir() else member_filename(info.filename)
+                if name is None:
+                    continue
+                with bundle.open(info) as member:
+                    yield _as_upload(member, name, info.file_size)
+    else:
+        # Stream mode: members are read in archive order, no seeking back
+        with tarfile.open(fileobj=archive, mode="r|*") as bundle:
+            for info in bundle:
+                name = member_filename(info.name) if info.isfile() else None
+                if name is None:
+                    continue
+                member = bundle.extractfile(info)
+                yield _as_upload(member, name, info.size)
@@ -0,0 +1,70 @@
+from typing import Iterable, Iterator, Callable, Optional
+from src.core.config import settings
+
+def iter_text_windows(file_path: str, window_size: int) -> Iterator[str]:
+    """
+    Reads a text file incrementally, yielding windows of roughly `window_size` characters.
+    Each window is cut at the last newline (or whitespace) so a word or PII entity is
+    never split across two windows; the remainder is carried into the next window.
+    """
+    carry = ""
+    with open(file_path, "r", encoding="utf-8") as f:
+        while True:
+            block = f.read(window_size)
+            if not block:
+                break
+            window = carry + block
+            cut = window.rfind("\n") + 1
+            if cut == 0:
+                cut = max(window.rfind(" "), window.rfind("\t")) + 1
+            if cut == 0 or len(window) - cut > window_size:
+                # No boundary in sight: emit as-is rather than growing the carry unbounded
+                cut = len(window)
+            carry = window[cut:]
+            if cut:
+                yield window[:cut]
+    if carry:
+        yield carry
+
+def iter_chunks(segments: Iterable[str], chunk_size: int, overlap: int) -> Iterator[str]:
+    """
+    Streaming equivalent of fixed-size chunking with overlap over the concatenation of
+    `segments`. Only the unconsumed tail (< chunk_size + one segment) is held in memory,
+    and the overlap is carried across segment boundaries.
+    """
+    if overlap >= chunk_size:
+        raise ValueError("overlap must be smaller than chunk_size")
+    step = chunk_size - overlap
+    buffer = ""
+    for segment in segments:
+        buffer += segment
+        start = 0
+        while len(buffer) - start >= chunk_size:
+            yield buffer[start:start + chunk_size]
+            start += step
+        # Trim once per segment instead of once per chunk
+        buffer = buffer[start:]
+    start = 0
+    while start < len(buffer):
+        yield buffer[start:start + chunk_size]
+        start += step
+
+def stream_text_chunks(
+    file_path: str,
+    scrub: Optional[Callable[[str], str]] = None,
+    chunk_size: Optional[int] = None,
+    overlap: Optional[int] = None,
+    window_size: Optional[int] = None
+) -> Iterator[str]:
+    """
+    Read -> scrub -> chunk pipeline for a text file. Peak memory is proportional to
+    `window_size`, not to the file size.
+    """
+    windows = iter_text_windows(file_path, window_size or settings.INGEST_READ_WINDOW_SIZE)
+    if scrub is not None:
+        windows = (scrub(window) for window in windows)
+    return iter_chunks(
+        windows,
+        chunk_size=chunk_size or settings.INGEST_CHUNK_SIZE,
+        overlap=settings.INGEST_CHUNK_OVERLAP if overlap is None else overlap
+    )
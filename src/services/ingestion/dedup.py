@@ -0,0 +1,121 @@
+import hashlib
+import re
+import uuid
+from typing import Dict, List, Optional, Set, Tuple
+from src.services.embedding_cache import normalize_text
+from src.core.config import settings
+
+# Fixed namespace so chunk IDs are stable across processes and deployments
+CHUNK_ID_NAMESPACE = uuid.UUID("6f1d3c2e-9a4b-5d7e-8f10-2b3c4d5e6f70")
+_WORD_PATTERN = re.compile(r"\w+")
+
+SIMHASH_BITS = 64
+# 16-bit bands: two hashes differing in at most 3 bits agree exactly on at least one band,
+# so lookups find every match as long as INGEST_DEDUP_MAX_DISTANCE < SIMHASH_BANDS
+SIMHASH_BANDS = 4
+_BAND_BITS = SIMHASH_BITS // SIMHASH_BANDS
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+def chunk_point_id(tenant_id: str, text: str) -> str:
+    """Deterministic point ID from (tenant, content): re-indexing the same chunk overwrites it."""
+    return str(uuid.uuid5(CHUNK_ID_NAMESPACE, f"{tenant_id}:{content_hash(text)}"))
+
+def simhash(text: str, shingle_size: int = 3) -> int:
+    """64-bit SimHash over word shingles; near-identical texts differ in only a few bits."""
+    words = _WORD_PATTERN.findall(text.lower())
+    if len(words) < shingle_size:
+        shingles = [" ".join(words)]
+    else:
+        shingles = [" ".join(words[i:i + shingle_size]) for i in range(len(words) - shingle_size + 1)]
+    weights = [0] * SIMHASH_BITS
+    for shingle in shingles:
+        h = int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(SIMHASH_BITS):
+            weights[bit] += 1 if h >> bit & 1 else -1
+    return sum(1 << bit for bit, weight in enumerate(weights) if weight > 0)
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+def _bands(value: int) -> List[int]:
+    mask = (1 << _BAND_BITS) - 1
+    return [value >> (i * _BAND_BITS) & mask for i in range(SIMHASH_BANDS)]
+
+class NearDuplicateIndex:
+    """
+    Per-tenant SimHash index of indexed chunks, for near-duplicate lookups at ingest time.
+
+    Entries ("<simhash hex>:<point id>") are bucketed by each 16-bit band of the hash in Redis sets
+    `simhash:<tenant>:<band>:<value>`, so a lookup is one pipelined round trip per batch.
+    `local=True` keeps the buckets in memory (single process, tests).
+    """
+
+    def __init__(self, redis_client=None, max_distance: Optional[int] = None, local: bool = False):
+        self.max_distance = settings.INGEST_DEDUP_MAX_DISTANCE if max_distance is None else max_distance
+        self.local = local
+        self._redis = redis_client
+        self._buckets: Dict[str, Set[str]] = {}
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            import redis.asyncio as redis
+            self._redis = redis.from_url(settings.REDIS_URL, decode_responses=True)
+        return self._redis
+
+    @staticmethod
+    def _keys(tenant_id: str, value: int) -> List[str]:
+        return [f"simhash:{tenant_id}:{i}:{band}" for i, band in enumerate(_bands(value))]
+
+    async def lookup(self, tenant_id: str, hashes: List[int]) -> List[List[Tuple[str, int, int]]]:
+        """For each hash, (point id, simhash, distance) of indexed chunks within `max_distance` bits, closest first."""
+        keys = [self._keys(tenant_id, value) for value in hashes]
+        if self.local:
+            members = [self._buckets.get(key, set()) for group in keys for key in group]
+        else:
+            pipe = self.redis.pipeline(transaction=False)
+            for group in keys:
+                for key in group:
+                    pipe.smembers(key)
+            members = await pipe.execute()
+
+        matches = []
+        for i, value in enumerate(hashes):
+            found: Dict[str, Tuple[str, int, int]] = {}
+            for entries in members[i * SIMHASH_BANDS:(i + 1) * SIMHASH_BANDS]:
+                for entry in entries:
+                    hex_value, point_id = entry.split(":", 1)
+                    other = int(hex_value, 16)
+                    distance = hamming(value, other)
+                    if distance <= self.max_distance:
+                        found[point_id] = (point_id, other, distance)
+            matches.append(sorted(found.values(), key=lambda m: m[2]))
+        return matches
+
+    async def add(self, tenant_id: str, entries: List[Tuple[int, str]]):
+        """Registers (simhash, point id) pairs of freshly indexed chunks."""
+        await self._apply(tenant_id, entries, remove=False)
+
+    async def discard(self, tenant_id: str, entries: List[Tuple[int, str]]):
+        """Drops entries whose points no longer exist (e.g. deleted with an old document version)."""
+        await self._apply(tenant_id, entries, remove=True)
+
+    async def _apply(self, tenant_id: str, entries: List[Tuple[int, str]], remove: bool):
+        if not entries:
+            return
+        pipe = None if self.local else self.redis.pipeline(transaction=False)
+        for value, point_id in entries:
+            member = f"{value:016x}:{point_id}"
+            for key in self._keys(tenant_id, value):
+                if self.local and remove:
+                    self._buckets.get(key, set()).discard(member)
+                elif self.local:
+                    self._buckets.setdefault(key, set()).add(member)
+                elif remove:
+                    pipe.srem(key, member)
+                else:
+                    pipe.sadd(key, member)
+        if pipe is not None:
+            await pipe.execute()
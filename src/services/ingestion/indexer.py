@@ -0,0 +1,224 @@
+import asyncio
+import logging
+import time
+from typing import Iterable, List, Dict, Any, Optional, Set
+from src.services.base import BaseEmbedder
+from src.services.sparse_encoder import sparse_encoder
+from src.services.ingestion.dedup import NearDuplicateIndex, chunk_point_id, content_hash, hamming, simhash
+from src.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+class ChunkIndexer:
+    """
+    Embeds chunks in size-bounded batches and writes each batch with a single bulk upsert.
+    At most `concurrency` batches are in flight, so memory stays bounded for long chunk streams.
+
+    Point IDs derive from (tenant, content hash), so re-indexing a chunk overwrites it. With `dedup`,
+    chunks that are already indexed or within INGEST_DEDUP_MAX_DISTANCE SimHash bits of an indexed
+    chunk of the tenant are skipped before embedding.
+
+    A point can therefore serve several documents: its `document_ids` payload lists all of them
+    (a skipped duplicate adds its document to the point it matched), so a new version of one
+    document only deletes the points no other document references.
+    """
+
+    def __init__(
+        self,
+        embedder: Optional[BaseEmbedder] = None,
+        store=None,  # VectorStore
+        batch_size: Optional[int] = None,
+        concurrency: Optional[int] = None,
+        hybrid: Optional[bool] = None,
+        dedup: Optional[bool] = None,
+        dedup_index: Optional[NearDuplicateIndex] = None
+    ):
+        self._embedder = embedder
+        self._store = store
+        self.batch_size = max(1, batch_size or settings.INGEST_EMBED_BATCH_SIZE)
+        self.concurrency = max(1, concurrency or settings.INGEST_EMBED_CONCURRENCY)
+        self.hybrid = settings.HYBRID_SEARCH_ENABLED if hybrid is None else hybrid
+        self.dedup = settings.INGEST_DEDUP_ENABLED if dedup is None else dedup
+        self._dedup_index = dedup_index
+
+    @property
+    def embedder(self) -> BaseEmbedder:
+        if self._embedder is None:
+            from src.services.factory import EmbedderFactory
+            import src.services.providers  # noqa: F401 (registers providers)
+            self._embedder = EmbedderFactory.get_cached_provider()
+        return self._embedder
+
+    @property
+    def dedup_index(self) -> NearDuplicateIndex:
+        if self._dedup_index is None:
+            self._dedup_index = NearDuplicateIndex()
+        return self._dedup_index
+
+    @property
+    def store(self):
+        if self._store is None:
+            from src.services.vector_store import vector_store
+            self._store = vector_store
+        return self._store
+
+    async def index(
+        self,
+        tenant_id: str,
+        chunks: Iterable[str],
+        metadata: Optional[Dict[str, Any]] = None,
+        document_id: Optional[str] = None,
+        previous_ids: Optional[Set[str]] = None
+    ) -> Dict[str, Any]:
+        """
+        Embeds and upserts all chunks for a tenant. `metadata` is copied onto every point.
+        Chunks whose point is in `previous_ids` (the document's previous version) are not
+        re-embedded; only their payload is refreshed. Returns throughput and duplicate stats for the run.
+        """
+        metadata = metadata or {}
+        previous_ids = previous_ids or set()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        pending = set()
+        stats = {"chunks": 0, "upserts": 0, "seen": 0, "unchanged": 0, "exact_duplicates": 0, "near_duplicates": 0}
+        started = time.perf_counter()
+
+        async def _flush(batch: List[str], offset: int):
+            async with semaphore:
+                stats["seen"] += len(batch)
+                point_ids = [chunk_point_id(tenant_id, text) for text in batch]
+                keep = [i for i in range(len(batch)) if point_ids[i] not in previous_ids]
+                if len(keep) < len(batch):
+                    # Unchanged since the previous version: keep the vector, refresh position and job
+                    unchanged = {
+                        point_ids[i]: {"metadata": {**metadata, "chunk_index": offset + i}}
+                        for i in range(len(batch)) if point_ids[i] in previous_ids
+                    }
+                    await self.store.set_payloads(tenant_id, unchanged)
+                    stats["unchanged"] += len(batch) - len(keep)
+                hashes = None
+                if self.dedup and keep:
+                    hashes = {i: simhash(batch[i]) for i in keep}
+                    matched: Set[str] = set()
+                    keep = await self._drop_duplicates(
+                        tenant_id, point_ids, hashes, stats, ignore=previous_ids, matched=matched
+                    )
+                    if document_id is not None and matched:
+                        # The skipped chunks are served by those points now; they must outlive the other document
+                        await self.store.add_document_refs(tenant_id, list(matched), document_id)
+                if not keep:
+                    return
+
+                texts = [batch[i] for i in keep]
+                vectors = await self.embedder.embed_batch(texts)
+                # The upsert replaces the payload: keep other documents' references to these points
+                refs = await self.store.document_refs(tenant_id, [point_ids[i] for i in keep]) if document_id is not None else {}
+                payloads = []
+                for i in keep:
+                    payload = {
+                        "text": batch[i],
+                        "content_hash": content_hash(batch[i]),
+                        "metadata": {**metadata, "chunk_index": offset + i}
+                    }
+                    if document_id is not None:
+                        documents = refs.get(point_ids[i], set()) | {document_id}
+                        payload["document_id"] = document_id
+                        payload["document_ids"] = sorted(documents)
+                    payloads.append(payload)
+                sparse_vectors = None
+                if self.hybrid:
+                    # Lexical term weights computed at ingest time, stored next to the dense vector
+                    sparse_vectors = [sparse_encoder.encode_document(text) for text in texts]
+                    await sparse_encoder.record_documents(tenant_id, texts)
+                written = await self.store.upsert_batch(
+                    tenant_id, vectors, payloads, point_ids=[point_ids[i] for i in keep], sparse_vectors=sparse_vectors
+                )
+                if self.dedup:
+                    await self.dedup_index.add(tenant_id, [(hashes[i], point_ids[i]) for i in keep])
+                stats["chunks"] += written
+                stats["upserts"] += 1
+
+        batch: List[str] = []
+        offset = 0
+        try:
+            for chunk in chunks:
+                batch.append(chunk)
+                if len(batch) >= self.batch_size:
+                    pending.add(asyncio.ensure_future(_flush(batch, offset)))
+                    offset += len(batch)
+                    batch = []
+                    # Backpressure: don't read further ahead than the batches we can run
+                    if len(pending) >= self.concurrency:
+                        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                        for task in done:
+                            task.result()
+
+            if batch:
+                pending.add(asyncio.ensure_future(_flush(batch, offset)))
+            if pending:
+                await asyncio.gather(*pending)
+        except Exception:
+            for task in pending:
+                task.cancel()
+            raise
+
+        elapsed = time.perf_counter() - started
+        duplicates = stats["exact_duplicates"] + stats["near_duplicates"]
+        result = {
+            "chunks": stats["chunks"],
+            "chunks_seen": stats["seen"],
+            "exact_duplicates": stats["exact_duplicates"],
+            "near_duplicates": stats["near_duplicates"],
+            "duplicate_ratio": round(duplicates / stats["seen"], 4) if stats["seen"] else 0.0,
+            "unchanged": stats["unchanged"],
+            "upserts": stats["upserts"],
+            "elapsed_s": round(elapsed, 4),
+            "chunks_per_s": round(stats["chunks"] / elapsed, 2) if elapsed > 0 else 0.0,
+            "vectors_per_upsert": round(stats["chunks"] / stats["upserts"], 2) if stats["upserts"] else 0.0,
+        }
+        logger.info(
+            f"Indexed {result['chunks']} chunks for tenant {tenant_id} in {result['upserts']} upserts "
+            f"({result['chunks_per_s']} chunks/s, {result['vectors_per_upsert']} vectors/upsert, "
+            f"duplicate ratio {result['duplicate_ratio']})"
+        )
+        return result
+
+    async def _drop_duplicates(
+        self,
+        tenant_id: str,
+        point_ids: List[str],
+        hashes: Dict[int, int],
+        stats: Dict[str, int],
+        ignore: Set[str] = frozenset(),
+        matched: Optional[Set[str]] = None
+    ) -> List[int]:
+        """
+        Of the batch positions in `hashes` (position -> SimHash), those worth indexing:
+        not already indexed, not near an indexed or earlier chunk. Points in `ignore` (the previous
+        version of the document being re-indexed, about to be replaced) don't count as matches.
+        The indexed points that skipped chunks matched are added to `matched`.
+        """
+        positions = list(hashes)
+        matches = await self.dedup_index.lookup(tenant_id, [hashes[i] for i in positions])
+        candidates = {point_id for found in matches for point_id, _, _ in found}
+        # The SimHash index may still list points deleted since (e.g. with an old document version)
+        existing = await self.store.existing_ids(tenant_id, list(candidates))
+        stale = {(value, point_id) for found in matches for point_id, value, _ in found if point_id not in existing}
+        await self.dedup_index.discard(tenant_id, list(stale))
+
+        keep: List[int] = []
+        for i, found in zip(positions, matches):
+            live = [point_id for point_id, _, _ in found if point_id in existing and point_id not in ignore]
+            earlier = [j for j in keep if hamming(hashes[i], hashes[j]) <= self.dedup_index.max_distance]
+            if point_ids[i] in live or any(point_ids[j] == point_ids[i] for j in earlier):
+                stats["exact_duplicates"] += 1
+            elif live or earlier:
+                stats["near_duplicates"] += 1
+            else:
+                keep.append(i)
+                continue
+            if live and matched is not None:
+                # Closest first; an earlier chunk of this batch is written with the document anyway
+                matched.add(point_ids[i] if point_ids[i] in live else live[0])
+        return keep
+
+chunk_indexer = ChunkIndexer()
@@ -0,0 +1,288 @@
+import json
+import logging
+import time
+from typing import Any, Dict, List, Optional
+from src.core.config import settings
+from src.models.ingestion import MediaType
+
+logger = logging.getLogger(__name__)
+
+# Queue the job at the tail of the tenant's backlog; if the tenant has a free slot in the queue, take one
+# and return the backlog's head to send (the job itself unless older ones are waiting).
+# KEYS: inflight, backlog, tenants   ARGV: cap, message, ttl, tenant
+_ACQUIRE = """
+redis.call('SADD', KEYS[3], ARGV[4])
+if tonumber(redis.call('GET', KEYS[1]) or '0') >= tonumber(ARGV[1]) then
+    redis.call('RPUSH', KEYS[2], ARGV[2])
+    return false
+end
+redis.call('INCR', KEYS[1])
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+if redis.call('LLEN', KEYS[2]) == 0 then
+    return ARGV[2]
+end
+redis.call('RPUSH', KEYS[2], ARGV[2])
+return redis.call('LPOP', KEYS[2])
+"""
+
+# Hand the finished job's slot to the tenant's next backlogged job, or free it.
+# KEYS: inflight, backlog   ARGV: ttl
+_RELEASE = """
+local message = redis.call('LPOP', KEYS[2])
+if message then
+    redis.call('EXPIRE', KEYS[1], ARGV[1])
+    return message
+end
+if tonumber(redis.call('GET', KEYS[1]) or '0') > 0 then
+    redis.call('DECR', KEYS[1])
+end
+return false
+"""
+
+# Put messages that could not be sent back at the head of the backlog (in order) and free their slots.
+# KEYS: inflight, backlog   ARGV: messages...
+_REQUEUE = """
+for i = #ARGV, 1, -1 do
+    redis.call('LPUSH', KEYS[2], ARGV[i])
+end
+local inflight = tonumber(redis.call('GET', KEYS[1]) or '0')
+if inflight > 0 then
+    redis.call('DECRBY', KEYS[1], math.min(inflight, #ARGV))
+end
+return #ARGV
+"""
+
+LARGE_TEXT_QUEUE = f"{settings.INGEST_QUEUE_PREFIX}.text_large"
+
+def queue_for(media_type, size: Optional[int] = None) -> str:
+    """
+    Each media type has its own queue (and worker pool), so a video backlog never delays text jobs.
+    Text files of INGEST_LARGE_TEXT_MIN_BYTES or more go to LARGE_TEXT_QUEUE. Its worker runs a solo
+    (non-daemon) pool, so it can scrub PII across a process pool, which prefork children cannot start.
+    """
+    media_type = MediaType(media_type)
+    threshold = settings.INGEST_LARGE_TEXT_MIN_BYTES
+    if media_type == MediaType.TEXT and threshold and size is not None and size >= threshold:
+        return LARGE_TEXT_QUEUE
+    return f"{settings.INGEST_QUEUE_PREFIX}.{media_type.value}"
+
+INGEST_QUEUES = [queue_for(media_type) for media_type in MediaType] + [LARGE_TEXT_QUEUE]
+
+def _percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * q))], 3)
+
+class IngestionScheduler:
+    """
+    Per-tenant fair share within each media-type queue.
+
+    A tenant has at most INGEST_TENANT_MAX_INFLIGHT jobs in a queue's broker list or running. Further
+    jobs wait in the tenant's own FIFO backlog (in Redis). When one of its jobs finishes, its slot goes
+    to its next backlogged job. So a tenant with 10k queued jobs holds the same few places in the
+    broker queue as a tenant with one, and everyone else's jobs wait behind at most
+    (tenants x cap) jobs, not behind the whole backlog.
+
+    Jobs record how long they waited (from submission, and from reaching the broker) per queue;
+    `stats()` reports percentiles over the last INGEST_WAIT_SAMPLE_SIZE jobs, plus backlog depths.
+    In-flight counters expire after INGEST_INFLIGHT_TTL without activity, so slots leaked by a lost
+    worker come back. Jobs the broker doesn't accept go back to the head of their backlog, and their
+    slots are freed; the tenant's next submission or finished job sends them.
+    """
+
+    def __init__(self, redis_client=None, max_inflight: Optional[int] = None, local: bool = False):
+        self._redis = redis_client
+        self.max_inflight = max(1, max_inflight or settings.INGEST_TENANT_MAX_INFLIGHT)
+        self.local = local
+        self.sent: List[Dict[str, Any]] = []
+        self._inflight: Dict[str, int] = {}
+        self._backlogs: Dict[str, List[str]] = {}
+        self._tenants: Dict[str, set] = {}
+        self._waits: Dict[str, List[float]] = {}
+        self._scripts: Dict[str, Any] = {}
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            import redis.asyncio as redis
+            self._redis = redis.from_url(settings.REDIS_URL, decode_responses=True)
+        return self._redis
+
+    def _script(self, source: str):
+        # Sent by SHA (EVALSHA) after the first call
+        if source not in self._scripts:
+            self._scripts[source] = self.redis.register_script(source)
+        return self._scripts[source]
+
+    @staticmethod
+    def _keys(queue: str, tenant_id: str) -> List[str]:
+        return [
+            f"ingest_sched:{queue}:inflight:{tenant_id}",
+            f"ingest_sched:{queue}:backlog:{tenant_id}",
+            f"ingest_sched:{queue}:tenants",
+        ]
+
+    @staticmethod
+    def message(
+        job_id: str,
+        tenant_id: str,
+        media_type,
+        file_path: str,
+        checksum: Optional[str] = None,
+        batch_id: Optional[str] = None,
+        size: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """A process_ingestion_job call, as held in a backlog until it is sent."""
+        queue = queue_for(media_type, size)
+        return {
+            "args": [job_id, tenant_id, MediaType(media_type).value, file_path],
+            "kwargs": {
+                "checksum": checksum,
+                "schedule": {"queue": queue, "submitted_at": time.time(), "batch_id": batch_id},
+            },
+            "queue": queue,
+        }
+
+    async def submit(self, tenant_id: str, messages: List[Dict[str, Any]]) -> int:
+        """Sends the tenant's jobs it has slots for, backlogs the rest (in order). Returns how many were sent."""
+        encoded = [json.dumps(m) for m in messages]
+        if self.local:
+            admitted = [self._acquire_local(m["queue"], tenant_id, e) for m, e in zip(messages, encoded)]
+        else:
+            acquire = self._script(_ACQUIRE)
+            pipe = self.redis.pipeline(transaction=False)
+            for m, e in zip(messages, encoded):
+                await acquire(keys=self._keys(m["queue"], tenant_id),
+                              args=[self.max_inflight, e, settings.INGEST_INFLIGHT_TTL, tenant_id], client=pipe)
+            admitted = await pipe.execute()
+        return await self._send(tenant_id, [json.loads(m) for m in admitted if m])
+
+    async def release(self, queue: str, tenant_id: str) -> Optional[Dict[str, Any]]:
+        """Called when a job reaches a final state: sends the tenant's next backlogged job, if any."""
+        if self.local:
+            message = self._release_local(queue, tenant_id)
+        else:
+            inflight, backlog, _ = self._keys(queue, tenant_id)
+            message = await self._script(_RELEASE)(keys=[inflight, backlog], args=[settings.INGEST_INFLIGHT_TTL])
+        if not message:
+            return None
+        message = json.loads(message)
+        return message if await self._send(tenant_id, [message]) else None
+
+    async def _send(self, tenant_id: str, messages: List[Dict[str, Any]]) -> int:
+        """Dispatches messages that hold a slot, in order. If the broker fails, the unsent ones are requeued."""
+        for i, message in enumerate(messages):
+            try:
+                self.dispatch(message)
+            except Exception as e:
+                logger.error(f"Dispatching {len(messages) - i} ingestion job(s) of tenant {tenant_id} failed: {e}")
+                await self._requeue(tenant_id, messages[i:])
+                return i
+        return len(messages)
+
+    async def _requeue(self, tenant_id: str, messages: List[Dict[str, Any]]):
+        by_queue: Dict[str, List[str]] = {}
+        for message in messages:
+            by_queue.setdefault(message["queue"], []).append(json.dumps(message))
+        for queue, encoded in by_queue.items():
+            if self.local:
+                self._requeue_local(queue, tenant_id, encoded)
+            else:
+                inflight, backlog, _ = self._keys(queue, tenant_id)
+                await self._script(_REQUEUE)(keys=[inflight, backlog], args=encoded)
+
+    def dispatch(self, message: Dict[str, Any]):
+        message["kwargs"]["schedule"]["dispatched_at"] = time.time()
+        if self.local:
+            self.sent.append(message)
+            return
+        from src.worker.main import celery_app
+        celery_app.send_task("process_ingestion_job", args=message["args"], kwargs=message["kwargs"], queue=message["queue"])
+
+    async def record_wait(self, schedule: Dict[str, Any], started_at: Optional[float] = None):
+        """Records a job's queue wait (submission -> start) and broker wait (dispatch -> start)."""
+        started_at = started_at or time.time()
+        queue = schedule["queue"]
+        waits = [
+            ("total", started_at - schedule["submitted_at"]),
+            ("broker", started_at - schedule.get("dispatched_at", schedule["submitted_at"])),
+        ]
+        if self.local:
+            for kind, seconds in waits:
+                samples = self._waits.setdefault(f"{queue}:{kind}", [])
+                samples.insert(0, seconds)
+                del samples[settings.INGEST_WAIT_SAMPLE_SIZE:]
+            return
+        pipe = self.redis.pipeline(transaction=False)
+        for kind, seconds in waits:
+            key = f"ingest_sched:{queue}:waits:{kind}"
+            pipe.lpush(key, f"{max(0.0, seconds):.3f}")
+            pipe.ltrim(key, 0, settings.INGEST_WAIT_SAMPLE_SIZE - 1)
+        await pipe.execute()
+
+    async def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per queue: wait-time percentiles (seconds), broker depth, and per-tenant in-flight / backlog counts."""
+        result = {}
+        for queue in INGEST_QUEUES:
+            if self.local:
+                tenants = sorted(self._tenants.get(queue, set()))
+                waits = {kind: self._waits.get(f"{queue}:{kind}", []) for kind in ("total", "broker")}
+                counts = [(self._inflight.get(f"{queue}:{t}", 0), len(self._backlogs.get(f"{queue}:{t}", []))) for t in tenants]
+                depth = None  # no broker in local mode
+            else:
+                tenants = sorted(await self.redis.smembers(f"ingest_sched:{queue}:tenants"))
+                pipe = self.redis.pipeline(transaction=False)
+                for kind in ("total", "broker"):
+                    pipe.lrange(f"ingest_sched:{queue}:waits:{kind}", 0, -1)
+                # Celery's Redis transport keeps a queue's messages in a list named after it
+                pipe.llen(queue)
+                for tenant_id in tenants:
+                    inflight, backlog, _ = self._keys(queue, tenant_id)
+                    pipe.get(inflight)
+                    pipe.llen(backlog)
+                replies = await pipe.execute()
+                waits = {"total": [float(v) for v in replies[0]], "broker": [float(v) for v in replies[1]]}
+                depth = replies[2]
+                counts = [(int(replies[3 + 2 * i] or 0), replies[4 + 2 * i]) for i in range(len(tenants))]
+
+            result[queue] = {
+                "broker_depth": depth,
+                "backlog": sum(b for _, b in counts),
+                "wait_s": {
+                    kind: {
+                        "samples": len(values),
+                        "p50": _percentile(values, 0.5),
+                        "p95": _percentile(values, 0.95),
+                        "p99": _percentile(values, 0.99),
+                    }
+                    for kind, values in waits.items()
+                },
+                "tenants": {t: {"inflight": i, "backlog": b} for t, (i, b) in zip(tenants, counts) if i or b},
+            }
+        return result
+
+    def _acquire_local(self, queue: str, tenant_id: str, encoded: str) -> Optional[str]:
+        key = f"{queue}:{tenant_id}"
+        self._tenants.setdefault(queue, set()).add(tenant_id)
+        backlog = self._backlogs.setdefault(key, [])
+        backlog.append(encoded)
+        if self._inflight.get(key, 0) >= self.max_inflight:
+            return None
+        self._inflight[key] = self._inflight.get(key, 0) + 1
+        return backlog.pop(0)
+
+    def _release_local(self, queue: str, tenant_id: str) -> Optional[str]:
+        key = f"{queue}:{tenant_id}"
+        backlog = self._backlogs.get(key)
+        if backlog:
+            return backlog.pop(0)
+        self._inflight[key] = max(0, self._inflight.get(key, 0) - 1)
+        return None
+
+    def _requeue_local(self, queue: str, tenant_id: str, encoded: List[str]):
+        key = f"{queue}:{tenant_id}"
+        self._backlogs.setdefault(key, [])[:0] = encoded
+        self._inflight[key] = max(0, self._inflight.get(key, 0) - len(encoded))
+
+ingestion_scheduler = IngestionScheduler()
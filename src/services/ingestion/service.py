@@ -1,8 +1,19 @@
+import asyncio
 import uuid
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional
+from sqlalchemy import func, insert, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
-from src.models.ingestion import IngestionJob, JobStatus, MediaType
+from src.core.config import settings
+from src.models.ingestion import IngestionBatch, IngestionJob, JobStatus, MediaType
+from src.services.ingestion.archives import infer_media_type, is_archive, iter_archive_members
+from src.services.ingestion.scheduling import ingestion_scheduler
 from src.services.storage import storage
-from src.worker.main import celery_app
+
+class BatchTooLargeError(ValueError):
+    def __init__(self, limit: int):
+        super().__init__(f"Batch exceeds the limit of {limit} files")
+        self.limit = limit
 
 class IngestionService:
     @staticmethod
@@ -13,8 +24,9 @@ class IngestionService:
         file,
         filename: str
     ) -> IngestionJob:
-        # 1. Upload file
-        file_path = await storage.upload(file, tenant_id)
+        # 1. Upload file (copied from the spooled request body in parts; size and checksum measured on the way)
+        stored = await storage.upload(file, tenant_id)
+        file_path = stored.path
         
         # 2. Create job record
         job_id = str(uuid.uuid4())
@@ -24,20 +36,178 @@ class IngestionService:
             media_type=media_type,
             file_path=file_path,
             filename=filename,
-            status=JobStatus.PENDING
+            status=JobStatus.PENDING,
+            metadata_json={"upload": stored.as_dict()}
         )
         
         db.add(job)
         await db.commit()
         await db.refresh(job)
         
-        # 3. Trigger Celery task
-        celery_app.send_task(
-            "process_ingestion_job",
-            args=[job_id, tenant_id, media_type, file_path],
-            queue="ingestion"
-        )
+        # 3. Trigger Celery task (on the media type's queue, within the tenant's fair share)
+        await ingestion_scheduler.submit(tenant_id, [
+            ingestion_scheduler.message(job_id, tenant_id, media_type, file_path, checksum=stored.sha256, size=stored.size)
+        ])
         
         return job
 
+    @staticmethod
+    async def create_batch(
+        db: AsyncSession,
+        tenant_id: str,
+        files: List[Any],
+        media_type: Optional[MediaType] = None
+    ) -> Dict[str, Any]:
+        """
+        Ingests many files in one request. Archives (zip/tar) are expanded member by member.
+        Files are stored first. Their job rows are then written with one bulk INSERT in a single
+        transaction, and the jobs are submitted to the scheduler in one pipelined round trip. The
+        batch's last job to finish stamps it finished.
+        Without `media_type`, each file's type is inferred from its name; files of no known type are skipped.
+        """
+        batch_id = str(uuid.uuid4())
+        rows: List[Dict[str, Any]] = []
+        skipped: List[Dict[str, str]] = []
+        names = set()
+        semaphore = asyncio.Semaphore(settings.INGEST_BATCH_UPLOAD_CONCURRENCY)
+
+        async def store(upload, kind: MediaType):
+            async with semaphore:
+                stored = await storage.upload(upload, tenant_id)
+            rows.append({
+                "id": str(uuid.uuid4()),
+                "tenant_id": tenant_id,
+                "batch_id": batch_id,
+                "status": JobStatus.PENDING,
+                "media_type": kind,
+                "file_path": stored.path,
+                "filename": upload.filename,
+                "metadata_json": {"upload": stored.as_dict()},
+            })
+
+        pending = []
+        try:
+            async for upload, sequential in IngestionService._expand(files):
+                kind = media_type or infer_media_type(upload.filename)
+                if kind is None:
+                    skipped.append({"filename": upload.filename, "reason": "unsupported media type"})
+                    continue
+                if upload.filename in names:
+                    skipped.append({"filename": upload.filename, "reason": "duplicate filename in batch"})
+                    continue
+                names.add(upload.filename)
+                if len(names) > settings.INGEST_BATCH_MAX_FILES:
+                    raise BatchTooLargeError(settings.INGEST_BATCH_MAX_FILES)
+                if sequential:
+                    # Archive members share one underlying stream: store each before reading the next
+                    await store(upload, kind)
+                else:
+                    pending.append(asyncio.ensure_future(store(upload, kind)))
+            await asyncio.gather(*pending)
+        except BaseException:
+            for task in pending:
+                task.cancel()
+            raise
+
+        now = datetime.utcnow()
+        batch = IngestionBatch(
+            id=batch_id,
+            tenant_id=tenant_id,
+            total_jobs=len(rows),
+            metadata_json={"skipped": skipped},
+            created_at=now,
+            finished_at=None if rows else now
+        )
+        db.add(batch)
+        await db.flush()
+        if rows:
+            for row in rows:
+                row["created_at"] = row["updated_at"] = now
+            await db.execute(insert(IngestionJob), rows)
+        await db.commit()
+
+        if rows:
+            await ingestion_scheduler.submit(tenant_id, [
+                ingestion_scheduler.message(
+                    row["id"], tenant_id, row["media_type"], row["file_path"],
+                    checksum=row["metadata_json"]["upload"]["sha256"], batch_id=batch_id,
+                    size=row["metadata_json"]["upload"]["bytes"]
+                )
+                for row in rows
+            ])
+
+        return {"batch_id": batch_id, "jobs": len(rows), "skipped": skipped}
+
+    @staticmethod
+    async def _expand(files: List[Any]) -> AsyncIterator[Any]:
+        """Yields (upload, sequential): the files themselves, or each member of the archives among them."""
+        for upload in files:
+            if not is_archive(upload.filename):
+                yield upload, False
+                continue
+            members = iter_archive_members(upload.file, upload.filename)
+            while True:
+                # Reading an archive's headers is blocking file IO
+                member = await asyncio.to_thread(next, members, None)
+                if member is None:
+                    break
+                yield member, True
+
+    @staticmethod
+    async def batch_progress(db: AsyncSession, batch_id: str, tenant_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Per-status job counts for a batch; None if it doesn't exist (or belongs to another tenant)."""
+        stmt = select(IngestionBatch).where(IngestionBatch.id == batch_id).execution_options(populate_existing=True)
+        if tenant_id is not None:
+            stmt = stmt.where(IngestionBatch.tenant_id == tenant_id)
+        batch = (await db.execute(stmt)).scalar_one_or_none()
+        if batch is None:
+            return None
+
+        counts = {status.value: 0 for status in JobStatus}
+        result = await db.execute(
+            select(IngestionJob.status, func.count())
+            .where(IngestionJob.batch_id == batch_id)
+            .group_by(IngestionJob.status)
+        )
+        for status, count in result.all():
+            counts[JobStatus(status).value] = count
+        done = counts[JobStatus.COMPLETED.value] + counts[JobStatus.FAILED.value]
+        return {
+            "batch_id": batch.id,
+            "total": batch.total_jobs,
+            "counts": counts,
+            "progress": round(done / batch.total_jobs, 4) if batch.total_jobs else 1.0,
+            "finished": done == batch.total_jobs,
+            "skipped": (batch.metadata_json or {}).get("skipped", []),
+            "created_at": batch.created_at,
+            "finished_at": batch.finished_at,
+        }
+
+    @staticmethod
+    async def count_finished_job(db: AsyncSession, batch_id: str) -> bool:
+        """
+        Counts one more of the batch's jobs as final, with a single atomic UPDATE ... RETURNING.
+        True for the job that brings the count to total_jobs: only then is the batch worth finishing.
+        """
+        row = (await db.execute(
+            update(IngestionBatch)
+            .where(IngestionBatch.id == batch_id)
+            .values(done_jobs=IngestionBatch.done_jobs + 1)
+            .returning(IngestionBatch.done_jobs, IngestionBatch.total_jobs)
+        )).one_or_none()
+        await db.commit()
+        return row is not None and row.done_jobs >= row.total_jobs
+
+    @staticmethod
+    async def finish_batch(db: AsyncSession, batch_id: str) -> Optional[Dict[str, Any]]:
+        """Stamps finished_at once no job of the batch is pending or processing. Returns its progress."""
+        progress = await IngestionService.batch_progress(db, batch_id)
+        if progress is not None and progress["finished"] and progress["finished_at"] is None:
+            await db.execute(
+                update(IngestionBatch).where(IngestionBatch.id == batch_id).values(finished_at=datetime.utcnow())
+            )
+            await db.commit()
+            progress = await IngestionService.batch_progress(db, batch_id)
+        return progress
+
 ingestion_service = IngestionService()
@@ -0,0 +1,119 @@
+import uuid
+from typing import Any, Dict, Iterable, Iterator, Optional, Set
+from sqlalchemy import select
+from src.core.database import AsyncSessionLocal
+from src.models.ingestion import IngestionJob, JobStatus
+from src.services.ingestion.dedup import CHUNK_ID_NAMESPACE, chunk_point_id
+
+def document_id_for(tenant_id: str, filename: str) -> str:
+    """Stable identity of a tenant's document across re-uploads of the same filename."""
+    return str(uuid.uuid5(CHUNK_ID_NAMESPACE, f"document:{tenant_id}:{filename}"))
+
+class DocumentVersioning:
+    """
+    Incremental re-ingestion of a document.
+
+    A re-upload of a file is a new version of the same document. Its chunks are diffed against the
+    points indexed for the previous version, by content-derived point ID. Only new or changed
+    chunks are embedded and upserted. Unchanged ones keep their vectors. Chunks that disappeared
+    are released: deleted in one bulk call unless another document shares the point (deduplicated
+    content), and removed from the BM25 stats. The version summary goes into
+    IngestionJob.metadata_json["document"].
+    """
+
+    def __init__(self, indexer=None, store=None, session_factory=None):
+        self._indexer = indexer
+        self._store = store
+        self.session_factory = session_factory or AsyncSessionLocal
+
+    @property
+    def indexer(self):
+        if self._indexer is None:
+            from src.services.ingestion.indexer import chunk_indexer
+            self._indexer = chunk_indexer
+        return self._indexer
+
+    @property
+    def store(self):
+        if self._store is None:
+            from src.services.vector_store import vector_store
+            self._store = vector_store
+        return self._store
+
+    async def previous_version(self, job_id: str) -> Dict[str, Any]:
+        """This job's document identity plus the latest completed version of it (if any)."""
+        async with self.session_factory() as session:
+            job = (await session.execute(
+                select(IngestionJob.tenant_id, IngestionJob.filename).where(IngestionJob.id == job_id)
+            )).one()
+            previous = (await session.execute(
+                select(IngestionJob.id, IngestionJob.metadata_json)
+                .where(
+                    IngestionJob.tenant_id == job.tenant_id,
+                    IngestionJob.filename == job.filename,
+                    IngestionJob.status == JobStatus.COMPLETED,
+                    IngestionJob.id != job_id
+                )
+                .order_by(IngestionJob.updated_at.desc())
+                .limit(1)
+            )).first()
+
+        result = {"filename": job.filename, "previous": None}
+        if previous is not None:
+            document = (previous.metadata_json or {}).get("document") or {}
+            result["previous"] = {
+                "job_id": previous.id,
+                # Jobs indexed before versioning count as version 1
+                "version": document.get("version", 1),
+                "chunks": document.get("chunks"),
+            }
+        return result
+
+    async def index(
+        self,
+        job_id: str,
+        tenant_id: str,
+        chunks: Iterable[str],
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Indexes `chunks` as the next version of the job's document. Returns indexing + version stats."""
+        identity = await self.previous_version(job_id)
+        document_id = document_id_for(tenant_id, identity["filename"])
+        previous_ids = await self.store.document_point_ids(tenant_id, document_id)
+
+        current_ids: Set[str] = set()
+
+        def track(stream: Iterable[str]) -> Iterator[str]:
+            for chunk in stream:
+                current_ids.add(chunk_point_id(tenant_id, chunk))
+                yield chunk
+
+        stats = await self.indexer.index(
+            tenant_id,
+            track(chunks),
+            metadata=metadata,
+            document_id=document_id,
+            previous_ids=previous_ids
+        )
+        removed = previous_ids - current_ids
+        deleted = await self.store.release_document(tenant_id, list(removed), document_id)
+        if deleted and self.indexer.hybrid:
+            from src.services.sparse_encoder import sparse_encoder
+            await sparse_encoder.forget_documents(tenant_id, deleted.values())
+
+        previous = identity["previous"]
+        return {
+            "indexing": stats,
+            "document": {
+                "document_id": document_id,
+                "version": (previous["version"] if previous else 0) + 1,
+                "chunks": len(current_ids),
+                "added": stats["chunks"],
+                "unchanged": stats["unchanged"],
+                "removed": len(removed),
+                "deleted": len(deleted),
+                "previous": previous,
+            }
+        }
+
+document_versioning = DocumentVersioning()
@@ -1,24 +1,167 @@
-from presidio_analyzer import AnalyzerEngine
-from presidio_anonymizer import AnonymizerEngine
+import logging
+import multiprocessing
+import re
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
+from src.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+ENTITIES = ["PERSON", "PHONE_NUMBER", "EMAIL_ADDRESS", "LOCATION"]
+
+# Cheap prefilter: a segment can only contain one of ENTITIES if it has an "@", a long-ish digit run,
+# or a name-like capitalized word. Inside a sentence any capitalized word counts ("raised by Alice");
+# at the start of a sentence or line only one that isn't a common opener and never appears in
+# lowercase in the segment ("Smith approved it." counts, "The ..." and "Refunds ... refunds" don't).
+_EMAIL_OR_NUMBER = re.compile(r"@|\d[\d\s().-]{5,}\d")
+_INNER_CAPITALIZED = re.compile(r"[^\s.!?][^\S\n]+[A-Z][A-Za-z][A-Za-z'-]*")
+_INITIAL_CAPITALIZED = re.compile(r"(?:^|[.!?]\s+|\n\s*)([A-Z][A-Za-z][A-Za-z'-]*)")
+_LOWERCASE_WORD = re.compile(r"\b[a-z][a-z'-]*")
+_SENTENCE_OPENERS = frozenset("""
+    a about after all also although an and any as at because before both but by can could do does each
+    every few for from he her here his how however if in instead it its let many may more most my no
+    not now of on once one only or other our please she since so some such that the their then there
+    these they this those though thus to today under unless until we what when where whether which
+    while who why will with without would yes yet you your
+""".split())
+_SENTENCE_END = re.compile(r"[.!?]\s|\n")
+
+def has_pii_candidates(text: str) -> bool:
+    if _EMAIL_OR_NUMBER.search(text) or _INNER_CAPITALIZED.search(text):
+        return True
+    lowercase = None
+    for match in _INITIAL_CAPITALIZED.finditer(text):
+        word = match.group(1).lower()
+        if word in _SENTENCE_OPENERS:
+            continue
+        if lowercase is None:
+            lowercase = set(_LOWERCASE_WORD.findall(text))
+        if word not in lowercase:
+            return True
+    return False
+
+def process_pool_can_start() -> bool:
+    """False in daemonic processes, such as Celery prefork children, which may not start children."""
+    if multiprocessing.current_process().daemon:
+        return False
+    try:
+        from billiard.process import current_process
+    except ImportError:
+        return True
+    return not current_process().daemon
+
+def split_segments(text: str, max_chars: int) -> List[str]:
+    """Splits text into segments of at most ~max_chars, cut at sentence or line ends."""
+    segments = []
+    start = 0
+    while len(text) - start > max_chars:
+        window = text[start:start + max_chars]
+        cut = 0
+        for match in _SENTENCE_END.finditer(window):
+            cut = match.end()
+        if cut == 0:
+            cut = window.rfind(" ") + 1 or max_chars
+        segments.append(text[start:start + cut])
+        start += cut
+    if start < len(text):
+        segments.append(text[start:])
+    return segments
+
+class _Engine:
+    """Presidio analyzer + anonymizer, loaded on first use (once per process)."""
 
-class PIIScrubber:
     def __init__(self):
+        from presidio_analyzer import AnalyzerEngine
+        from presidio_anonymizer import AnonymizerEngine
         self.analyzer = AnalyzerEngine()
         self.anonymizer = AnonymizerEngine()
 
-    def scrub_text(self, text: str) -> str:
-        """
-        Analyze and anonymize PII in the given text.
-        """
+    def scrub(self, text: str) -> str:
         results = self.analyzer.analyze(
-            text=text, 
-            entities=["PERSON", "PHONE_NUMBER", "EMAIL_ADDRESS", "LOCATION"], 
+            text=text,
+            entities=ENTITIES,
             language="en"
         )
         anonymized_result = self.anonymizer.anonymize(
-            text=text, 
+            text=text,
             analyzer_results=results
         )
         return anonymized_result.text
 
+_engine: Optional[_Engine] = None
+
+def _get_engine() -> _Engine:
+    global _engine
+    if _engine is None:
+        _engine = _Engine()
+    return _engine
+
+def _scrub_segment(segment: str) -> str:
+    """Runs in the calling process or a pool process; each builds its own engine lazily."""
+    return _get_engine().scrub(segment)
+
+class PIIScrubber:
+    def __init__(
+        self,
+        processes: Optional[int] = None,
+        segment_size: Optional[int] = None,
+        parallel_min_chars: Optional[int] = None
+    ):
+        self.processes = settings.PII_SCRUB_PROCESSES if processes is None else processes
+        self.segment_size = segment_size or settings.PII_SCRUB_SEGMENT_SIZE
+        self.parallel_min_chars = settings.PII_SCRUB_PARALLEL_MIN_CHARS if parallel_min_chars is None else parallel_min_chars
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_disabled = False
+
+    @property
+    def engine_loaded(self) -> bool:
+        return _engine is not None
+
+    def scrub_text(self, text: str) -> str:
+        """
+        Analyze and anonymize PII in the given text.
+        Segments without candidate entities skip the NLP analyzer entirely.
+        """
+        segments = split_segments(text, self.segment_size)
+        todo = [i for i, segment in enumerate(segments) if has_pii_candidates(segment)]
+        if not todo:
+            return text
+
+        scrubbed = None
+        if self.processes > 1 and len(todo) > 1 and len(text) >= self.parallel_min_chars:
+            scrubbed = self._scrub_parallel([segments[i] for i in todo])
+        if scrubbed is None:
+            scrubbed = [_scrub_segment(segments[i]) for i in todo]
+
+        for i, result in zip(todo, scrubbed):
+            segments[i] = result
+        return "".join(segments)
+
+    def _scrub_parallel(self, segments: List[str]) -> Optional[List[str]]:
+        if self._pool_disabled:
+            return None
+        if self._pool is None and not process_pool_can_start():
+            logger.warning(
+                "PII_SCRUB_PROCESSES > 1 needs a non-daemon worker process (e.g. celery --pool=threads); "
+                "scrubbing serially"
+            )
+            self._pool_disabled = True
+            return None
+        try:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.processes)
+            chunksize = max(1, len(segments) // (self.processes * 4))
+            return list(self._pool.map(_scrub_segment, segments, chunksize=chunksize))
+        except (AssertionError, OSError, RuntimeError) as e:
+            # e.g. no semaphores on this platform; stay serial from here on
+            logger.warning(f"PII scrub process pool unavailable, scrubbing serially: {e}")
+            self._pool_disabled = True
+            self.shutdown()
+            return None
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
 pii_scrubber = PIIScrubber()
@@ -1,14 +1,48 @@
-import hashlib
-from typing import List, Dict, Any, AsyncGenerator
+import asyncio
+import logging
+import time
+from typing import List, Dict, Any, AsyncGenerator, Awaitable, TypeVar
 from src.services.factory import LLMFactory, EmbedderFactory
 from src.services.vector_store import vector_store
 from src.services.reranker import reranker
 from src.services.cache import semantic_cache
+from src.services.audit_logger import audit_logger
+from src.services.sparse_encoder import sparse_encoder
+from src.services.conversation_memory import conversation_memory
+from src.services.conversation_state import conversation_state
+from src.services.context_packer import context_packer
+from src.core.config import settings
+import src.services.providers  # noqa: F401 (registers providers)
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+class StageTimings:
+    """Collects per-stage wall-clock timings (ms) for a single query."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+
+    async def measure(self, name: str, awaitable: Awaitable[T]) -> T:
+        began = time.perf_counter()
+        try:
+            return await awaitable
+        finally:
+            self.stages[name] = round((time.perf_counter() - began) * 1000, 2)
+
+    def mark(self, name: str):
+        """Records the time elapsed since the start of the query (e.g. time to first token)."""
+        self.stages[name] = round((time.perf_counter() - self.started) * 1000, 2)
+
+    def as_dict(self) -> Dict[str, float]:
+        return {**self.stages, "total": round((time.perf_counter() - self.started) * 1000, 2)}
 
 class RAGOrchestrator:
     def __init__(self):
         self.llm = LLMFactory.get_provider()
-        self.embedder = EmbedderFactory.get_provider()
+        self.embedder = EmbedderFactory.get_cached_provider()
 
     async def query(
         self, 
@@ -18,92 +52,204 @@ class RAGOrchestrator:
         db,  # AsyncSession
         stream: bool = True
     ) -> AsyncGenerator[Dict[str, Any], None]:
-        import uuid
-        from src.models.chat import Message, Conversation
-        from sqlalchemy import select
-
-        # 1. Fetch or initialize conversation context
-        history_msgs = []
-        stmt = select(Message).where(Message.conversation_id == conversation_id).order_by(Message.created_at.asc()).limit(10)
-        result = await db.execute(stmt)
-        history_msgs = result.scalars().all()
-
-        # 2. Save User Message
-        user_msg_id = str(uuid.uuid4())
-        user_msg = Message(
-            id=user_msg_id,
-            conversation_id=conversation_id,
-            role="user",
-            content=query_text
-        )
-        db.add(user_msg)
-        await db.commit()
+        """
+        Runs the query as a small dependency graph instead of a serial chain:
 
-        # 3. Generate query embedding
-        query_vector = await self.embedder.embed_text(query_text)
-        query_hash = hashlib.sha256(query_text.encode()).hexdigest()
-        
-        # 4. Audit Log - Query Start
-        from src.services.audit_logger import audit_logger
-        await audit_logger.log(tenant_id, action="retrieval_query", payload={"query": query_text, "conversation_id": conversation_id})
-
-        # 5. Check semantic cache
-        cached_response = await semantic_cache.get(tenant_id, query_hash)
-        if cached_response:
-            yield {"type": "cache_hit", "content": cached_response}
-            return
-
-        # 6. Retrieve context
-        hits = await vector_store.search(tenant_id, query_vector, limit=20)
-        
-        # 7. Rerank
-        documents = [hit["payload"] for hit in hits]
-        reranked_docs = await reranker.rerank(query_text, documents, top_k=5)
-        
-        # 8. Construct Context & Prompt
-        context_str = self._format_context(reranked_docs)
-        
-        # Inject Chat History into Prompt
-        history_str = "\n".join([f"{m.role}: {m.content}" for m in history_msgs])
-        
-        system_prompt = (
-            "You are a helpful assistant. Use the provided context to answer the query. "
-            "Use inline citations in the format [1], [2], etc. "
-            "Maintain a conversational tone and acknowledge previous context if relevant."
+            exact cache check ──► (hit) replay
+                 │
+                 ├─► history fetch ─► user message persist   (hot tier)
+                 ├─► audit log                               (own session)
+                 └─► embed ─► semantic cache ─► search ─► rerank ─┐
+                                                   history ───────┴─► generate
+
+        Independent branches run concurrently; cheap short-circuits run first.
+
+        Events: `content` (answer chunks), `references`, `source_material`, `timings`. With
+        stream=False the answer is generated in one call and sent as a single `content` event.
+        A cache hit replays the cached result as the same events, marked `"cached": true`.
+        """
+        timings = StageTimings()
+
+        # 1. Cheapest short-circuit: exact repeat of a cached query (no embedding needed)
+        cached_response = await timings.measure("cache_exact", semantic_cache.get_exact(tenant_id, query_text))
+
+        # 2. Side branches that every request needs, started concurrently
+        history_task = asyncio.create_task(
+            timings.measure("history", self._load_history_and_persist(db, conversation_id, query_text))
         )
-        
-        prompt = f"Context Material:\n{context_str}\n\nRecent Chat History:\n{history_str}\n\nUser Query: {query_text}"
-        
-        # 9. Generate Response
-        full_answer = ""
-        async for chunk in self.llm.generate_stream(prompt, system_prompt=system_prompt):
-            full_answer += chunk
-            yield {"type": "content", "chunk": chunk}
-            
-        # 10. Save Assistant Message
-        assistant_msg_id = str(uuid.uuid4())
-        assistant_msg = Message(
-            id=assistant_msg_id,
-            conversation_id=conversation_id,
-            role="assistant",
-            content=full_answer,
-            metadata_json={"references": self._get_references(reranked_docs)}
+        audit_task = asyncio.create_task(
+            timings.measure("audit", audit_logger.log(
+                tenant_id, action="retrieval_query", payload={"query": query_text, "conversation_id": conversation_id}
+            ))
         )
-        db.add(assistant_msg)
-        await db.commit()
 
-        # 11. Shadow Evaluation (Togglable)
-        await self._handle_evaluation(tenant_id, query_text, reranked_docs, full_answer)
+        sparse_task = None
+        try:
+            if cached_response is None:
+                # 3. Embedding -> semantic cache (lexical query encoding runs alongside)
+                if settings.HYBRID_SEARCH_ENABLED:
+                    sparse_task = asyncio.create_task(
+                        timings.measure("sparse_encode", self._encode_sparse_query(tenant_id, query_text))
+                    )
+                query_vector = await timings.measure("embed", self.embedder.embed_text(query_text))
+                cached_response = await timings.measure("cache_semantic", semantic_cache.get(tenant_id, query_vector))
+
+            if cached_response:
+                if sparse_task:
+                    sparse_task.cancel()
+                timings.mark("ttft")
+                result = self._normalize_result(cached_response)
+                for event in self._result_events(result, cached=True):
+                    yield event
+                await asyncio.gather(history_task, audit_task)
+                await timings.measure("persist_answer", conversation_state.append_message(
+                    conversation_id, "assistant", result["answer"], metadata_json={"references": result["references"]}
+                ))
+                yield self._timings_event(tenant_id, timings)
+                return
+
+            # 4. Retrieve (hybrid dense + sparse with RRF) & rerank, overlapping the history/audit branches
+            sparse_vector, fusion_weights = await sparse_task if sparse_task else (None, None)
+            hits = await timings.measure("search", vector_store.search(
+                tenant_id,
+                query_vector,
+                limit=settings.RETRIEVAL_CANDIDATE_LIMIT,
+                sparse_vector=sparse_vector,
+                fusion_weights=fusion_weights,
+                with_vectors=reranker.needs_vectors
+            ))
+            documents = [{**hit["payload"], "point_id": hit["id"], "vector": hit.get("vector")} for hit in hits]
+            reranked_docs = await timings.measure(
+                "rerank", reranker.rerank(
+                    query_text, documents, top_k=settings.CONTEXT_CANDIDATES, query_vector=query_vector
+                )
+            )
+            # Merge neighbouring chunks, drop near-duplicates, fill the token budget best-first
+            reranked_docs = context_packer.pack(reranked_docs)
+
+            # 5. Construct Context & Prompt
+            memory = await history_task
+            context_str = self._format_context(reranked_docs)
 
-        # 12. Send References
+            # Inject Chat History into Prompt: summary of older turns + recent turns, token-budgeted
+            history_str = memory.format_turns()
+            if memory.summary:
+                history_str = f"Summary of earlier conversation: {memory.summary}\n\n{history_str}"
+
+            system_prompt = (
+                "You are a helpful assistant. Use the provided context to answer the query. "
+                "Use inline citations in the format [1], [2], etc. "
+                "Maintain a conversational tone and acknowledge previous context if relevant."
+            )
+
+            prompt = f"Context Material:\n{context_str}\n\nRecent Chat History:\n{history_str}\n\nUser Query: {query_text}"
+
+            # 6. Generate Response
+            if stream:
+                full_answer = ""
+                generation_started = time.perf_counter()
+                async for chunk in self.llm.generate_stream(prompt, system_prompt=system_prompt):
+                    if not full_answer:
+                        timings.mark("ttft")
+                    full_answer += chunk
+                    yield {"type": "content", "chunk": chunk}
+                timings.stages["generate"] = round((time.perf_counter() - generation_started) * 1000, 2)
+            else:
+                full_answer = await timings.measure("generate", self.llm.generate(prompt, system_prompt=system_prompt))
+                timings.mark("ttft")
+                yield {"type": "content", "chunk": full_answer}
+
+            await audit_task
+        except BaseException:
+            for task in (history_task, audit_task, sparse_task):
+                if task and not task.done():
+                    task.cancel()
+            raise
+
+        # 7. Save Assistant Message (hot tier; written to the database behind)
         references = self._get_references(reranked_docs)
+        await timings.measure("persist_answer", conversation_state.append_message(
+            conversation_id, "assistant", full_answer, metadata_json={"references": references}
+        ))
+        # Fold turns leaving the recent window into the rolling summary, off the request path
+        conversation_memory.schedule_refresh(conversation_id)
+
+        # 8. Send References
         yield {"type": "references", "content": references}
-        
+
         source_material = self._get_source_material(reranked_docs)
         yield {"type": "source_material", "content": source_material}
-        
-        # 9. Cache the (non-streaming) result if needed
-        # await semantic_cache.set(tenant_id, query_hash, {"answer": full_answer})
+        result = {"answer": full_answer, "references": references, "sources": source_material}
+
+        # 9. Shadow Evaluation (Togglable) & cache the complete result, after the client has everything
+        await asyncio.gather(
+            self._handle_evaluation(tenant_id, query_text, reranked_docs, full_answer),
+            semantic_cache.set(
+                tenant_id,
+                query_text,
+                query_vector,
+                result
+            )
+        )
+        yield self._timings_event(tenant_id, timings)
+
+    async def answer(self, tenant_id: str, query_text: str, conversation_id: str, db) -> Dict[str, Any]:
+        """
+        Non-streaming query: the complete result as one document,
+        {"answer", "references", "sources", "cached"} - the schema SemanticCache stores.
+        """
+        result = {"answer": "", "references": [], "sources": [], "cached": False}
+        async for event in self.query(tenant_id, query_text, conversation_id, db, stream=False):
+            if event["type"] == "content":
+                result["answer"] += event["chunk"]
+                result["cached"] = event.get("cached", False)
+            elif event["type"] == "references":
+                result["references"] = event["content"]
+            elif event["type"] == "source_material":
+                result["sources"] = event["content"]
+        return result
+
+    @staticmethod
+    def _normalize_result(response: Dict[str, Any]) -> Dict[str, Any]:
+        """A cached result in the current schema (entries written before `sources` have `source_material`)."""
+        return {
+            "answer": response.get("answer", ""),
+            "references": response.get("references", []),
+            "sources": response.get("sources", response.get("source_material", [])),
+        }
+
+    @staticmethod
+    def _result_events(result: Dict[str, Any], cached: bool = False) -> List[Dict[str, Any]]:
+        """A complete result as the events a live query streams."""
+        return [
+            {"type": "content", "chunk": result["answer"], "cached": cached},
+            {"type": "references", "content": result["references"]},
+            {"type": "source_material", "content": result["sources"]},
+        ]
+
+    async def _load_history_and_persist(self, db, conversation_id: str, query_text: str):
+        """Loads the conversation memory, then records the new user message (hot tier, written behind)."""
+        memory = await conversation_memory.load(db, conversation_id)
+        await conversation_state.append_message(conversation_id, "user", query_text)
+        return memory
+
+    async def _encode_sparse_query(self, tenant_id: str, query_text: str):
+        """BM25-style query vector plus the tenant's (dense, sparse) fusion weights."""
+        # Per-tenant override, e.g. HSET retrieval:<tenant_id> dense_weight 0.7 sparse_weight 1.3
+        sparse_vector, weights = await asyncio.gather(
+            sparse_encoder.encode_query_for_tenant(tenant_id, query_text),
+            semantic_cache.redis.hmget(f"retrieval:{tenant_id}", ["dense_weight", "sparse_weight"])
+        )
+        dense_weight, sparse_weight = weights
+        return sparse_vector, (
+            float(dense_weight) if dense_weight is not None else settings.HYBRID_DENSE_WEIGHT,
+            float(sparse_weight) if sparse_weight is not None else settings.HYBRID_SPARSE_WEIGHT,
+        )
+
+    def _timings_event(self, tenant_id: str, timings: StageTimings) -> Dict[str, Any]:
+        stages = timings.as_dict()
+        logger.info(f"Query timings for tenant {tenant_id}: {stages}")
+        return {"type": "timings", "content": stages}
 
     async def _handle_evaluation(
         self, 
@@ -115,7 +261,6 @@ class RAGOrchestrator:
         """
         Togglable evaluation pipeline.
         """
-        from src.services.cache import semantic_cache
         # Check Redis for a feature flag: eval:tenant_id
         is_eval_on = await semantic_cache.redis.get(f"eval:{tenant_id}")
         
@@ -140,11 +285,13 @@ class RAGOrchestrator:
         return "\n\n".join(context_parts)
 
     def _get_references(self, docs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        # Same order as _format_context, so reference i is what the answer cites as [i]
         return [
             {
                 "index": i + 1,
                 "text": doc.get("text", ""),
-                "metadata": doc.get("metadata", {})
+                "metadata": doc.get("metadata", {}),
+                "chunk_indices": doc.get("chunk_indices", [])
             } for i, doc in enumerate(docs)
         ]
 
@@ -1,16 +1,158 @@
-from typing import List, Dict, Any
+import hashlib
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Tuple
 from abc import ABC, abstractmethod
+import numpy as np
+from src.services.sparse_encoder import tokenize
+from src.core.config import settings
 
 class BaseReranker(ABC):
+    # Whether documents should be retrieved together with their dense vectors
+    needs_vectors: bool = False
+
     @abstractmethod
-    async def rerank(self, query: str, documents: List[Dict[str, Any]], top_k: int = 5) -> List[Dict[str, Any]]:
+    async def rerank(
+        self,
+        query: str,
+        documents: List[Dict[str, Any]],
+        top_k: int = 5,
+        query_vector: Optional[List[float]] = None
+    ) -> List[Dict[str, Any]]:
         pass
 
 class MockReranker(BaseReranker):
-    async def rerank(self, query: str, documents: List[Dict[str, Any]], top_k: int = 5) -> List[Dict[str, Any]]:
-        # In a real implementation:
-        # Use a Cross-Encoder (e.g., BGE-Reranker) to score pairs of (query, doc_text)
+    async def rerank(
+        self,
+        query: str,
+        documents: List[Dict[str, Any]],
+        top_k: int = 5,
+        query_vector: Optional[List[float]] = None
+    ) -> List[Dict[str, Any]]:
         # For mock, we just return the top_k as they are
         return documents[:top_k]
 
-reranker = MockReranker()
+class LocalReranker(BaseReranker):
+    """
+    CPU-only reranker, no network access.
+
+    Scores every (query, document) pair in one vectorized pass as a blend of
+      - lexical: mean BM25-saturated frequency of the query terms in the document, in [0, 1)
+      - embedding: cosine similarity of the query vector and the document's dense vector
+        (documents carry it under "vector" when retrieved with vectors)
+    Scores depend only on the pair, so they are cached per (query hash, chunk id).
+    Top-k selection uses argpartition instead of a full sort.
+    """
+
+    def __init__(
+        self,
+        lexical_weight: Optional[float] = None,
+        embedding_weight: Optional[float] = None,
+        cache_size: Optional[int] = None,
+        k1: float = 1.2,
+        b: float = 0.75
+    ):
+        self.lexical_weight = settings.RERANK_LEXICAL_WEIGHT if lexical_weight is None else lexical_weight
+        self.embedding_weight = settings.RERANK_EMBEDDING_WEIGHT if embedding_weight is None else embedding_weight
+        self.cache_size = settings.RERANK_SCORE_CACHE_SIZE if cache_size is None else cache_size
+        self.k1 = k1
+        self.b = b
+        self._cache: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+
+    @property
+    def needs_vectors(self) -> bool:
+        return self.embedding_weight > 0
+
+    async def rerank(
+        self,
+        query: str,
+        documents: List[Dict[str, Any]],
+        top_k: int = 5,
+        query_vector: Optional[List[float]] = None
+    ) -> List[Dict[str, Any]]:
+        if not documents or top_k <= 0:
+            return []
+        # Tiny rank prior so ties keep the first-stage order
+        scores = self.score(query, documents, query_vector) - np.arange(len(documents)) * 1e-6
+        k = min(top_k, len(documents))
+        # Partial selection of the k best, then order only those k
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [documents[i] for i in top]
+
+    def score(self, query: str, documents: List[Dict[str, Any]], query_vector: Optional[List[float]] = None) -> np.ndarray:
+        query_hash = hashlib.sha256(query.encode("utf-8")).hexdigest()
+        use_vectors = query_vector is not None and self.embedding_weight > 0
+        scores = np.zeros(len(documents), dtype=np.float32)
+
+        misses = []
+        for i, doc in enumerate(documents):
+            key = self._cache_key(query_hash, doc, use_vectors)
+            cached = self._cache.get(key) if key else None
+            if cached is None:
+                misses.append(i)
+            else:
+                self._cache.move_to_end(key)
+                scores[i] = cached
+        if not misses:
+            return scores
+
+        batch = [documents[i] for i in misses]
+        fresh = self.lexical_weight * self._lexical_scores(query, batch)
+        if use_vectors:
+            fresh += self.embedding_weight * self._embedding_scores(query_vector, batch)
+        scores[misses] = fresh
+
+        for i, value in zip(misses, fresh):
+            key = self._cache_key(query_hash, documents[i], use_vectors)
+            if key and self.cache_size > 0:
+                self._cache[key] = float(value)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return scores
+
+    @staticmethod
+    def _cache_key(query_hash: str, doc: Dict[str, Any], use_vectors: bool) -> Optional[Tuple[str, str]]:
+        chunk_id = doc.get("point_id")
+        if chunk_id is None:
+            return None
+        return (query_hash, f"{chunk_id}:{int(use_vectors)}")
+
+    def _lexical_scores(self, query: str, documents: List[Dict[str, Any]]) -> np.ndarray:
+        query_terms = list(dict.fromkeys(tokenize(query)))
+        if not query_terms:
+            return np.zeros(len(documents), dtype=np.float32)
+        column = {term: j for j, term in enumerate(query_terms)}
+
+        # Document x query-term frequency matrix; only query terms matter, so it stays tiny
+        tf = np.zeros((len(documents), len(query_terms)), dtype=np.float32)
+        lengths = np.zeros(len(documents), dtype=np.float32)
+        for i, doc in enumerate(documents):
+            terms = tokenize(doc.get("text", ""))
+            lengths[i] = len(terms)
+            for term in terms:
+                j = column.get(term)
+                if j is not None:
+                    tf[i, j] += 1
+
+        norm = self.k1 * (1 - self.b + self.b * lengths / settings.SPARSE_BM25_AVG_DOC_LEN)
+        saturated = tf / (tf + norm[:, None])
+        return saturated.mean(axis=1)
+
+    @staticmethod
+    def _embedding_scores(query_vector: List[float], documents: List[Dict[str, Any]]) -> np.ndarray:
+        q = np.asarray(query_vector, dtype=np.float32)
+        scores = np.zeros(len(documents), dtype=np.float32)
+        rows = [i for i, doc in enumerate(documents) if doc.get("vector") is not None]
+        if not rows:
+            return scores
+        matrix = np.asarray([documents[i]["vector"] for i in rows], dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1) * (np.linalg.norm(q) or 1.0)
+        scores[rows] = matrix @ q / np.where(norms == 0, 1.0, norms)
+        return scores
+
+def get_reranker() -> BaseReranker:
+    if settings.RERANKER_PROVIDER == "mock":
+        return MockReranker()
+    return LocalReranker()
+
+reranker = get_reranker()
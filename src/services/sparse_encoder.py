@@ -0,0 +1,97 @@
+import math
+import re
+import zlib
+from collections import Counter
+from typing import Dict, List, Iterable, Optional
+from src.core.config import settings
+
+# Keeps identifiers such as "ERR-4012", "SKU_1138" or "v2.3.1" as single terms
+_TOKEN_PATTERN = re.compile(r"\w+(?:[-.]\w+)*")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the to was were will with".split()
+)
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in _TOKEN_PATTERN.findall(text.lower()) if t not in _STOPWORDS]
+
+def term_index(term: str) -> int:
+    """Stable (cross-process) term id for the sparse vector space."""
+    return zlib.crc32(term.encode("utf-8")) & 0x7FFFFFFF
+
+class SparseEncoder:
+    """
+    BM25-style sparse vectors, split so the dot product of a query and a document vector is the BM25 score:
+    documents carry the saturated, length-normalized term frequency; queries carry the tenant's IDF,
+    computed from per-tenant document frequencies kept in Redis and updated at ingest time.
+    """
+
+    def __init__(self, k1: Optional[float] = None, b: Optional[float] = None, avg_doc_len: Optional[float] = None):
+        self.k1 = settings.SPARSE_BM25_K1 if k1 is None else k1
+        self.b = settings.SPARSE_BM25_B if b is None else b
+        self.avg_doc_len = avg_doc_len or settings.SPARSE_BM25_AVG_DOC_LEN
+        self._redis = None
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            import redis.asyncio as redis
+            self._redis = redis.from_url(settings.REDIS_URL, decode_responses=True)
+        return self._redis
+
+    def encode_document(self, text: str) -> Dict[int, float]:
+        terms = tokenize(text)
+        if not terms:
+            return {}
+        norm = self.k1 * (1 - self.b + self.b * len(terms) / self.avg_doc_len)
+        vector: Dict[int, float] = {}
+        for term, tf in Counter(terms).items():
+            index = term_index(term)
+            vector[index] = vector.get(index, 0.0) + tf * (self.k1 + 1) / (tf + norm)
+        return vector
+
+    def idf(self, doc_count: int, doc_freq: int) -> float:
+        return math.log(1 + (doc_count - doc_freq + 0.5) / (doc_freq + 0.5))
+
+    def encode_query(self, text: str, doc_count: int = 0, doc_freqs: Optional[Dict[str, int]] = None) -> Dict[int, float]:
+        doc_freqs = doc_freqs or {}
+        vector: Dict[int, float] = {}
+        for term in set(tokenize(text)):
+            # Without corpus stats every term weighs the same
+            weight = self.idf(doc_count, doc_freqs.get(term, 0)) if doc_count else 1.0
+            vector[term_index(term)] = weight
+        return vector
+
+    async def encode_query_for_tenant(self, tenant_id: str, text: str) -> Dict[int, float]:
+        terms = sorted(set(tokenize(text)))
+        if not terms:
+            return {}
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.get(f"bm25:{tenant_id}:docs")
+        pipe.hmget(f"bm25:{tenant_id}:df", terms)
+        doc_count, freqs = await pipe.execute()
+        doc_freqs = {term: int(f) for term, f in zip(terms, freqs) if f}
+        return self.encode_query(text, int(doc_count or 0), doc_freqs)
+
+    async def record_documents(self, tenant_id: str, texts: Iterable[str]):
+        """Updates the tenant's document-frequency stats for a batch of newly indexed chunks."""
+        await self._adjust_documents(tenant_id, texts, 1)
+
+    async def forget_documents(self, tenant_id: str, texts: Iterable[str]):
+        """Reverses `record_documents` for chunks deleted from the index."""
+        await self._adjust_documents(tenant_id, texts, -1)
+
+    async def _adjust_documents(self, tenant_id: str, texts: Iterable[str], sign: int):
+        doc_freqs: Counter = Counter()
+        docs = 0
+        for text in texts:
+            docs += 1
+            doc_freqs.update(set(tokenize(text)))
+        if not docs:
+            return
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.incrby(f"bm25:{tenant_id}:docs", sign * docs)
+        for term, freq in doc_freqs.items():
+            pipe.hincrby(f"bm25:{tenant_id}:df", term, sign * freq)
+        await pipe.execute()
+
+sparse_encoder = SparseEncoder()
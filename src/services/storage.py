@@ -1,15 +1,79 @@
+import asyncio
+import hashlib
 import os
-import shutil
+import uuid
 import boto3
 from abc import ABC, abstractmethod
-from typing import Optional
+from typing import AsyncIterator, Dict, Optional
 from fastapi import UploadFile
 from src.core.config import settings
 
+class UploadTooLargeError(ValueError):
+    def __init__(self, limit: int):
+        super().__init__(f"File exceeds the upload limit of {limit} bytes")
+        self.limit = limit
+
+class StoredFile:
+    """Where an upload ended up, plus the size and SHA-256 measured while streaming it."""
+
+    def __init__(self, path: str, size: int, sha256: str):
+        self.path = path
+        self.size = size
+        self.sha256 = sha256
+
+    def as_dict(self) -> Dict[str, object]:
+        return {"bytes": self.size, "sha256": self.sha256}
+
+class UploadStream:
+    """
+    Reads an upload body in fixed-size parts without blocking the event loop, hashing and counting
+    bytes on the way through, and stops as soon as the body exceeds `max_bytes`.
+
+    By the time this runs, Starlette has already spooled the multipart body to a temporary file
+    (the Content-Length check in src.main bounds that), so this is a second pass over local disk,
+    not the network read itself.
+    """
+
+    def __init__(self, file: UploadFile, part_size: Optional[int] = None, max_bytes: Optional[int] = None):
+        self.file = file
+        self.part_size = part_size or settings.UPLOAD_PART_SIZE
+        self.max_bytes = settings.UPLOAD_MAX_BYTES if max_bytes is None else max_bytes
+        self.size = 0
+        self._sha256 = hashlib.sha256()
+
+    @property
+    def sha256(self) -> str:
+        return self._sha256.hexdigest()
+
+    async def parts(self) -> AsyncIterator[bytes]:
+        declared = getattr(self.file, "size", None)
+        if self.max_bytes and declared and declared > self.max_bytes:
+            raise UploadTooLargeError(self.max_bytes)
+        while True:
+            part = await self._read_part()
+            if not part:
+                return
+            self.size += len(part)
+            if self.max_bytes and self.size > self.max_bytes:
+                raise UploadTooLargeError(self.max_bytes)
+            # hashlib releases the GIL on large buffers, so this runs truly off-loop
+            await asyncio.to_thread(self._sha256.update, part)
+            yield part
+
+    async def _read_part(self) -> bytes:
+        # read(n) may return less than n; fill whole parts (S3 requires >= 5 MiB for all but the last)
+        buffer = bytearray()
+        while len(buffer) < self.part_size:
+            data = await self.file.read(self.part_size - len(buffer))
+            if not data:
+                break
+            buffer += data
+        return bytes(buffer)
+
 class BaseStorage(ABC):
     @abstractmethod
-    async def upload(self, file: UploadFile, tenant_id: str) -> str:
-        """Uploads a file and returns the accessible URL or path."""
+    async def upload(self, file: UploadFile, tenant_id: str) -> StoredFile:
+        """Streams a file to storage and returns its accessible URL or path, size and SHA-256."""
         pass
 
     @abstractmethod
@@ -18,49 +82,136 @@ class BaseStorage(ABC):
         pass
 
 class LocalStorage(BaseStorage):
-    def __init__(self, base_dir: str = "storage"):
-        self.base_dir = base_dir
+    def __init__(self, base_dir: Optional[str] = None, part_size: Optional[int] = None, max_bytes: Optional[int] = None):
+        self.base_dir = base_dir or settings.LOCAL_STORAGE_DIR
+        self.part_size = part_size
+        self.max_bytes = max_bytes
         os.makedirs(self.base_dir, exist_ok=True)
 
-    async def upload(self, file: UploadFile, tenant_id: str) -> str:
+    async def upload(self, file: UploadFile, tenant_id: str) -> StoredFile:
         tenant_dir = os.path.join(self.base_dir, tenant_id)
         os.makedirs(tenant_dir, exist_ok=True)
-        
-        file_path = os.path.join(tenant_dir, file.filename)
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-            
-        return file_path
+
+        file_path = os.path.join(tenant_dir, os.path.basename(file.filename))
+        # Written under a temporary name and renamed at the end: readers never see a partial file
+        temp_path = f"{file_path}.part-{uuid.uuid4().hex}"
+        stream = UploadStream(file, self.part_size, self.max_bytes)
+        buffer = await asyncio.to_thread(open, temp_path, "wb")
+        try:
+            async for part in stream.parts():
+                await asyncio.to_thread(buffer.write, part)
+            await asyncio.to_thread(buffer.close)
+            os.replace(temp_path, file_path)
+        except BaseException:
+            buffer.close()
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+        return StoredFile(file_path, stream.size, stream.sha256)
 
     def get_path(self, identifier: str) -> str:
         return identifier
 
 class S3Storage(BaseStorage):
-    def __init__(self):
-        self.s3_client = boto3.client(
-            "s3",
-            aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-            aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-            region_name=settings.AWS_REGION
-        )
+    def __init__(
+        self,
+        s3_client=None,
+        part_size: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        concurrency: Optional[int] = None
+    ):
+        self.concurrency = max(1, concurrency or settings.S3_UPLOAD_CONCURRENCY)
+        if s3_client is None:
+            from botocore.config import Config
+            s3_client = boto3.client(
+                "s3",
+                aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+                aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+                region_name=settings.AWS_REGION,
+                # e.g. MinIO / LocalStack
+                endpoint_url=settings.S3_ENDPOINT_URL or None,
+                # One pooled connection per in-flight part
+                config=Config(max_pool_connections=max(10, self.concurrency))
+            )
+        self.s3_client = s3_client
         self.bucket_name = settings.S3_BUCKET_NAME
         self.cloudfront_domain = settings.CLOUDFRONT_DOMAIN
+        self.part_size = part_size
+        self.max_bytes = max_bytes
+
+    async def upload(self, file: UploadFile, tenant_id: str) -> StoredFile:
+        s3_key = f"{tenant_id}/{os.path.basename(file.filename)}"
+        content_type = file.content_type or "application/octet-stream"
+        stream = UploadStream(file, self.part_size, self.max_bytes)
+        parts = stream.parts()
+
+        # Bodies that fit in one part go up in a single PUT; everything else as a multipart upload
+        first = await anext(parts, None)
+        second = await anext(parts, None) if first is not None else None
+        if second is None:
+            await asyncio.to_thread(
+                self.s3_client.put_object,
+                Bucket=self.bucket_name, Key=s3_key, Body=first or b"", ContentType=content_type
+            )
+        else:
+            await self._multipart_upload(s3_key, content_type, first, second, parts)
 
-    async def upload(self, file: UploadFile, tenant_id: str) -> str:
-        s3_key = f"{tenant_id}/{file.filename}"
-        
-        # Upload to S3
-        self.s3_client.upload_fileobj(
-            file.file,
-            self.bucket_name,
-            s3_key,
-            ExtraArgs={"ContentType": file.content_type}
+        return StoredFile(self._url(s3_key), stream.size, stream.sha256)
+
+    async def _multipart_upload(self, s3_key: str, content_type: str, first: bytes, second: bytes, rest: AsyncIterator[bytes]):
+        upload = await asyncio.to_thread(
+            self.s3_client.create_multipart_upload,
+            Bucket=self.bucket_name, Key=s3_key, ContentType=content_type
         )
-        
+        upload_id = upload["UploadId"]
+        etags: Dict[int, str] = {}
+
+        async def send(number: int, body: bytes):
+            response = await asyncio.to_thread(
+                self.s3_client.upload_part,
+                Bucket=self.bucket_name, Key=s3_key, UploadId=upload_id, PartNumber=number, Body=body
+            )
+            etags[number] = response["ETag"]
+
+        async def all_parts():
+            yield first
+            yield second
+            async for part in rest:
+                yield part
+
+        in_flight = set()
+        try:
+            number = 0
+            async for part in all_parts():
+                number += 1
+                # Backpressure: at most `concurrency` parts (and part buffers) at a time
+                if len(in_flight) >= self.concurrency:
+                    done, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        task.result()
+                in_flight.add(asyncio.ensure_future(send(number, part)))
+            await asyncio.gather(*in_flight)
+            await asyncio.to_thread(
+                self.s3_client.complete_multipart_upload,
+                Bucket=self.bucket_name, Key=s3_key, UploadId=upload_id,
+                MultipartUpload={"Parts": [{"ETag": etags[n], "PartNumber": n} for n in sorted(etags)]}
+            )
+        except BaseException:
+            for task in in_flight:
+                task.cancel()
+            await asyncio.to_thread(
+                self.s3_client.abort_multipart_upload,
+                Bucket=self.bucket_name, Key=s3_key, UploadId=upload_id
+            )
+            raise
+
+    def _url(self, s3_key: str) -> str:
         # Return CloudFront URL if available, else S3 URL
         if self.cloudfront_domain:
             return f"https://{self.cloudfront_domain}/{s3_key}"
-        
+        if settings.S3_ENDPOINT_URL:
+            return f"{settings.S3_ENDPOINT_URL.rstrip('/')}/{self.bucket_name}/{s3_key}"
         return f"https://{self.bucket_name}.s3.{settings.AWS_REGION}.amazonaws.com/{s3_key}"
 
     def get_path(self, identifier: str) -> str:
@@ -0,0 +1,105 @@
+from typing import Dict, Optional
+from qdrant_client.http import models
+from src.core.config import settings
+
+class StorageProfile:
+    """
+    How a collection stores and searches its dense vectors: quantization, where the original
+    float32 vectors live, HNSW build parameters (m, ef_construct) and the search-time ef.
+
+    With quantization, the compressed vectors stay in RAM and the search over-fetches
+    `oversampling` x limit candidates on them, then rescores those with the originals.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        quantization: Optional[str] = None,  # None, "int8" or "binary"
+        vectors_on_disk: bool = False,
+        m: Optional[int] = None,
+        ef_construct: Optional[int] = None,
+        hnsw_ef: Optional[int] = None,
+        oversampling: Optional[float] = None,
+        rescore: bool = True
+    ):
+        self.name = name
+        self.quantization = quantization
+        self.vectors_on_disk = vectors_on_disk
+        self.m = m
+        self.ef_construct = ef_construct
+        self.hnsw_ef = hnsw_ef
+        self.oversampling = oversampling
+        self.rescore = rescore
+
+    def vector_params(self, size: int, distance: models.Distance = models.Distance.COSINE) -> models.VectorParams:
+        return models.VectorParams(
+            size=size,
+            distance=distance,
+            on_disk=self.vectors_on_disk or None,
+            hnsw_config=self.hnsw_config(),
+            quantization_config=self.quantization_config()
+        )
+
+    def hnsw_config(self) -> Optional[models.HnswConfigDiff]:
+        if self.m is None and self.ef_construct is None:
+            return None
+        return models.HnswConfigDiff(m=self.m, ef_construct=self.ef_construct)
+
+    def quantization_config(self):
+        if self.quantization == "int8":
+            return models.ScalarQuantization(
+                scalar=models.ScalarQuantizationConfig(type=models.ScalarType.INT8, quantile=0.99, always_ram=True)
+            )
+        if self.quantization == "binary":
+            return models.BinaryQuantization(binary=models.BinaryQuantizationConfig(always_ram=True))
+        return None
+
+    def search_params(self) -> Optional[models.SearchParams]:
+        hnsw_ef = settings.QDRANT_HNSW_EF or self.hnsw_ef
+        oversampling = settings.QDRANT_QUANTIZATION_OVERSAMPLING or self.oversampling
+        if hnsw_ef is None and self.quantization is None:
+            return None
+        return models.SearchParams(
+            hnsw_ef=hnsw_ef,
+            quantization=models.QuantizationSearchParams(
+                rescore=self.rescore,
+                oversampling=oversampling
+            ) if self.quantization else None
+        )
+
+    def ram_bytes_per_vector(self, size: int) -> float:
+        """Rough resident size of one vector (excluding the HNSW graph)."""
+        if self.quantization == "int8":
+            resident = size
+        elif self.quantization == "binary":
+            resident = size / 8
+        else:
+            resident = 0 if self.vectors_on_disk else size * 4
+        if self.quantization and not self.vectors_on_disk:
+            resident += size * 4
+        return resident
+
+    def ram_bytes_per_point(self, size: int, prefix_size: int = 0) -> float:
+        """Rough resident size of one point's text vectors: the full one plus, for two-stage search, its prefix."""
+        return self.ram_bytes_per_vector(size) + (self.ram_bytes_per_vector(prefix_size) if prefix_size else 0)
+
+STORAGE_PROFILES: Dict[str, StorageProfile] = {
+    # float32 vectors in RAM, Qdrant's default HNSW (m=16, ef_construct=100)
+    "default": StorageProfile("default"),
+    # int8 codes in RAM (4x smaller), originals on disk for rescoring
+    "scalar_int8": StorageProfile("scalar_int8", quantization="int8", vectors_on_disk=True, oversampling=2.0),
+    # 1 bit per dimension in RAM (32x smaller); needs more oversampling to hold recall
+    "binary": StorageProfile("binary", quantization="binary", vectors_on_disk=True, oversampling=3.0),
+    # No quantization, originals memory-mapped from disk
+    "on_disk": StorageProfile("on_disk", vectors_on_disk=True),
+    # Denser graph and wider search for recall-critical tenants; int8 keeps memory in check
+    "high_recall": StorageProfile(
+        "high_recall", quantization="int8", vectors_on_disk=True, m=32, ef_construct=256, hnsw_ef=128, oversampling=2.0
+    ),
+}
+
+def get_storage_profile(name: Optional[str] = None) -> StorageProfile:
+    name = name or settings.QDRANT_STORAGE_PROFILE
+    if name not in STORAGE_PROFILES:
+        raise ValueError(f"Unknown storage profile '{name}'. Available: {', '.join(STORAGE_PROFILES)}")
+    return STORAGE_PROFILES[name]
@@ -0,0 +1,116 @@
+import hashlib
+import json
+import re
+import time
+from typing import Dict, Any, List, Optional, Set, Tuple
+from src.core.config import settings
+
+def dedicated_collection_name(base: str, tenant_id: str) -> str:
+    """Collection name for a tenant that has its own collection, e.g. rag_vectors__t_acme_1a2b3c4d."""
+    safe = re.sub(r"[^A-Za-z0-9_-]", "_", tenant_id)[:48]
+    digest = hashlib.sha256(tenant_id.encode("utf-8")).hexdigest()[:8]
+    return f"{base}__t_{safe}_{digest}"
+
+class TenantRouter:
+    """
+    Where a tenant's points live within one logical store (`base` collection).
+
+    A layout is {"collection": <read + write target>, "also_write": [<extra write targets>]}.
+    Tenants without an entry live in the shared `base` collection. `also_write` is only set while
+    a tenant is being moved, so writes land in both places until the move completes.
+
+    Layouts are kept in the Redis hash `vector_layout:<base>` and cached in-process for
+    TENANT_LAYOUT_CACHE_TTL seconds; `local=True` keeps them in memory (single process, tests).
+
+    While a move runs, deletes and payload updates record the point IDs they touched
+    (`vector_layout:<base>:changed:<tenant>`), so the mover can re-sync them after its copy.
+    """
+
+    def __init__(self, base: str, redis_client=None, cache_ttl: Optional[float] = None, local: bool = False):
+        self.base = base
+        self.local = local
+        self.cache_ttl = 0 if local else (settings.TENANT_LAYOUT_CACHE_TTL if cache_ttl is None else cache_ttl)
+        self._redis = redis_client
+        self._cache: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+        self._locks: Dict[str, float] = {}
+        self._changed: Dict[str, Set[str]] = {}
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            import redis.asyncio as redis
+            self._redis = redis.from_url(settings.REDIS_URL, decode_responses=True)
+        return self._redis
+
+    @property
+    def key(self) -> str:
+        return f"vector_layout:{self.base}"
+
+    def default_layout(self) -> Dict[str, Any]:
+        return {"collection": self.base, "also_write": []}
+
+    async def get(self, tenant_id: str) -> Dict[str, Any]:
+        cached = self._cache.get(tenant_id)
+        if cached and (self.local or cached[0] > time.monotonic()):
+            return cached[1]
+        layout = self.default_layout()
+        if not self.local:
+            raw = await self.redis.hget(self.key, tenant_id)
+            if raw:
+                layout = {**layout, **json.loads(raw)}
+        self._cache[tenant_id] = (time.monotonic() + self.cache_ttl, layout)
+        return layout
+
+    async def set(self, tenant_id: str, collection: str, also_write: Optional[List[str]] = None):
+        layout = {"collection": collection, "also_write": list(also_write or [])}
+        if not self.local:
+            if collection == self.base and not layout["also_write"]:
+                await self.redis.hdel(self.key, tenant_id)
+            else:
+                await self.redis.hset(self.key, tenant_id, json.dumps(layout))
+        self._cache[tenant_id] = (time.monotonic() + self.cache_ttl, layout)
+
+    async def collections_for(self, tenant_id: str) -> Tuple[str, List[str]]:
+        """(collection to read from, collections to write to)."""
+        layout = await self.get(tenant_id)
+        return layout["collection"], [layout["collection"], *layout["also_write"]]
+
+    async def acquire_move(self, tenant_id: str, ttl: int = 3600) -> bool:
+        """Makes sure only one move per tenant runs at a time (across workers)."""
+        if self.local:
+            if self._locks.get(tenant_id, 0) > time.monotonic():
+                return False
+            self._locks[tenant_id] = time.monotonic() + ttl
+            return True
+        return bool(await self.redis.set(f"{self.key}:moving:{tenant_id}", "1", nx=True, ex=ttl))
+
+    async def release_move(self, tenant_id: str):
+        if self.local:
+            self._locks.pop(tenant_id, None)
+            self._changed.pop(tenant_id, None)
+        else:
+            await self.redis.delete(f"{self.key}:moving:{tenant_id}", f"{self.key}:changed:{tenant_id}")
+
+    async def record_changes(self, tenant_id: str, point_ids: List[str], ttl: int = 3600):
+        """Notes points deleted or updated in place while the tenant is being moved."""
+        if not point_ids:
+            return
+        if self.local:
+            self._changed.setdefault(tenant_id, set()).update(point_ids)
+            return
+        key = f"{self.key}:changed:{tenant_id}"
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.sadd(key, *point_ids)
+        pipe.expire(key, ttl)
+        await pipe.execute()
+
+    async def take_changes(self, tenant_id: str) -> Set[str]:
+        """The points recorded since the last call (and forgets them)."""
+        if self.local:
+            return self._changed.pop(tenant_id, set())
+        key = f"{self.key}:changed:{tenant_id}"
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.smembers(key)
+        pipe.delete(key)
+        members, _ = await pipe.execute()
+        return set(members or ())
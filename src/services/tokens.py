@@ -0,0 +1,20 @@
+import math
+
+# Providers tokenize differently; ~4 characters per token holds for English text across them and
+# keeps budgets provider-independent (and needs no tokenizer download).
+CHARS_PER_TOKEN = 4
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count of `text` for prompt budgeting."""
+    return math.ceil(len(text or "") / CHARS_PER_TOKEN)
+
+def truncate_to_tokens(text: str, budget: int) -> str:
+    """`text` cut to about `budget` tokens, at a word boundary where possible."""
+    limit = max(0, budget) * CHARS_PER_TOKEN
+    if len(text) <= limit:
+        return text
+    cut = text[:limit]
+    space = cut.rfind(" ")
+    if space > limit // 2:
+        cut = cut[:space]
+    return cut.rstrip() + " …"
@@ -1,78 +1,699 @@
-from typing import List, Dict, Any, Optional
-from qdrant_client import QdrantClient
+import asyncio
+import logging
+import math
+from typing import List, Dict, Any, Optional, Set, Tuple
+import httpx
+from qdrant_client import AsyncQdrantClient
 from qdrant_client.http import models
 from src.core.config import settings
+from src.services.tenant_router import TenantRouter, dedicated_collection_name
+from src.services.storage_profiles import StorageProfile, get_storage_profile
 
-class VectorStore:
-    def __init__(self):
-        self.client = QdrantClient(url=settings.QDRANT_URL)
-        self.collection_name = "rag_vectors"
-        self._ensure_collection()
+logger = logging.getLogger(__name__)
 
-    def _ensure_collection(self):
-        try:
-            self.client.get_collection(self.collection_name)
-        except Exception:
-            self.client.create_collection(
-                collection_name=self.collection_name,
-                vectors_config=models.VectorParams(
-                    size=1536,  # OpenAI's text-embedding-3-small or similar
-                    distance=models.Distance.COSINE
+SPARSE_VECTOR_NAME = "text"
+# Named dense vectors per point: the full text embedding, its low-dimensional (Matryoshka) prefix
+# used to prefetch candidates cheaply, and a separate space for image embeddings.
+FULL_VECTOR_NAME = "full"
+PREFIX_VECTOR_NAME = "prefix"
+IMAGE_VECTOR_NAME = "image"
+# Collections created before named vectors hold a single unnamed dense vector
+LEGACY_VECTOR_NAME = ""
+
+def truncate_vector(vector: List[float], dim: int) -> List[float]:
+    """Matryoshka-style prefix: the first `dim` components, re-normalized to unit length."""
+    prefix = vector[:dim]
+    norm = math.sqrt(sum(x * x for x in prefix)) or 1.0
+    return [x / norm for x in prefix]
+
+def reciprocal_rank_fusion(
+    result_lists: List[List[Dict[str, Any]]],
+    weights: Optional[List[float]] = None,
+    k: int = 60
+) -> List[Dict[str, Any]]:
+    """Merges ranked hit lists: score(d) = sum_i w_i / (k + rank_i(d)). Hits keep their payloads."""
+    weights = weights or [1.0] * len(result_lists)
+    fused: Dict[Any, Dict[str, Any]] = {}
+    for hits, weight in zip(result_lists, weights):
+        for rank, hit in enumerate(hits, start=1):
+            entry = fused.setdefault(hit["id"], {**hit, "score": 0.0})
+            entry["score"] += weight / (k + rank)
+    return sorted(fused.values(), key=lambda h: h["score"], reverse=True)
+
+class VectorStore:
+    def __init__(
+        self,
+        location: Optional[str] = None,
+        url: Optional[str] = None,
+        prefer_grpc: Optional[bool] = None,
+        collection_name: str = "rag_vectors",
+        hybrid: bool = True,
+        router: Optional[TenantRouter] = None,
+        storage_profile: Optional[str] = None,
+        two_stage: Optional[bool] = None,
+        plain: bool = False
+    ):
+        if location:
+            # Local / in-memory mode (":memory:" or a path), mainly for tests
+            self.client = AsyncQdrantClient(location=location)
+        else:
+            # One pooled, keep-alive transport per process; gRPC is opt-in
+            self.client = AsyncQdrantClient(
+                url=url or settings.QDRANT_URL,
+                prefer_grpc=settings.QDRANT_PREFER_GRPC if prefer_grpc is None else prefer_grpc,
+                grpc_port=settings.QDRANT_GRPC_PORT,
+                timeout=settings.QDRANT_TIMEOUT,
+                limits=httpx.Limits(
+                    max_connections=settings.QDRANT_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.QDRANT_MAX_KEEPALIVE_CONNECTIONS
                 )
             )
+        self.collection_name = collection_name
+        # Collections created here get one unnamed dense vector with default index settings and only a
+        # tenant_id payload index, for small auxiliary collections (e.g. the semantic cache) that hold no documents
+        self.plain = plain
+        # Sparse (lexical) vectors next to the dense ones; off for existing collections that lack them
+        self.hybrid = hybrid and not plain
+        # Prefetch on the prefix vector, rescore on the full one (collections with named vectors only)
+        self.two_stage = settings.TWO_STAGE_SEARCH_ENABLED if two_stage is None else two_stage
+        # Quantization / on-disk / HNSW settings for collections created here, plus matching search params
+        self.storage_profile: StorageProfile = get_storage_profile(storage_profile)
+        # Tenant -> collection routing (shared collection by default, dedicated ones for large tenants)
+        self.router = router or TenantRouter(collection_name, local=bool(location))
+        # Per collection: {"named": has full/prefix/image vectors, "sparse": has sparse vectors}
+        self._schemas: Dict[str, Dict[str, bool]] = {}
+        self._collection_lock: Optional[asyncio.Lock] = None
+
+    async def _ensure_collection(self, collection_name: Optional[str] = None) -> Dict[str, bool]:
+        collection_name = collection_name or self.collection_name
+        if collection_name in self._schemas:
+            return self._schemas[collection_name]
+        if self._collection_lock is None:
+            self._collection_lock = asyncio.Lock()
+        async with self._collection_lock:
+            if collection_name in self._schemas:
+                return self._schemas[collection_name]
+            response = await self.client.get_collections()
+            exists = collection_name in {c.name for c in response.collections}
+            if not exists and self.plain:
+                await self.client.create_collection(
+                    collection_name=collection_name,
+                    vectors_config=models.VectorParams(size=settings.EMBEDDING_DIM, distance=models.Distance.COSINE)
+                )
+                schema = {"named": False, "sparse": False}
+            elif not exists:
+                profile = self.storage_profile
+                await self.client.create_collection(
+                    collection_name=collection_name,
+                    vectors_config={
+                        # OpenAI's text-embedding-3-small or similar
+                        FULL_VECTOR_NAME: profile.vector_params(settings.EMBEDDING_DIM),
+                        # Stored like the full vector, so the profile's memory saving covers it as well
+                        PREFIX_VECTOR_NAME: profile.vector_params(settings.VECTOR_PREFIX_DIM),
+                        IMAGE_VECTOR_NAME: profile.vector_params(settings.IMAGE_EMBEDDING_DIM),
+                    },
+                    sparse_vectors_config={
+                        SPARSE_VECTOR_NAME: models.SparseVectorParams(index=models.SparseIndexParams())
+                    } if self.hybrid else None
+                )
+                schema = {"named": True, "sparse": self.hybrid}
+            else:
+                params = (await self.client.get_collection(collection_name)).config.params
+                schema = {
+                    "named": isinstance(params.vectors, dict) and FULL_VECTOR_NAME in params.vectors,
+                    "sparse": self.hybrid and SPARSE_VECTOR_NAME in (params.sparse_vectors or {})
+                }
+                if self.hybrid and not schema["sparse"]:
+                    logger.warning(f"Collection {collection_name} has no sparse vectors; using dense-only search")
+                if not schema["named"] and not self.plain:
+                    logger.warning(
+                        f"Collection {collection_name} has a single unnamed vector; "
+                        f"two-stage search and image vectors are unavailable"
+                    )
+            # Every search filters on tenant_id (and re-ingestion on document_id(s)); without payload
+            # indexes those are full scans of the collection. Creating an existing index is a no-op.
+            for field_name in ("tenant_id",) if self.plain else ("tenant_id", "document_id", "document_ids"):
+                await self.client.create_payload_index(
+                    collection_name=collection_name,
+                    field_name=field_name,
+                    field_schema=models.PayloadSchemaType.KEYWORD,
+                    wait=True
+                )
+            self._schemas[collection_name] = schema
+            return schema
+
+    @staticmethod
+    def _point_vector(
+        schema: Dict[str, bool],
+        dense: Optional[List[float]] = None,
+        sparse: Optional[Dict[int, float]] = None,
+        image: Optional[List[float]] = None
+    ):
+        """Builds a point's vector(s) in the layout of the target collection."""
+        sparse = sparse if schema["sparse"] else None
+        if not schema["named"]:
+            if image is not None:
+                raise ValueError("Collection has no image vector space")
+            if not sparse:
+                return dense
+            vector = {LEGACY_VECTOR_NAME: dense}
+        else:
+            vector = {}
+            if dense is not None:
+                vector[FULL_VECTOR_NAME] = dense
+                vector[PREFIX_VECTOR_NAME] = truncate_vector(dense, settings.VECTOR_PREFIX_DIM)
+            if image is not None:
+                vector[IMAGE_VECTOR_NAME] = image
+        if sparse:
+            vector[SPARSE_VECTOR_NAME] = models.SparseVector(indices=list(sparse.keys()), values=list(sparse.values()))
+        return vector
+
+    @staticmethod
+    def _split_vector(vector) -> Tuple[Optional[List[float]], Optional[Dict[int, float]], Optional[List[float]]]:
+        """(dense, sparse, image) of a stored point, whatever its collection layout."""
+        if not isinstance(vector, dict):
+            return vector, None, None
+        sparse = vector.get(SPARSE_VECTOR_NAME)
+        if sparse is not None:
+            sparse = dict(zip(sparse.indices, sparse.values))
+        dense = vector.get(FULL_VECTOR_NAME, vector.get(LEGACY_VECTOR_NAME))
+        return dense, sparse, vector.get(IMAGE_VECTOR_NAME)
 
     async def upsert(
-        self, 
-        tenant_id: str, 
-        vector: List[float], 
+        self,
+        tenant_id: str,
+        vector: List[float],
         payload: Dict[str, Any],
         point_id: Optional[str] = None
     ):
+        await self.upsert_batch(tenant_id, [vector], [payload], [point_id] if point_id else None)
+
+    async def upsert_batch(
+        self,
+        tenant_id: str,
+        vectors: List[List[float]],
+        payloads: List[Dict[str, Any]],
+        point_ids: Optional[List[str]] = None,
+        sparse_vectors: Optional[List[Dict[int, float]]] = None
+    ) -> int:
+        """Writes many text points in a single round trip. Returns the number of points written."""
+        return await self._upsert(
+            tenant_id, payloads, point_ids,
+            lambda schema, i: self._point_vector(schema, dense=vectors[i], sparse=sparse_vectors[i] if sparse_vectors else None)
+        )
+
+    async def upsert_image_batch(
+        self,
+        tenant_id: str,
+        vectors: List[List[float]],
+        payloads: List[Dict[str, Any]],
+        point_ids: Optional[List[str]] = None
+    ) -> int:
+        """Writes image embeddings (IMAGE_EMBEDDING_DIM) into the image vector space."""
+        return await self._upsert(
+            tenant_id, payloads, point_ids,
+            lambda schema, i: self._point_vector(schema, image=vectors[i])
+        )
+
+    async def _upsert(self, tenant_id: str, payloads: List[Dict[str, Any]], point_ids: Optional[List[str]], build) -> int:
         import uuid
-        point_id = point_id or str(uuid.uuid4())
-        
-        # Force tenant_id in payload
-        payload["tenant_id"] = tenant_id
-        
-        self.client.upsert(
-            collection_name=self.collection_name,
-            points=[
-                models.PointStruct(
-                    id=point_id,
-                    vector=vector,
-                    payload=payload
-                )
+        point_ids = point_ids or [str(uuid.uuid4()) for _ in payloads]
+        _, targets = await self.router.collections_for(tenant_id)
+        for payload in payloads:
+            # Force tenant_id in payload
+            payload["tenant_id"] = tenant_id
+        if not payloads:
+            return 0
+
+        async def write(collection_name: str):
+            schema = await self._ensure_collection(collection_name)
+            points = [
+                models.PointStruct(id=point_id, vector=build(schema, i), payload=payload)
+                for i, (point_id, payload) in enumerate(zip(point_ids, payloads))
             ]
-        )
+            await self.client.upsert(collection_name=collection_name, points=points, wait=True)
+
+        # More than one target only while the tenant is being moved between layouts
+        if len(targets) > 1:
+            await self.router.record_changes(tenant_id, point_ids)
+        await asyncio.gather(*[write(name) for name in targets])
+        return len(payloads)
 
     async def search(
-        self, 
-        tenant_id: str, 
-        vector: List[float], 
+        self,
+        tenant_id: str,
+        vector: List[float],
         limit: int = 10,
-        score_threshold: float = 0.5
+        score_threshold: float = 0.5,
+        sparse_vector: Optional[Dict[int, float]] = None,
+        fusion_weights: Optional[Tuple[float, float]] = None,
+        with_vectors: bool = False
     ) -> List[Dict[str, Any]]:
-        results = self.client.search(
-            collection_name=self.collection_name,
-            query_vector=vector,
-            query_filter=models.Filter(
-                must=[
-                    models.FieldCondition(
-                        key="tenant_id",
-                        match=models.MatchValue(value=tenant_id)
+        """
+        Dense search, or hybrid when `sparse_vector` is given: dense and sparse candidates are fetched
+        in one batched call and merged with reciprocal-rank fusion, weighted by (dense, sparse).
+
+        With two-stage search the dense side first prefetches TWO_STAGE_PREFETCH_MULTIPLIER x limit
+        candidates on the prefix vector, then scores only those exactly on the full vector. Both
+        stages use the storage profile's search params (hnsw_ef, quantization oversampling/rescore).
+        With `with_vectors`, each hit also carries its full dense vector (e.g. for reranking).
+        """
+        collection_name, _ = await self.router.collections_for(tenant_id)
+        schema = await self._ensure_collection(collection_name)
+        hybrid = schema["sparse"] and bool(sparse_vector)
+        dense_name = FULL_VECTOR_NAME if schema["named"] else LEGACY_VECTOR_NAME
+        # Only the dense vector; skip the sparse/prefix ones if the collection has them
+        vector_selector = False
+        if with_vectors:
+            vector_selector = [dense_name] if (schema["named"] or schema["sparse"]) else True
+        # Kept for dedicated collections too: cheap there, and a guard against misrouting
+        tenant_filter = self._tenant_filter(tenant_id)
+        profile_params = self.storage_profile.search_params()
+
+        requests = []
+        if self.two_stage and schema["named"]:
+            requests.append(models.SearchRequest(
+                vector=models.NamedVector(
+                    name=PREFIX_VECTOR_NAME,
+                    vector=truncate_vector(vector, settings.VECTOR_PREFIX_DIM)
+                ),
+                filter=tenant_filter,
+                limit=limit * settings.TWO_STAGE_PREFETCH_MULTIPLIER,
+                params=profile_params,
+                with_payload=False
+            ))
+        else:
+            requests.append(models.SearchRequest(
+                vector=models.NamedVector(name=dense_name, vector=vector) if schema["named"] else vector,
+                filter=tenant_filter,
+                limit=limit,
+                score_threshold=score_threshold,
+                params=profile_params,
+                with_payload=True,
+                with_vector=vector_selector
+            ))
+        if hybrid:
+            requests.append(models.SearchRequest(
+                vector=models.NamedSparseVector(
+                    name=SPARSE_VECTOR_NAME,
+                    vector=models.SparseVector(
+                        indices=list(sparse_vector.keys()),
+                        values=list(sparse_vector.values())
                     )
-                ]
+                ),
+                filter=tenant_filter,
+                limit=limit,
+                with_payload=True,
+                with_vector=vector_selector
+            ))
+
+        if len(requests) == 1:
+            responses = [await self.client.search(
+                collection_name=collection_name,
+                query_vector=requests[0].vector,
+                query_filter=requests[0].filter,
+                limit=requests[0].limit,
+                score_threshold=requests[0].score_threshold,
+                search_params=requests[0].params,
+                with_payload=requests[0].with_payload,
+                with_vectors=requests[0].with_vector
+            )]
+        else:
+            responses = await self.client.search_batch(collection_name=collection_name, requests=requests)
+
+        dense_hits = responses[0]
+        if self.two_stage and schema["named"]:
+            dense_hits = await self._rescore(
+                collection_name, tenant_id, vector, [hit.id for hit in dense_hits],
+                limit, score_threshold, vector_selector, profile_params
+            )
+        if not hybrid:
+            return [self._to_hit(hit) for hit in dense_hits]
+
+        fused = reciprocal_rank_fusion(
+            [[self._to_hit(h) for h in dense_hits], [self._to_hit(h) for h in responses[1]]],
+            weights=list(fusion_weights or (1.0, 1.0)),
+            k=settings.HYBRID_RRF_K
+        )
+        return fused[:limit]
+
+    async def _rescore(
+        self,
+        collection_name: str,
+        tenant_id: str,
+        vector: List[float],
+        candidate_ids: List[Any],
+        limit: int,
+        score_threshold: Optional[float],
+        vector_selector,
+        profile_params: Optional[models.SearchParams] = None
+    ):
+        """
+        Second stage: exact full-vector scores for the prefetched candidates only. On a quantized
+        profile the candidates are scored on the compressed vectors with the profile's
+        oversampling and rescored from the originals, like a single-stage search.
+        """
+        if not candidate_ids:
+            return []
+        return await self.client.search(
+            collection_name=collection_name,
+            query_vector=models.NamedVector(name=FULL_VECTOR_NAME, vector=vector),
+            query_filter=self._tenant_filter(tenant_id, models.HasIdCondition(has_id=candidate_ids)),
+            limit=limit,
+            score_threshold=score_threshold,
+            search_params=models.SearchParams(
+                exact=True,
+                quantization=profile_params.quantization if profile_params else None
             ),
+            with_vectors=vector_selector
+        )
+
+    async def search_images(
+        self,
+        tenant_id: str,
+        vector: List[float],
+        limit: int = 10,
+        score_threshold: Optional[float] = None
+    ) -> List[Dict[str, Any]]:
+        """Nearest neighbours in the image vector space (e.g. CLIP embeddings)."""
+        collection_name, _ = await self.router.collections_for(tenant_id)
+        schema = await self._ensure_collection(collection_name)
+        if not schema["named"]:
+            raise ValueError(f"Collection {collection_name} has no image vector space")
+        results = await self.client.search(
+            collection_name=collection_name,
+            query_vector=models.NamedVector(name=IMAGE_VECTOR_NAME, vector=vector),
+            query_filter=self._tenant_filter(tenant_id),
             limit=limit,
-            score_threshold=score_threshold
+            score_threshold=score_threshold,
+            search_params=self.storage_profile.search_params()
         )
-        
-        return [
-            {
-                "id": hit.id,
-                "score": hit.score,
-                "payload": hit.payload
-            } for hit in results
+        return [self._to_hit(hit) for hit in results]
+
+    @staticmethod
+    def _to_hit(hit) -> Dict[str, Any]:
+        result = {
+            "id": hit.id,
+            "score": hit.score,
+            "payload": hit.payload
+        }
+        if hit.vector is not None:
+            result["vector"] = VectorStore._split_vector(hit.vector)[0]
+        return result
+
+    @staticmethod
+    def _tenant_filter(tenant_id: str, *conditions) -> models.Filter:
+        return models.Filter(
+            must=[
+                *conditions,
+                models.FieldCondition(
+                    key="tenant_id",
+                    match=models.MatchValue(value=tenant_id)
+                )
+            ]
+        )
+
+    async def delete(self, tenant_id: str, point_ids: List[str], document_id: Optional[str] = None) -> int:
+        """Deletes points by ID in one call per target collection, scoped to the tenant (and document)."""
+        if not point_ids:
+            return 0
+        conditions = [models.HasIdCondition(has_id=list(point_ids))]
+        if document_id is not None:
+            conditions.append(models.FieldCondition(key="document_id", match=models.MatchValue(value=document_id)))
+        _, targets = await self.router.collections_for(tenant_id)
+        if len(targets) > 1:
+            await self.router.record_changes(tenant_id, list(point_ids))
+        for collection_name in targets:
+            await self._ensure_collection(collection_name)
+            await self.client.delete(
+                collection_name=collection_name,
+                points_selector=models.FilterSelector(filter=self._tenant_filter(tenant_id, *conditions)),
+                wait=True
+            )
+        return len(point_ids)
+
+    async def existing_ids(self, tenant_id: str, point_ids: List[str]) -> Set[str]:
+        """The subset of `point_ids` that exist for the tenant."""
+        if not point_ids:
+            return set()
+        collection_name, _ = await self.router.collections_for(tenant_id)
+        await self._ensure_collection(collection_name)
+        records = await self.client.retrieve(
+            collection_name=collection_name,
+            ids=list(point_ids),
+            with_payload=["tenant_id"],
+            with_vectors=False
+        )
+        return {str(r.id) for r in records if (r.payload or {}).get("tenant_id") == tenant_id}
+
+    @staticmethod
+    def _document_condition(document_id: str) -> models.Filter:
+        # Points indexed before `document_ids` existed only carry `document_id`
+        return models.Filter(should=[
+            models.FieldCondition(key="document_ids", match=models.MatchValue(value=document_id)),
+            models.FieldCondition(key="document_id", match=models.MatchValue(value=document_id)),
+        ])
+
+    async def document_refs(self, tenant_id: str, point_ids: List[str]) -> Dict[str, Set[str]]:
+        """For each of `point_ids` that exists for the tenant: the documents that reference it."""
+        if not point_ids:
+            return {}
+        collection_name, _ = await self.router.collections_for(tenant_id)
+        await self._ensure_collection(collection_name)
+        records = await self.client.retrieve(
+            collection_name=collection_name,
+            ids=list(point_ids),
+            with_payload=["tenant_id", "document_id", "document_ids"],
+            with_vectors=False
+        )
+        refs = {}
+        for r in records:
+            payload = r.payload or {}
+            if payload.get("tenant_id") != tenant_id:
+                continue
+            documents = set(payload.get("document_ids") or [])
+            if payload.get("document_id"):
+                documents.add(payload["document_id"])
+            refs[str(r.id)] = documents
+        return refs
+
+    async def add_document_refs(self, tenant_id: str, point_ids: List[str], document_id: str) -> int:
+        """Records that `document_id` also references these (shared, deduplicated) points."""
+        refs = await self.document_refs(tenant_id, point_ids)
+        payloads = {
+            point_id: {"document_ids": sorted(documents | {document_id})}
+            for point_id, documents in refs.items() if document_id not in documents
+        }
+        return await self.set_payloads(tenant_id, payloads)
+
+    async def release_document(self, tenant_id: str, point_ids: List[str], document_id: str) -> Dict[str, str]:
+        """
+        Drops `document_id`'s reference to each point. Points no other document references are
+        deleted; shared ones stay for the other documents. Returns the deleted points' texts by ID.
+        """
+        if not point_ids:
+            return {}
+        collection_name, _ = await self.router.collections_for(tenant_id)
+        await self._ensure_collection(collection_name)
+        records = await self.client.retrieve(
+            collection_name=collection_name,
+            ids=list(point_ids),
+            with_payload=["tenant_id", "document_id", "document_ids", "text"],
+            with_vectors=False
+        )
+        orphaned: Dict[str, str] = {}
+        shared: Dict[str, Dict[str, Any]] = {}
+        for r in records:
+            payload = r.payload or {}
+            if payload.get("tenant_id") != tenant_id:
+                continue
+            documents = set(payload.get("document_ids") or [])
+            if payload.get("document_id"):
+                documents.add(payload["document_id"])
+            others = documents - {document_id}
+            if not others:
+                orphaned[str(r.id)] = payload.get("text", "")
+                continue
+            fields: Dict[str, Any] = {"document_ids": sorted(others)}
+            if payload.get("document_id") == document_id:
+                fields["document_id"] = min(others)
+            shared[str(r.id)] = fields
+        await self.set_payloads(tenant_id, shared)
+        await self.delete(tenant_id, list(orphaned))
+        return orphaned
+
+    async def document_point_ids(self, tenant_id: str, document_id: str) -> Set[str]:
+        """IDs of all points currently indexed for (or shared with) one of the tenant's documents."""
+        collection_name, _ = await self.router.collections_for(tenant_id)
+        await self._ensure_collection(collection_name)
+        point_ids: Set[str] = set()
+        offset = None
+        while True:
+            records, offset = await self.client.scroll(
+                collection_name=collection_name,
+                scroll_filter=self._tenant_filter(tenant_id, self._document_condition(document_id)),
+                limit=settings.TENANT_MIGRATION_BATCH_SIZE,
+                offset=offset,
+                with_payload=False,
+                with_vectors=False
+            )
+            point_ids.update(str(r.id) for r in records)
+            if offset is None:
+                return point_ids
+
+    async def set_payloads(self, tenant_id: str, payloads: Dict[str, Dict[str, Any]]) -> int:
+        """Updates payload fields of existing points (point id -> fields) in one call, without touching vectors."""
+        if not payloads:
+            return 0
+        _, targets = await self.router.collections_for(tenant_id)
+        operations = [
+            models.SetPayloadOperation(set_payload=models.SetPayload(
+                payload=fields,
+                filter=self._tenant_filter(tenant_id, models.HasIdCondition(has_id=[point_id]))
+            ))
+            for point_id, fields in payloads.items()
         ]
+        if len(targets) > 1:
+            await self.router.record_changes(tenant_id, list(payloads))
+        for collection_name in targets:
+            await self._ensure_collection(collection_name)
+            await self.client.batch_update_points(collection_name=collection_name, update_operations=operations, wait=True)
+        return len(payloads)
+
+    # --- Tenant layout (shared vs. dedicated collection) ---
+
+    async def tenant_point_count(self, tenant_id: str, exact: bool = False) -> int:
+        collection_name, _ = await self.router.collections_for(tenant_id)
+        await self._ensure_collection(collection_name)
+        result = await self.client.count(
+            collection_name=collection_name,
+            count_filter=self._tenant_filter(tenant_id),
+            exact=exact
+        )
+        return result.count
+
+    async def wants_dedicated(self, tenant_id: str) -> bool:
+        """Size policy: a tenant in the shared collection gets its own once it reaches TENANT_DEDICATED_MIN_POINTS."""
+        layout = await self.router.get(tenant_id)
+        if layout["collection"] != self.collection_name or layout["also_write"]:
+            return False
+        return await self.tenant_point_count(tenant_id) >= settings.TENANT_DEDICATED_MIN_POINTS
+
+    async def move_tenant(self, tenant_id: str, dedicated: bool, batch_size: Optional[int] = None) -> int:
+        """
+        Moves a tenant's points between the shared collection and its dedicated one, online:
+
+          1. writes go to both collections, reads stay on the source
+          2. the source is copied over (scroll + insert of the IDs the target doesn't have yet, so
+             points written by step 1 aren't overwritten by an older snapshot); then the points
+             written, updated or deleted during the copy are re-synced from the source
+          3. reads switch to the target, writes still go to both
+          4. writes go to the target only; the tenant's points are deleted from the source
+
+        Between steps it waits for the other processes' layout caches to expire, so nobody acts on
+        a layout more than one step old. Returns the number of points copied (0 if already there
+        or another move is running).
+        """
+        batch_size = batch_size or settings.TENANT_MIGRATION_BATCH_SIZE
+        target = dedicated_collection_name(self.collection_name, tenant_id) if dedicated else self.collection_name
+        layout = await self.router.get(tenant_id)
+        source = layout["collection"]
+        if source == target or not await self.router.acquire_move(tenant_id):
+            return 0
+        try:
+            await self._ensure_collection(source)
+            target_schema = await self._ensure_collection(target)
+
+            await self.router.set(tenant_id, source, also_write=[target])
+            await self._wait_for_layout_caches()
+
+            copied = 0
+            offset = None
+            while True:
+                records, offset = await self.client.scroll(
+                    collection_name=source,
+                    scroll_filter=self._tenant_filter(tenant_id),
+                    limit=batch_size,
+                    offset=offset,
+                    with_payload=True,
+                    with_vectors=True
+                )
+                if records:
+                    present = await self.client.retrieve(
+                        collection_name=target,
+                        ids=[r.id for r in records],
+                        with_payload=False,
+                        with_vectors=False
+                    )
+                    present_ids = {str(r.id) for r in present}
+                    missing = [r for r in records if str(r.id) not in present_ids]
+                    await self._copy_points(target, target_schema, missing)
+                    copied += len(missing)
+                if offset is None:
+                    break
+            # A write that raced the insert above may still have been overwritten, and a delete
+            # that ran before its point was copied would have been undone; the source has the truth
+            await self._resync_points(tenant_id, source, target, target_schema, await self.router.take_changes(tenant_id))
+
+            await self.router.set(tenant_id, target, also_write=[source])
+            await self._wait_for_layout_caches()
+            await self.router.set(tenant_id, target)
+            await self._wait_for_layout_caches()
+
+            await self.client.delete(
+                collection_name=source,
+                points_selector=models.FilterSelector(filter=self._tenant_filter(tenant_id)),
+                wait=True
+            )
+            logger.info(f"Moved {copied} points of tenant {tenant_id} from {source} to {target}")
+            return copied
+        finally:
+            await self.router.release_move(tenant_id)
+
+    async def _copy_points(self, target: str, target_schema: Dict[str, bool], records) -> None:
+        if not records:
+            return
+        await self.client.upsert(
+            collection_name=target,
+            points=[
+                models.PointStruct(
+                    id=r.id,
+                    # Re-laid out for the target (e.g. unnamed -> full + prefix vectors)
+                    vector=self._point_vector(target_schema, *self._split_vector(r.vector)),
+                    payload=r.payload
+                )
+                for r in records
+            ],
+            wait=True
+        )
+
+    async def _resync_points(self, tenant_id: str, source: str, target: str, target_schema: Dict[str, bool], point_ids: Set[str]):
+        """Makes `point_ids` in `target` match `source`: re-copies the ones there, deletes the rest."""
+        if not point_ids:
+            return
+        records = await self.client.retrieve(
+            collection_name=source,
+            ids=list(point_ids),
+            with_payload=True,
+            with_vectors=True
+        )
+        records = [r for r in records if (r.payload or {}).get("tenant_id") == tenant_id]
+        await self._copy_points(target, target_schema, records)
+        gone = list(point_ids - {str(r.id) for r in records})
+        if gone:
+            await self.client.delete(
+                collection_name=target,
+                points_selector=models.FilterSelector(
+                    filter=self._tenant_filter(tenant_id, models.HasIdCondition(has_id=gone))
+                ),
+                wait=True
+            )
+
+    async def _wait_for_layout_caches(self):
+        if self.router.cache_ttl:
+            await asyncio.sleep(self.router.cache_ttl)
+
+    async def close(self):
+        await self.client.close()
 
 vector_store = VectorStore()
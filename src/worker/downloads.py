@@ -0,0 +1,150 @@
+import hashlib
+import logging
+import os
+from typing import Optional
+from urllib.parse import unquote, urlparse
+import httpx
+from src.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+class ChecksumMismatchError(ValueError):
+    pass
+
+class DownloadedFile:
+    """A local copy of an ingestion source, and how it was obtained."""
+
+    def __init__(self, path: str, size: int, sha256: str, reused: bool = False, resumed_from: int = 0):
+        self.path = path
+        self.size = size
+        self.sha256 = sha256
+        # True when the file wasn't fetched by this call (shared storage or an earlier attempt)
+        self.reused = reused
+        self.resumed_from = resumed_from
+
+    def as_dict(self):
+        return {"bytes": self.size, "sha256": self.sha256, "reused": self.reused, "resumed_from": self.resumed_from}
+
+def _sha256_of(path: str, chunk_size: int) -> "hashlib._Hash":
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            digest.update(block)
+    return digest
+
+class SourceDownloader:
+    """
+    Fetches ingestion sources given as URLs, once per worker process:
+
+    - one pooled keep-alive HTTP client per process (created lazily, after the prefork fork)
+    - the body is streamed to disk in DOWNLOAD_CHUNK_SIZE blocks, never held in memory
+    - a partial download left by a failed attempt is resumed with a Range request on retry
+    - files are keyed by job as well as URL: DOWNLOAD_DIR is shared by every process on the host,
+      and two jobs fetching the same URL must not append to, or discard, each other's copy
+    - the result is verified against the SHA-256 recorded at upload
+    - if the URL is one of our own stored files and the local storage directory holds it (API and
+      worker on the same host), that copy is used without any network transfer
+    """
+
+    def __init__(
+        self,
+        client: Optional[httpx.Client] = None,
+        download_dir: Optional[str] = None,
+        storage_dir: Optional[str] = None,
+        chunk_size: Optional[int] = None
+    ):
+        self._client = client
+        self._client_pid = os.getpid() if client else None
+        self.download_dir = download_dir or settings.DOWNLOAD_DIR
+        self.storage_dir = storage_dir or settings.LOCAL_STORAGE_DIR
+        self.chunk_size = chunk_size or settings.DOWNLOAD_CHUNK_SIZE
+
+    @property
+    def client(self) -> httpx.Client:
+        if self._client is None or self._client_pid != os.getpid():
+            self._client = httpx.Client(
+                timeout=settings.DOWNLOAD_TIMEOUT,
+                follow_redirects=True,
+                limits=httpx.Limits(max_connections=settings.DOWNLOAD_MAX_CONNECTIONS)
+            )
+            self._client_pid = os.getpid()
+        return self._client
+
+    def path_for(self, url: str, job_id: str) -> str:
+        # Retries of a job run one after another, so they can share (and resume) the same file
+        key = hashlib.sha256(f"{job_id}\n{url}".encode("utf-8")).hexdigest()
+        return os.path.join(self.download_dir, key)
+
+    def fetch(self, url: str, job_id: str, checksum: Optional[str] = None) -> DownloadedFile:
+        local = self._local_copy(url, checksum)
+        if local is not None:
+            return local
+
+        os.makedirs(self.download_dir, exist_ok=True)
+        path = self.path_for(url, job_id)
+        if os.path.exists(path):
+            # Completed by an earlier attempt of this job (e.g. failed later, during processing)
+            digest = _sha256_of(path, self.chunk_size).hexdigest()
+            if checksum is None or digest == checksum:
+                return DownloadedFile(path, os.path.getsize(path), digest, reused=True)
+            os.remove(path)
+
+        partial = f"{path}.part"
+        resumed_from = os.path.getsize(partial) if os.path.exists(partial) else 0
+        digest = _sha256_of(partial, self.chunk_size) if resumed_from else hashlib.sha256()
+        headers = {"Range": f"bytes={resumed_from}-"} if resumed_from else {}
+
+        with self.client.stream("GET", url, headers=headers) as response:
+            if response.status_code == 416:
+                # Nothing left to fetch: the partial file already holds the whole body
+                pass
+            else:
+                response.raise_for_status()
+                if resumed_from and response.status_code != 206:
+                    logger.info(f"Server ignored the range request for {url}; downloading from scratch")
+                    resumed_from = 0
+                    digest = hashlib.sha256()
+                with open(partial, "ab" if resumed_from else "wb") as f:
+                    for block in response.iter_bytes(self.chunk_size):
+                        f.write(block)
+                        digest.update(block)
+
+        sha256 = digest.hexdigest()
+        if checksum is not None and sha256 != checksum:
+            # Corrupt or changed at the source: start from scratch next time
+            os.remove(partial)
+            raise ChecksumMismatchError(f"Checksum mismatch for {url}: expected {checksum}, got {sha256}")
+        os.replace(partial, path)
+        if resumed_from:
+            logger.info(f"Resumed download of {url} at byte {resumed_from}")
+        return DownloadedFile(path, os.path.getsize(path), sha256, resumed_from=resumed_from)
+
+    def _local_copy(self, url: str, checksum: Optional[str]) -> Optional[DownloadedFile]:
+        """Our stored files end in <tenant>/<filename>; reuse the local storage copy if it is the same file."""
+        if checksum is None:
+            return None
+        segments = [s for s in urlparse(url).path.split("/") if s]
+        if len(segments) < 2:
+            return None
+        # Names are percent-decoded after splitting; any that decode to "..", or contain a separator, can't be ours
+        tenant, filename = unquote(segments[-2]), unquote(segments[-1])
+        if any(name in (".", "..") or "/" in name or "\\" in name or "\0" in name for name in (tenant, filename)):
+            return None
+        root = os.path.realpath(self.storage_dir)
+        candidate = os.path.join(self.storage_dir, tenant, filename)
+        if os.path.commonpath([root, os.path.realpath(candidate)]) != root:
+            return None
+        if not os.path.isfile(candidate):
+            return None
+        if _sha256_of(candidate, self.chunk_size).hexdigest() != checksum:
+            return None
+        return DownloadedFile(candidate, os.path.getsize(candidate), checksum, reused=True)
+
+    def discard(self, url: str, job_id: str):
+        """Removes the job's copy (complete or partial) of a source."""
+        path = self.path_for(url, job_id)
+        for leftover in (path, f"{path}.part"):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+
+source_downloader = SourceDownloader()
@@ -1,5 +1,6 @@
 from celery import Celery
 from src.core.config import settings
+from src.worker.runtime import worker_runtime
 
 celery_app = Celery(
     "rag_worker",
@@ -26,12 +27,5 @@ celery_app.autodiscover_tasks(["src.worker"])
 @celery_app.task(name="run_evaluation_task")
 def run_evaluation_task(tenant_id: str):
     """Async wrapper for the evaluation service."""
-    import asyncio
     from src.services.evaluation import evaluation_service
-    
-    loop = asyncio.get_event_loop()
-    if loop.is_running():
-        # This shouldn't happen in a fresh celery process but just in case
-        return loop.create_task(evaluation_service.run_evaluation(tenant_id))
-    else:
-        return asyncio.run(evaluation_service.run_evaluation(tenant_id))
+    return worker_runtime.run(evaluation_service.run_evaluation(tenant_id))
@@ -0,0 +1,90 @@
+import asyncio
+import logging
+import os
+from typing import Any, Awaitable, Callable, List, Optional
+from celery import signals
+from src.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+class WorkerRuntime:
+    """
+    The async side of a Celery worker process: one event loop and one DB engine, for the life of the process.
+
+    Task bodies are sync (Celery) and bridge to async code with `run(coro)`. Every call runs on the same
+    loop, so pooled connections (DB, Redis, Qdrant's HTTP client), which are bound to the loop that
+    opened them, are reused across tasks instead of breaking or being re-opened. The engine is sized for
+    one task at a time (WORKER_DB_POOL_SIZE), not for the API's request concurrency.
+
+    `start()` runs at worker_process_init (after the prefork fork, so nothing is shared with the parent)
+    and `shutdown()` at worker_process_shutdown. Outside a prefork worker (solo pool, eager mode, scripts)
+    the first `run()` starts it.
+    """
+
+    def __init__(self, pool_size: Optional[int] = None, max_overflow: Optional[int] = None):
+        self.pool_size = pool_size or settings.WORKER_DB_POOL_SIZE
+        self.max_overflow = settings.WORKER_DB_MAX_OVERFLOW if max_overflow is None else max_overflow
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.engine = None
+        self._pid: Optional[int] = None
+        self._closers: List[Callable[[], Awaitable[Any]]] = []
+
+    @property
+    def started(self) -> bool:
+        return self.loop is not None and not self.loop.is_closed() and self._pid == os.getpid()
+
+    def start(self, database_url: Optional[str] = None, **engine_options):
+        if self.started:
+            return
+        from src.core.database import configure_engine
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.engine = configure_engine(
+            database_url, pool_size=self.pool_size, max_overflow=self.max_overflow, **engine_options
+        )
+        self._pid = os.getpid()
+        logger.info(f"Worker runtime started in process {self._pid} (DB pool {self.pool_size}+{self.max_overflow})")
+
+    def run(self, coro: Awaitable[Any]) -> Any:
+        """Runs a coroutine to completion on the process's loop (from a sync task body)."""
+        if not self.started:
+            self.start()
+        return self.loop.run_until_complete(coro)
+
+    def on_shutdown(self, closer: Callable[[], Awaitable[Any]]):
+        """Registers an async cleanup to run on the loop before it closes."""
+        self._closers.append(closer)
+
+    def shutdown(self):
+        if not self.started:
+            return
+        for closer in reversed(self._closers):
+            try:
+                self.loop.run_until_complete(closer())
+            except Exception as e:
+                logger.warning(f"Worker shutdown hook failed: {e}")
+        if self.engine is not None:
+            self.loop.run_until_complete(self.engine.dispose())
+            self.engine = None
+        self.loop.run_until_complete(self.loop.shutdown_asyncgens())
+        self.loop.close()
+        self.loop = None
+        self._pid = None
+
+async def _close_services():
+    from src.services.audit_logger import audit_logger
+    from src.services.vector_store import vector_store
+    await audit_logger.close()
+    await vector_store.close()
+
+worker_runtime = WorkerRuntime()
+worker_runtime.on_shutdown(_close_services)
+
+@signals.worker_process_init.connect
+def _start_worker_runtime(**kwargs):
+    worker_runtime.start()
+
+@signals.worker_process_shutdown.connect
+@signals.worker_shutdown.connect  # solo / threads pools have no child processes
+def _stop_worker_runtime(**kwargs):
+    worker_runtime.shutdown()
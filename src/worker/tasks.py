@@ -1,92 +1,158 @@
 from datetime import datetime
 import logging
 from src.worker.main import celery_app
+from src.worker.runtime import worker_runtime
 from src.models.ingestion import JobStatus, MediaType
 from src.core.database import AsyncSessionLocal
 from src.models.ingestion import IngestionJob
 from sqlalchemy import select, update
-import asyncio
 import os
 
 logger = logging.getLogger(__name__)
 
 @celery_app.task(name="process_ingestion_job", bind=True)
-def process_ingestion_job(self, job_id: str, tenant_id: str, media_type: str, file_path: str):
+def process_ingestion_job(
+    self, job_id: str, tenant_id: str, media_type: str, file_path: str, checksum: str = None, schedule: dict = None
+):
     """
     Main entry point for processing an ingestion job.
     This runs in a sync context (Celery), so we use a bridge for async DB calls if needed.
+    `checksum` is the SHA-256 recorded at upload; a downloaded source must match it.
+    `schedule` is the fair-share scheduler's bookkeeping (queue, timestamps, batch); once the job is
+    final, its slot passes to the tenant's next job in the queue.
     """
     logger.info(f"Processing job {job_id} for tenant {tenant_id} (Type: {media_type})")
-    
-    # 1. Update status to PROCESSING
-    loop = asyncio.get_event_loop()
-    loop.run_until_complete(update_job_status(job_id, JobStatus.PROCESSING))
-    
-    local_temp_path = None
+    is_remote = file_path.startswith("http")
+    final = True
+    # Whatever fails from here on, the finally releases the tenant's slot
     try:
-        # 2. Check if file_path is a URL and download if necessary
-        if file_path.startswith("http"):
-            import requests
-            import tempfile
+        if schedule and self.request.retries == 0:
+            from src.services.ingestion.scheduling import ingestion_scheduler
+            worker_runtime.run(ingestion_scheduler.record_wait(schedule))
+
+        # 1. Update status to PROCESSING
+        worker_runtime.run(update_job_status(job_id, JobStatus.PROCESSING))
+
+        # 2. Check if file_path is a URL and download if necessary (streamed, resumed on retry)
+        download = None
+        if is_remote:
+            from src.worker.downloads import source_downloader
             logger.info(f"Downloading remote file from {file_path}")
-            temp_file = tempfile.NamedTemporaryFile(delete=False)
-            response = requests.get(file_path)
-            temp_file.write(response.content)
-            temp_file.close()
-            local_temp_path = temp_file.name
-            working_path = local_temp_path
+            download = source_downloader.fetch(file_path, job_id, checksum=checksum)
+            working_path = download.path
         else:
             working_path = file_path
 
+        result = None
         if media_type == MediaType.TEXT:
-            process_text_job(job_id, tenant_id, working_path)
+            result = process_text_job(job_id, tenant_id, working_path, source=file_path)
         elif media_type == MediaType.AUDIO:
-            process_audio_job(job_id, tenant_id, working_path)
+            result = process_audio_job(job_id, tenant_id, working_path)
         elif media_type == MediaType.IMAGE:
-            process_image_job(job_id, tenant_id, working_path)
+            result = process_image_job(job_id, tenant_id, working_path)
         elif media_type == MediaType.VIDEO:
-            process_video_job(job_id, tenant_id, working_path)
+            result = process_video_job(job_id, tenant_id, working_path)
+        if download is not None and result is not None:
+            result = {**result, "download": download.as_dict()}
         
-        loop.run_until_complete(update_job_status(job_id, JobStatus.COMPLETED))
+        worker_runtime.run(update_job_status(job_id, JobStatus.COMPLETED, metadata=result))
         logger.info(f"Job {job_id} completed successfully")
         
     except Exception as e:
         logger.error(f"Job {job_id} failed: {str(e)}")
-        loop.run_until_complete(update_job_status(job_id, JobStatus.FAILED, error_message=str(e)))
+        worker_runtime.run(update_job_status(job_id, JobStatus.FAILED, error_message=str(e)))
+        # A retry keeps the (partial) download to resume from, and the tenant's slot
+        final = self.request.retries >= 3
         raise self.retry(exc=e, countdown=60, max_retries=3)
     finally:
-        # Cleanup temp file if created
-        if local_temp_path and os.path.exists(local_temp_path):
-            os.remove(local_temp_path)
+        if is_remote and final:
+            from src.worker.downloads import source_downloader
+            source_downloader.discard(file_path, job_id)
+        if schedule and final:
+            _job_finished(tenant_id, schedule)
+
+def _job_finished(tenant_id: str, schedule: dict):
+    from src.services.ingestion.scheduling import ingestion_scheduler
+    worker_runtime.run(ingestion_scheduler.release(schedule["queue"], tenant_id))
+    batch_id = schedule.get("batch_id")
+    # Per job, only a counter increment; the batch's status counts are aggregated once, by its last job
+    if batch_id and worker_runtime.run(_count_finished_job(batch_id)):
+        finalize_ingestion_batch(batch_id)
+
+async def _count_finished_job(batch_id: str) -> bool:
+    from src.services.ingestion.service import ingestion_service
+    async with AsyncSessionLocal() as session:
+        return await ingestion_service.count_finished_job(session, batch_id)
+
+@celery_app.task(name="finalize_ingestion_batch")
+def finalize_ingestion_batch(batch_id: str):
+    """Records when a bulk ingestion finished; run by the job that completes the batch."""
+    from src.services.ingestion.service import ingestion_service
 
-async def update_job_status(job_id: str, status: JobStatus, error_message: str = None):
+    async def finish():
+        async with AsyncSessionLocal() as session:
+            return await ingestion_service.finish_batch(session, batch_id)
+
+    progress = worker_runtime.run(finish())
+    if progress is not None:
+        logger.info(f"Ingestion batch {batch_id}: {progress['counts']} of {progress['total']} jobs")
+        return {"batch_id": batch_id, "counts": progress["counts"], "finished": progress["finished"]}
+
+@celery_app.task(name="move_tenant_layout")
+def move_tenant_layout(tenant_id: str, dedicated: bool):
+    """Moves a tenant's vectors to its dedicated collection (or back to the shared one)."""
+    from src.services.vector_store import vector_store
+    moved = worker_runtime.run(vector_store.move_tenant(tenant_id, dedicated))
+    return {"tenant_id": tenant_id, "dedicated": dedicated, "points_moved": moved}
+
+async def update_job_status(job_id: str, status: JobStatus, error_message: str = None, metadata: dict = None):
+    values = {"status": status, "error_message": error_message, "updated_at": datetime.utcnow()}
     async with AsyncSessionLocal() as session:
+        if metadata is not None:
+            # Merged into what the API recorded at upload (size, checksum) rather than replacing it
+            existing = (await session.execute(
+                select(IngestionJob.metadata_json).where(IngestionJob.id == job_id)
+            )).scalar_one_or_none()
+            values["metadata_json"] = {**(existing or {}), **metadata}
         stmt = (
             update(IngestionJob)
             .where(IngestionJob.id == job_id)
-            .values(status=status, error_message=error_message, updated_at=datetime.utcnow())
+            .values(**values)
         )
         await session.execute(stmt)
         await session.commit()
 
 # --- Media Processors ---
 
-def process_text_job(job_id, tenant_id, file_path):
+def process_text_job(job_id, tenant_id, file_path, source=None):
     if not os.path.exists(file_path):
         raise FileNotFoundError(f"File not found: {file_path}")
         
-    with open(file_path, "r", encoding="utf-8") as f:
-        text = f.read()
-    
-    # PII Scrubbing
+    # Streaming read -> PII scrub -> chunk pipeline (bounded memory, window at a time)
     from src.services.pii_scrubber import pii_scrubber
-    scrubbed_text = pii_scrubber.scrub_text(text)
-    
-    # Simple semantic chunking with overlap
-    chunks = chunk_text(scrubbed_text, chunk_size=500, overlap=50)
-    
-    logger.info(f"Chunked scrubbed text into {len(chunks)} fragments")
-    return chunks
+    from src.services.ingestion.chunking import stream_text_chunks
+    chunks = stream_text_chunks(file_path, scrub=pii_scrubber.scrub_text)
+
+    # Embed & bulk upsert as chunks are produced; a re-upload only re-embeds chunks that changed
+    from src.services.ingestion.versioning import document_versioning
+    source = source or file_path
+    metadata = {
+        "job_id": job_id,
+        "filename": os.path.basename(source),
+        "file_url": source
+    }
+    result = worker_runtime.run(document_versioning.index(job_id, tenant_id, chunks, metadata=metadata))
+    document = result["document"]
+    logger.info(
+        f"Indexed version {document['version']} of {metadata['filename']}: {document['chunks']} chunks "
+        f"({document['added']} new, {document['unchanged']} unchanged, {document['removed']} removed)"
+    )
+
+    # Size policy: large tenants get their own collection (moved online, in the background)
+    from src.services.vector_store import vector_store
+    if worker_runtime.run(vector_store.wants_dedicated(tenant_id)):
+        move_tenant_layout.delay(tenant_id, True)
+    return {"status": "success", **result}
 
 def process_audio_job(job_id, tenant_id, file_path):
     if not os.path.exists(file_path):
@@ -110,10 +176,5 @@ def process_video_job(job_id, tenant_id, file_path):
     return {"status": "success", "video_processing_complete": True}
 
 def chunk_text(text: str, chunk_size: int, overlap: int):
-    chunks = []
-    start = 0
-    while start < len(text):
-        end = start + chunk_size
-        chunks.append(text[start:end])
-        start += chunk_size - overlap
-    return chunks
+    from src.services.ingestion.chunking import iter_chunks
+    return list(iter_chunks([text], chunk_size, overlap))
@@ -0,0 +1,52 @@
+import pytest
+import pytest_asyncio
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from src.services.audit_logger import AuditLog, AuditLogger
+
+@pytest_asyncio.fixture
+async def session_factory():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(AuditLog.__table__.create)
+    yield async_sessionmaker(engine, expire_on_commit=False)
+    await engine.dispose()
+
+async def count_rows(session_factory):
+    async with session_factory() as session:
+        return (await session.execute(select(func.count()).select_from(AuditLog))).scalar_one()
+
+@pytest.mark.asyncio
+async def test_write_behind_batches_and_drains_on_close(session_factory):
+    writes = []
+    logger = AuditLogger(mode="write_behind", batch_size=10, flush_interval_ms=60_000, session_factory=session_factory)
+    original_insert = logger._insert
+
+    async def recording_insert(rows):
+        writes.append(len(rows))
+        await original_insert(rows)
+    logger._insert = recording_insert
+
+    for i in range(25):
+        await logger.log("tenant-a", action="retrieval_query", payload={"i": i})
+    await logger.close()
+
+    assert await count_rows(session_factory) == 25
+    assert sum(writes) == 25
+    assert max(writes) <= 10
+    assert len(writes) < 25
+
+@pytest.mark.asyncio
+async def test_drop_overflow_policy(session_factory):
+    logger = AuditLogger(mode="write_behind", queue_size=2, batch_size=100, overflow="drop", session_factory=session_factory)
+    for _ in range(5):
+        await logger.log("tenant-a", action="retrieval_query")
+    assert logger.dropped == 3
+    await logger.close()
+    assert await count_rows(session_factory) == 2
+
+@pytest.mark.asyncio
+async def test_sync_mode_inserts_inline(session_factory):
+    logger = AuditLogger(mode="sync", session_factory=session_factory)
+    await logger.log("tenant-a", action="ingest", resource_id="job-1")
+    assert await count_rows(session_factory) == 1
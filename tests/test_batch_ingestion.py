@@ -0,0 +1,116 @@
+import io
+import tarfile
+import zipfile
+import pytest
+import pytest_asyncio
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from starlette.datastructures import UploadFile
+from src.models.ingestion import IngestionBatch, IngestionJob, JobStatus, MediaType, Tenant
+from src.services.ingestion import service as service_module
+from src.services.ingestion.archives import infer_media_type, member_filename
+from src.services.ingestion.scheduling import IngestionScheduler
+from src.services.ingestion.service import BatchTooLargeError, IngestionService
+from src.services.storage import LocalStorage
+
+@pytest_asyncio.fixture
+async def session_factory():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        for table in (Tenant.__table__, IngestionBatch.__table__, IngestionJob.__table__):
+            await conn.run_sync(table.create)
+    factory = async_sessionmaker(engine, expire_on_commit=False)
+    async with factory() as session:
+        session.add(Tenant(id="tenant-a", name="A"))
+        await session.commit()
+    yield factory
+    await engine.dispose()
+
+@pytest.fixture
+def scheduler(monkeypatch, tmp_path):
+    scheduler = IngestionScheduler(max_inflight=100, local=True)
+    monkeypatch.setattr(service_module, "storage", LocalStorage(base_dir=str(tmp_path)))
+    monkeypatch.setattr(service_module, "ingestion_scheduler", scheduler)
+    return scheduler
+
+def upload(data: bytes, filename: str) -> UploadFile:
+    return UploadFile(file=io.BytesIO(data), filename=filename)
+
+def make_zip(members) -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as bundle:
+        for name, data in members.items():
+            bundle.writestr(name, data)
+    return buffer.getvalue()
+
+def make_tar(members) -> bytes:
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as bundle:
+        for name, data in members.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            bundle.addfile(info, io.BytesIO(data))
+    return buffer.getvalue()
+
+def test_media_type_and_member_names():
+    assert infer_media_type("notes.md") == MediaType.TEXT
+    assert infer_media_type("call.mp3") == MediaType.AUDIO
+    assert infer_media_type("scan.png") == MediaType.IMAGE
+    assert infer_media_type("setup.exe") is None
+    assert member_filename("docs/a/readme.md") == "docs_a_readme.md"
+    assert member_filename("../etc/passwd") is None
+    assert member_filename("__MACOSX/docs/._readme.md") is None
+
+@pytest.mark.asyncio
+async def test_batch_expands_archives_and_bulk_inserts_jobs(session_factory, scheduler):
+    files = [
+        upload(b"plain text", "intro.txt"),
+        upload(make_zip({"docs/a/readme.md": b"a", "docs/b/readme.md": b"b", "tool.exe": b"x"}), "docs.zip"),
+        upload(make_tar({"guides/setup.txt": b"setup", "intro.txt": b"again"}), "guides.tar.gz"),
+    ]
+    async with session_factory() as db:
+        batch = await IngestionService.create_batch(db, "tenant-a", files)
+
+    assert batch["jobs"] == 4
+    assert {s["filename"]: s["reason"] for s in batch["skipped"]} == {
+        "tool.exe": "unsupported media type", "intro.txt": "duplicate filename in batch"
+    }
+    batch_id = batch["batch_id"]
+    assert len(scheduler.sent) == 4
+    assert {m["kwargs"]["schedule"]["batch_id"] for m in scheduler.sent} == {batch_id}
+    assert {m["queue"] for m in scheduler.sent} == {"ingestion.text"}
+
+    async with session_factory() as db:
+        jobs = (await db.execute(select(IngestionJob).where(IngestionJob.batch_id == batch_id))).scalars().all()
+        assert len(jobs) == 4 and {j.status for j in jobs} == {JobStatus.PENDING}
+        stored = {j.filename: open(j.file_path, "rb").read() for j in jobs}
+        assert stored["docs_b_readme.md"] == b"b" and stored["guides_setup.txt"] == b"setup"
+
+        progress = await IngestionService.batch_progress(db, batch_id, tenant_id="tenant-a")
+        assert progress["counts"]["pending"] == 4 and not progress["finished"]
+        assert await IngestionService.batch_progress(db, batch_id, tenant_id="tenant-b") is None
+
+        # Finishing is a no-op until every job is completed or failed
+        assert (await IngestionService.finish_batch(db, batch_id))["finished_at"] is None
+        await db.execute(update(IngestionJob).where(IngestionJob.id == jobs[0].id).values(status=JobStatus.FAILED))
+        await db.execute(update(IngestionJob).where(IngestionJob.id != jobs[0].id).values(status=JobStatus.COMPLETED))
+        await db.commit()
+        progress = await IngestionService.finish_batch(db, batch_id)
+        assert progress["finished"] and progress["finished_at"] is not None
+        assert progress["counts"] == {"pending": 0, "processing": 0, "completed": 3, "failed": 1}
+        assert progress["progress"] == 1.0
+
+        # Jobs count themselves done atomically; only the last one reports the batch complete
+        assert [await IngestionService.count_finished_job(db, batch_id) for _ in range(4)] == [False, False, False, True]
+        assert await IngestionService.count_finished_job(db, "no-such-batch") is False
+
+
+@pytest.mark.asyncio
+async def test_batch_file_limit(session_factory, scheduler, monkeypatch):
+    monkeypatch.setattr(service_module.settings, "INGEST_BATCH_MAX_FILES", 2)
+    files = [upload(b"x", f"doc{i}.txt") for i in range(3)]
+    async with session_factory() as db:
+        with pytest.raises(BatchTooLargeError):
+            await IngestionService.create_batch(db, "tenant-a", files)
+        assert (await db.execute(select(IngestionJob))).scalars().all() == []
+    assert scheduler.sent == []
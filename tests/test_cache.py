@@ -0,0 +1,132 @@
+import asyncio
+import math
+import pytest
+import pytest_asyncio
+from src.services.cache import SemanticCache, classify_score, HIT, MISS, NEAR_MISS
+from src.services.vector_store import VectorStore
+
+def unit(cosine: float, axis: int = 0):
+    """A 1536-d unit vector at the given cosine to the `axis` basis vector."""
+    vector = [0.0] * 1536
+    vector[axis] = cosine
+    vector[axis + 1] = math.sqrt(1 - cosine * cosine)
+    return vector
+
+@pytest_asyncio.fixture
+async def cache():
+    index = VectorStore(location=":memory:", collection_name="semantic_cache", plain=True)
+    cache = SemanticCache(index=index, local=True)
+    cache.threshold, cache.near_miss_margin = 0.95, 0.05
+    yield cache
+    await index.close()
+
+def test_classify_score_buckets():
+    assert classify_score(None, 0.95, 0.05) == MISS
+    assert classify_score(0.99, 0.95, 0.05) == HIT
+    assert classify_score(0.95, 0.95, 0.05) == HIT
+    assert classify_score(0.92, 0.95, 0.05) == NEAR_MISS
+    assert classify_score(0.80, 0.95, 0.05) == MISS
+
+@pytest.mark.asyncio
+async def test_get_set_and_counters(cache):
+    await cache.set("t", "how long do refunds take?", unit(1.0), {"answer": "5 days"})
+
+    assert await cache.get("t", unit(0.99)) == {"answer": "5 days"}
+    assert await cache.get("t", unit(0.92)) is None
+    assert await cache.get("t", unit(0.5)) is None
+    # Other tenants never see the entry
+    assert await cache.get("other", unit(1.0)) is None
+
+    stats = await cache.stats("t")
+    assert (stats[HIT], stats[NEAR_MISS], stats[MISS]) == (1, 1, 1)
+    assert stats["bytes"] > 1536 * 4
+
+@pytest.mark.asyncio
+async def test_exact_match_short_circuits_the_vector_lookup(cache):
+    await cache.set("t", "how long do refunds take?", unit(1.0), {"answer": "5 days"})
+
+    async def no_search(*args, **kwargs):
+        raise AssertionError("the exact match must not search the index")
+    cache.index.search = no_search
+    # Whitespace-normalized, otherwise byte for byte
+    assert await cache.get_exact("t", "  how long do   refunds take?") == {"answer": "5 days"}
+    assert await cache.get_exact("t", "How long do refunds take?") is None
+    assert (await cache.stats("t"))[HIT] == 1
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("eviction, touched, evicted", [("lru", "a", "b"), ("lfu", "b", "a")])
+async def test_eviction_under_the_tenant_cap(cache, eviction, touched, evicted):
+    cache.eviction = eviction
+    await cache.set("t", "a", unit(1.0, axis=0), {"answer": "a"})
+    await cache.set("t", "b", unit(1.0, axis=2), {"answer": "b"})
+    entry_size = (await cache.stats("t"))["bytes"] // 2
+    # Room for two entries; the third has to push one out
+    cache.max_bytes = entry_size * 2 + entry_size // 2
+
+    # LRU: "a" becomes the most recent; LFU: "b" becomes the most used
+    for _ in range(2 if eviction == "lfu" else 1):
+        assert await cache.get_exact("t", touched) is not None
+    await cache.set("t", "c", unit(1.0, axis=4), {"answer": "c"})
+
+    assert await cache.get_exact("t", evicted) is None
+    assert await cache.get_exact("t", touched) is not None
+    # The new entry survives even though LFU ranks it coldest
+    assert await cache.get_exact("t", "c") == {"answer": "c"}
+    assert (await cache.stats("t"))["bytes"] <= cache.max_bytes
+    assert await cache.index.search("t", unit(1.0, axis=0 if evicted == "a" else 2), limit=1, score_threshold=0.9) == []
+
+@pytest.mark.asyncio
+async def test_entries_larger_than_the_cap_are_not_stored(cache):
+    cache.max_bytes = 1000
+    await cache.set("t", "q", unit(1.0), {"answer": "x"})
+    assert await cache.get_exact("t", "q") is None
+    assert await cache.index.search("t", unit(1.0), limit=1, score_threshold=0.9) == []
+
+@pytest.mark.asyncio
+async def test_expired_response_counts_as_miss_and_drops_the_orphaned_vector(cache):
+    cache.ttl = 0.05
+    await cache.set("t", "q", unit(1.0), {"answer": "x"})
+    await asyncio.sleep(0.1)
+
+    assert await cache.get("t", unit(1.0)) is None
+    stats = await cache.stats("t")
+    assert (stats[HIT], stats[MISS], stats["bytes"]) == (0, 1, 0)
+    assert await cache.index.search("t", unit(1.0), limit=1, score_threshold=0.9) == []
+
+@pytest.mark.asyncio
+async def test_expired_entries_are_pruned_on_lookup(cache):
+    cache.ttl = 0.05
+    await cache.set("t", "q", unit(1.0), {"answer": "x"})
+    await asyncio.sleep(0.1)
+
+    # An unrelated query finds the expired entry's bookkeeping and vector gone
+    assert await cache.get_exact("t", "something else") is None
+    assert (await cache.stats("t"))["bytes"] == 0
+    assert all(not members for members in cache._local_zsets.values())
+    assert await cache.index.tenant_point_count("t", exact=True) == 0
+
+@pytest.mark.asyncio
+async def test_expired_entries_do_not_count_toward_the_cap(cache):
+    cache.eviction = "lfu"
+    cache.ttl = 0.05
+    await cache.set("t", "old", unit(1.0, axis=0), {"answer": "old"})
+    for _ in range(3):
+        await cache.get_exact("t", "old")
+    entry_size = (await cache.stats("t"))["bytes"]
+    cache.max_bytes = entry_size * 2 + entry_size // 2
+    await asyncio.sleep(0.1)
+
+    # Without pruning, "a" (coldest by LFU) would be evicted to make room next to the expired "old"
+    cache.ttl = 60
+    await cache.set("t", "a", unit(1.0, axis=2), {"answer": "a"})
+    await cache.set("t", "b", unit(1.0, axis=4), {"answer": "b"})
+    assert await cache.get_exact("t", "a") == {"answer": "a"}
+    assert await cache.get_exact("t", "b") == {"answer": "b"}
+    assert entry_size < (await cache.stats("t"))["bytes"] <= cache.max_bytes
+
+@pytest.mark.asyncio
+async def test_cache_collection_has_a_minimal_schema(cache):
+    await cache.set("t", "q", unit(1.0), {"answer": "x"})
+    info = await cache.index.client.get_collection("semantic_cache")
+    assert info.config.params.vectors.size == 1536
+    assert not info.config.params.sparse_vectors
@@ -0,0 +1,39 @@
+import pytest
+from src.services.ingestion.chunking import iter_chunks, iter_text_windows, stream_text_chunks
+
+def reference_chunks(text, chunk_size, overlap):
+    chunks = []
+    start = 0
+    while start < len(text):
+        chunks.append(text[start:start + chunk_size])
+        start += chunk_size - overlap
+    return chunks
+
+SAMPLE = "".join(f"line {i}: the quick brown fox jumps over the lazy dog\n" for i in range(300))
+
+@pytest.mark.parametrize("segment_size", [1, 7, 64, 499, 500, 501, 5000])
+def test_iter_chunks_matches_whole_text_chunking(segment_size):
+    segments = [SAMPLE[i:i + segment_size] for i in range(0, len(SAMPLE), segment_size)]
+    assert list(iter_chunks(segments, 500, 50)) == reference_chunks(SAMPLE, 500, 50)
+
+def test_iter_chunks_rejects_overlap_ge_size():
+    with pytest.raises(ValueError):
+        list(iter_chunks(["abc"], 10, 10))
+
+def test_windows_cut_on_boundaries(tmp_path):
+    path = tmp_path / "doc.txt"
+    path.write_text(SAMPLE, encoding="utf-8")
+    windows = list(iter_text_windows(str(path), 256))
+    assert "".join(windows) == SAMPLE
+    assert len(windows) > 1
+    assert all(w.endswith("\n") for w in windows)
+    assert max(len(w) for w in windows) <= 2 * 256
+
+def test_stream_text_chunks_scrubs_per_window(tmp_path):
+    path = tmp_path / "doc.txt"
+    path.write_text(SAMPLE, encoding="utf-8")
+    chunks = list(stream_text_chunks(
+        str(path), scrub=lambda t: t.replace("fox", "<X>"), chunk_size=500, overlap=50, window_size=300
+    ))
+    expected = reference_chunks(SAMPLE.replace("fox", "<X>"), 500, 50)
+    assert chunks == expected
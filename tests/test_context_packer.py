@@ -0,0 +1,53 @@
+from src.services.context_packer import ContextPacker, merge_overlapping
+from src.services.ingestion.chunking import iter_chunks
+from src.services.rag_orchestrator import RAGOrchestrator
+from src.services.tokens import estimate_tokens
+
+TEXT = " ".join(f"sentence{i} about refunds and invoices." for i in range(60))
+
+def chunk_docs(filename, text, indices, size=200, overlap=50):
+    chunks = list(iter_chunks([text], size, overlap))
+    return [
+        {"text": chunks[i], "document_id": f"doc-{filename}", "metadata": {"filename": filename, "chunk_index": i}}
+        for i in indices
+    ]
+
+def test_merge_overlapping_removes_shared_seam():
+    chunks = list(iter_chunks([TEXT], 200, 50))
+    assert merge_overlapping(chunks[0], chunks[1], 100) == TEXT[:350]
+    assert merge_overlapping("abc", "xyz", 10) == "abc xyz"
+
+def test_adjacent_chunks_merge_and_rank_as_best_member():
+    a = chunk_docs("a.txt", TEXT, [3, 2])
+    other = {"text": "an unrelated passage on shipping times", "metadata": {"filename": "b.txt", "chunk_index": 0}}
+    # Rerank order: a#3, b#0, a#2
+    packed = ContextPacker(budget=10_000).pack([a[0], other, a[1]])
+
+    assert [p["chunk_indices"] for p in packed] == [[2, 3], [0]]
+    assert packed[0]["text"] == TEXT[300:650]
+    assert packed[1]["text"] == other["text"]
+
+def test_near_duplicates_dropped_and_budget_filled_greedily():
+    first = chunk_docs("a.txt", TEXT, [0])[0]
+    reupload = {**first, "document_id": "doc-copy", "metadata": {"filename": "copy.txt", "chunk_index": 0}}
+    big = {"text": "lengthy " * 200, "metadata": {"filename": "big.txt", "chunk_index": 0}}
+    small = {"text": "a short note about refunds", "metadata": {"filename": "note.txt", "chunk_index": 0}}
+
+    budget = estimate_tokens(first["text"]) + estimate_tokens(small["text"]) + 5
+    packed = ContextPacker(budget=budget).pack([first, reupload, big, small])
+    # The copy is a duplicate; the big passage doesn't fit, the smaller one after it does
+    assert [p["metadata"]["filename"] for p in packed] == ["a.txt", "note.txt"]
+    assert sum(estimate_tokens(p["text"]) for p in packed) <= budget
+
+    # An oversized best passage is truncated rather than leaving the context empty
+    packed = ContextPacker(budget=20).pack([big])
+    assert len(packed) == 1 and estimate_tokens(packed[0]["text"]) <= 21
+
+def test_citations_match_references():
+    packed = ContextPacker(budget=10_000).pack(chunk_docs("a.txt", TEXT, [5, 0, 1]))
+    orchestrator = RAGOrchestrator.__new__(RAGOrchestrator)
+    context = orchestrator._format_context(packed)
+    references = orchestrator._get_references(packed)
+    for reference in references:
+        assert f"[{reference['index']}] {reference['text']}" in context
+    assert [r["chunk_indices"] for r in references] == [[5], [0, 1]]
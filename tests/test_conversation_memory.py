@@ -0,0 +1,91 @@
+from datetime import datetime, timedelta
+import pytest
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from src.models.chat import Conversation, Message
+from src.services.conversation_memory import ConversationMemory
+from src.services.tokens import estimate_tokens, truncate_to_tokens
+
+class SummarizingLLM:
+    def __init__(self):
+        self.prompts = []
+
+    async def generate(self, prompt, system_prompt=None, **kwargs):
+        self.prompts.append(prompt)
+        return f"summary #{len(self.prompts)}"
+
+@pytest_asyncio.fixture
+async def session_factory():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Conversation.__table__.create)
+        await conn.run_sync(Message.__table__.create)
+    factory = async_sessionmaker(engine, expire_on_commit=False)
+    async with factory() as session:
+        session.add(Conversation(id="c1", tenant_id="tenant-a"))
+        await session.commit()
+    yield factory
+    await engine.dispose()
+
+async def add_turns(session_factory, start, count):
+    """`count` messages of ~25 tokens each, one second apart."""
+    base = datetime(2026, 1, 1)
+    async with session_factory() as session:
+        for i in range(start, start + count):
+            session.add(Message(
+                id=f"m{i:03d}", conversation_id="c1", role="user" if i % 2 == 0 else "assistant",
+                content=f"turn {i:03d} " + "x" * 90, created_at=base + timedelta(seconds=i)
+            ))
+        await session.commit()
+
+def test_token_helpers():
+    assert estimate_tokens("abcd" * 10) == 10
+    assert truncate_to_tokens("short", 10) == "short"
+    assert estimate_tokens(truncate_to_tokens("word " * 100, 10)) <= 11
+
+@pytest.mark.asyncio
+async def test_load_keeps_most_recent_turns_within_budget(session_factory):
+    memory = ConversationMemory(llm=SummarizingLLM(), session_factory=session_factory, history_budget=100, local=True)
+    await add_turns(session_factory, 0, 20)
+
+    async with session_factory() as db:
+        context = await memory.load(db, "c1")
+    # The newest turns, in order, not the oldest
+    assert [m.id for m in context.turns] == ["m016", "m017", "m018", "m019"]
+    assert context.summary == "" and context.tokens <= 100
+
+@pytest.mark.asyncio
+async def test_refresh_folds_older_turns_incrementally(session_factory):
+    llm = SummarizingLLM()
+    memory = ConversationMemory(llm=llm, session_factory=session_factory, history_budget=100, local=True)
+    await add_turns(session_factory, 0, 20)
+
+    state = await memory.refresh("c1")
+    assert state["summary"] == "summary #1" and state["through_id"] == "m015"
+    assert "turn 000" in llm.prompts[0] and "turn 015" in llm.prompts[0] and "turn 016" not in llm.prompts[0]
+
+    # Nothing new has left the window: no LLM call
+    await memory.refresh("c1")
+    assert len(llm.prompts) == 1
+
+    # Two more turns push two more out; only those are folded, onto the previous summary
+    await add_turns(session_factory, 20, 2)
+    state = await memory.refresh("c1")
+    assert state["through_id"] == "m017" and len(llm.prompts) == 2
+    assert "summary #1" in llm.prompts[1] and "turn 016" in llm.prompts[1] and "turn 015" not in llm.prompts[1]
+
+    async with session_factory() as db:
+        context = await memory.load(db, "c1")
+    assert context.summary == "summary #2"
+    assert [m.id for m in context.turns] == ["m018", "m019", "m020", "m021"]
+
+@pytest.mark.asyncio
+async def test_background_refresh_is_deduplicated(session_factory):
+    llm = SummarizingLLM()
+    memory = ConversationMemory(llm=llm, session_factory=session_factory, history_budget=50, local=True)
+    await add_turns(session_factory, 0, 6)
+    first = memory.schedule_refresh("c1")
+    assert memory.schedule_refresh("c1") is None
+    await first
+    await memory.close()
+    assert len(llm.prompts) == 1
@@ -0,0 +1,196 @@
+import pytest
+import pytest_asyncio
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from src.models.chat import Conversation, Message
+from src.services.conversation_memory import ConversationMemory
+from src.services.conversation_state import ConversationState
+
+class FlakyWrites:
+    """Fails the first `failures` database writes."""
+
+    def __init__(self, state, failures=1):
+        self.calls = 0
+        self.failures = failures
+        self.original = state._write
+        state._write = self
+
+    async def __call__(self, entries):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise ConnectionError("database unavailable")
+        await self.original(entries)
+
+@pytest_asyncio.fixture
+async def session_factory():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Conversation.__table__.create)
+        await conn.run_sync(Message.__table__.create)
+    yield async_sessionmaker(engine, expire_on_commit=False)
+    await engine.dispose()
+
+def make_state(session_factory, **kwargs):
+    return ConversationState(session_factory=session_factory, local=True, flush_interval_ms=60_000, **kwargs)
+
+async def count(session_factory, model):
+    async with session_factory() as session:
+        return (await session.execute(select(func.count()).select_from(model))).scalar_one()
+
+@pytest.mark.asyncio
+async def test_turns_are_served_hot_and_written_behind_in_one_batch(session_factory):
+    state = make_state(session_factory)
+    async with session_factory() as db:
+        assert (await state.ensure(db, "c1", "tenant-a", title="Chat"))["tenant_id"] == "tenant-a"
+        for i in range(3):
+            await state.append_message("c1", "user", f"question {i}")
+            await state.append_message("c1", "assistant", f"answer {i}")
+        # Nothing in the database yet; reads come from the hot tier
+        assert await count(session_factory, Message) == 0
+        assert [m.content for m in await state.recent_messages(db, "c1")][-2:] == ["question 2", "answer 2"]
+
+    assert await state.flush() == 7
+    assert await count(session_factory, Conversation) == 1 and await count(session_factory, Message) == 6
+    async with session_factory() as db:
+        conversation = (await db.execute(select(Conversation))).scalar_one()
+        last = (await db.execute(select(func.max(Message.created_at)))).scalar_one()
+    assert conversation.updated_at == last
+    await state.close()
+
+@pytest.mark.asyncio
+async def test_failed_writes_are_retried_and_redelivery_is_idempotent(session_factory):
+    state = make_state(session_factory)
+    writes = FlakyWrites(state)
+    async with session_factory() as db:
+        await state.ensure(db, "c1", "tenant-a")
+    message = await state.append_message("c1", "user", "hello")
+
+    with pytest.raises(ConnectionError):
+        await state.flush()
+    # Not acknowledged: still queued
+    assert await state.flush() == 2 and writes.calls == 2
+
+    # The same entries delivered again (e.g. a process died after committing, before acknowledging)
+    await state.append_message("c1", "user", "hello", message_id=message["id"])
+    await state.close()
+    assert await count(session_factory, Message) == 1
+
+@pytest.mark.asyncio
+async def test_cold_conversation_is_loaded_and_tenants_are_isolated(session_factory):
+    async with session_factory() as db:
+        db.add(Conversation(id="c1", tenant_id="tenant-a"))
+        db.add_all([Message(id=f"m{i}", conversation_id="c1", role="user", content=f"old {i}") for i in range(5)])
+        await db.commit()
+
+    state = make_state(session_factory, max_messages=3)
+    async with session_factory() as db:
+        assert await state.ensure(db, "c1", "tenant-b") is None
+        assert await state.ensure(db, "c1", "tenant-a") is not None
+        await state.append_message("c1", "assistant", "new")
+        assert [m.content for m in await state.recent_messages(db, "c1")] == ["old 3", "old 4", "new"]
+    await state.close()
+    assert await count(session_factory, Message) == 6
+
+@pytest.mark.asyncio
+async def test_forgotten_conversation_is_not_recreated(session_factory):
+    state = make_state(session_factory)
+    async with session_factory() as db:
+        await state.ensure(db, "c1", "tenant-a")
+    await state.append_message("c1", "user", "hello")
+    await state.forget("c1")
+    await state.close()
+    assert await count(session_factory, Conversation) == 0 and await count(session_factory, Message) == 0
+
+@pytest.mark.asyncio
+async def test_memory_reads_recent_turns_from_hot_tier(session_factory):
+    state = make_state(session_factory)
+    memory = ConversationMemory(llm=object(), session_factory=session_factory, history_budget=1000, state=state, local=True)
+    async with session_factory() as db:
+        await state.ensure(db, "c1", "tenant-a")
+        await state.append_message("c1", "user", "what is our refund policy?")
+        context = await memory.load(db, "c1")
+    assert [m.content for m in context.turns] == ["what is our refund policy?"]
+    await state.close()
+
+@pytest.mark.asyncio
+async def test_row_rejected_for_good_is_dead_lettered_without_blocking_the_batch(session_factory):
+    state = make_state(session_factory)
+    async with session_factory() as db:
+        await state.ensure(db, "c1", "tenant-a")
+    await state.append_message("c1", "user", "fine")
+    # content is NOT NULL: the database rejects this row however often it is retried
+    await state.append_message("c1", "user", None)
+    await state.append_message("c1", "assistant", "also fine")
+
+    assert await state.flush() == 4
+    assert await count(session_factory, Message) == 2 and await count(session_factory, Conversation) == 1
+    assert len(state.dead_letters) == 1 and '"content": null' in state.dead_letters[0]["data"]
+    # Acknowledged: nothing left to retry
+    assert await state.flush() == 0
+    await state.close()
+
+@pytest.mark.asyncio
+async def test_message_does_not_depend_on_its_conversation_entry(session_factory):
+    state = make_state(session_factory)
+    async with session_factory() as db:
+        await state.ensure(db, "c1", "tenant-a")
+    # The conversation's own entry is held elsewhere (e.g. by a process that died mid-flush)
+    conversation_entry = next(iter(state._local_outbox))
+    held = state._local_outbox.pop(conversation_entry)
+    await state.append_message("c1", "user", "hello")
+    await state.flush()
+    assert await count(session_factory, Conversation) == 1 and await count(session_factory, Message) == 1
+    assert state.dead_letters == []
+
+    # Redelivering the held entry later is a no-op
+    state._local_outbox[conversation_entry] = held
+    await state.close()
+    assert await count(session_factory, Conversation) == 1
+
+@pytest.mark.asyncio
+async def test_message_outliving_the_hot_metadata_still_gets_its_conversation(session_factory):
+    state = make_state(session_factory)
+    async with session_factory() as db:
+        await state.ensure(db, "c1", "tenant-a", title="Chat")
+    conversation_entry = next(iter(state._local_outbox))
+    held = state._local_outbox.pop(conversation_entry)
+    await state.append_message("c1", "user", "hello")
+    # The hot metadata expires before the queue drains (e.g. the database was down for longer than the TTL)
+    state._local_meta.pop("c1")
+    await state.flush()
+    assert state.dead_letters == []
+    async with session_factory() as db:
+        conversation = (await db.execute(select(Conversation))).scalar_one()
+    assert (conversation.tenant_id, conversation.title) == ("tenant-a", "Chat")
+    assert await count(session_factory, Message) == 1
+    state._local_outbox[conversation_entry] = held
+    await state.close()
+
+class FoldingLLM:
+    def __init__(self):
+        self.prompts = []
+
+    async def generate(self, prompt, system_prompt=None, **kwargs):
+        self.prompts.append(prompt)
+        return "summary"
+
+@pytest.mark.asyncio
+async def test_summary_refresh_folds_turns_not_written_behind_yet(session_factory):
+    state = make_state(session_factory)
+    llm = FoldingLLM()
+    memory = ConversationMemory(llm=llm, session_factory=session_factory, history_budget=30, state=state, local=True)
+    async with session_factory() as db:
+        await state.ensure(db, "c1", "tenant-a")
+    await state.flush()
+    for i in range(4):
+        await state.append_message("c1", "user", f"turn {i} " + "x" * 90)
+    # Only the conversation is in the database; the turns are still queued
+    assert await count(session_factory, Message) == 0
+
+    summary = await memory.refresh("c1")
+    assert "turn 0" in llm.prompts[0] and "turn 2" in llm.prompts[0] and "turn 3" not in llm.prompts[0]
+    async with session_factory() as db:
+        context = await memory.load(db, "c1")
+    assert context.summary == "summary" and [m.content[:6] for m in context.turns] == ["turn 3"]
+    assert summary["through_id"] == (await state.recent_messages(None, "c1"))[2].id
+    await state.close()
@@ -0,0 +1,75 @@
+import pytest
+import pytest_asyncio
+from src.services.ingestion.dedup import NearDuplicateIndex, chunk_point_id, content_hash, hamming, simhash
+from src.services.ingestion.indexer import ChunkIndexer
+from src.services.providers import MockEmbedder
+from src.services.vector_store import VectorStore
+
+def test_content_hash_ignores_whitespace_layout():
+    assert content_hash("a  b\nc") == content_hash("a b c")
+    assert content_hash("a b c") != content_hash("a b d")
+
+def test_simhash_distance_tracks_similarity():
+    base = " ".join(f"term{i}" for i in range(200))
+    near = base.replace("term100", "changed")
+    other = " ".join(f"other{i}" for i in range(200))
+    assert hamming(simhash(base), simhash(base.upper())) == 0
+    assert hamming(simhash(base), simhash(near)) <= 3
+    assert hamming(simhash(base), simhash(other)) > 10
+
+BASE = " ".join(f"word{i}" for i in range(120))
+EDITED = BASE.replace("word60", "changed")
+
+@pytest_asyncio.fixture
+async def store():
+    store = VectorStore(location=":memory:", hybrid=False)
+    yield store
+    await store.close()
+
+def indexer(store):
+    return ChunkIndexer(
+        embedder=MockEmbedder(), store=store, batch_size=4, hybrid=False,
+        dedup=True, dedup_index=NearDuplicateIndex(local=True)
+    )
+
+async def payload(store, point_id):
+    records = await store.client.retrieve("rag_vectors", ids=[point_id], with_payload=True)
+    return records[0].payload if records else None
+
+@pytest.mark.asyncio
+async def test_indexer_skips_a_near_duplicate_chunk(store):
+    chunks = indexer(store)
+    assert (await chunks.index("t", [BASE], document_id="doc-a"))["chunks"] == 1
+
+    stats = await chunks.index("t", [EDITED, "an unrelated chunk about invoices"], document_id="doc-b")
+    assert stats["chunks"] == 1 and stats["near_duplicates"] == 1
+    assert await payload(store, chunk_point_id("t", EDITED)) is None
+    # The matched point now serves both documents
+    assert (await payload(store, chunk_point_id("t", BASE)))["document_ids"] == ["doc-a", "doc-b"]
+
+@pytest.mark.asyncio
+async def test_previous_version_does_not_suppress_its_edited_chunk(store):
+    chunks = indexer(store)
+    await chunks.index("t", [BASE], document_id="doc-a")
+    previous = await store.document_point_ids("t", "doc-a")
+
+    # The edit is near the old chunk, but that chunk is the version being replaced
+    stats = await chunks.index("t", [EDITED], document_id="doc-a", previous_ids=previous)
+    assert stats["chunks"] == 1 and stats["near_duplicates"] == 0
+    assert (await payload(store, chunk_point_id("t", EDITED)))["text"] == EDITED
+
+@pytest.mark.asyncio
+async def test_release_document_keeps_points_another_document_references(store):
+    chunks = indexer(store)
+    await chunks.index("t", [BASE, "only in doc a"], document_id="doc-a")
+    await chunks.index("t", [EDITED], document_id="doc-b")
+    shared, own = chunk_point_id("t", BASE), chunk_point_id("t", "only in doc a")
+
+    removed = await store.release_document("t", [shared, own], "doc-a")
+    assert removed == {own: "only in doc a"}
+    assert await payload(store, own) is None
+    kept = await payload(store, shared)
+    assert kept["document_ids"] == ["doc-b"] and kept["document_id"] == "doc-b"
+
+    assert await store.release_document("t", [shared], "doc-b") == {shared: BASE}
+    assert await payload(store, shared) is None
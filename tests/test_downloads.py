@@ -0,0 +1,126 @@
+import hashlib
+import os
+import httpx
+import pytest
+from src.worker.downloads import ChecksumMismatchError, SourceDownloader
+
+BODY = bytes(range(256)) * 400
+CHECKSUM = hashlib.sha256(BODY).hexdigest()
+
+class RangeServer:
+    """Serves BODY, honouring `Range: bytes=n-` unless `ranges` is False."""
+
+    def __init__(self, ranges=True):
+        self.ranges = ranges
+        self.requests = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        header = request.headers.get("range")
+        if header and self.ranges:
+            start = int(header[len("bytes="):-1])
+            if start >= len(BODY):
+                return httpx.Response(416)
+            return httpx.Response(206, content=BODY[start:])
+        return httpx.Response(200, content=BODY)
+
+def downloader(tmp_path, server):
+    client = httpx.Client(transport=httpx.MockTransport(server))
+    return SourceDownloader(
+        client=client,
+        download_dir=str(tmp_path / "downloads"),
+        storage_dir=str(tmp_path / "storage"),
+        chunk_size=4096
+    )
+
+def test_download_streams_to_disk_and_verifies(tmp_path):
+    server = RangeServer()
+    result = downloader(tmp_path, server).fetch("http://files/t1/doc.txt", "job-1", checksum=CHECKSUM)
+    assert open(result.path, "rb").read() == BODY
+    assert result.sha256 == CHECKSUM and result.resumed_from == 0 and not result.reused
+
+def test_partial_download_resumes_with_range(tmp_path):
+    server = RangeServer()
+    d = downloader(tmp_path, server)
+    url = "http://files/t1/doc.txt"
+    os.makedirs(d.download_dir)
+    with open(d.path_for(url, "job-1") + ".part", "wb") as f:
+        f.write(BODY[:10_000])
+
+    result = d.fetch(url, "job-1", checksum=CHECKSUM)
+    assert server.requests[0].headers["range"] == "bytes=10000-"
+    assert result.resumed_from == 10_000
+    assert open(result.path, "rb").read() == BODY
+    assert not os.path.exists(result.path + ".part")
+
+    # A later attempt reuses the completed file without any request
+    again = d.fetch(url, "job-1", checksum=CHECKSUM)
+    assert again.reused and len(server.requests) == 1
+
+def test_server_without_range_support_restarts(tmp_path):
+    server = RangeServer(ranges=False)
+    d = downloader(tmp_path, server)
+    url = "http://files/t1/doc.txt"
+    os.makedirs(d.download_dir)
+    with open(d.path_for(url, "job-1") + ".part", "wb") as f:
+        f.write(BODY[:10_000])
+
+    result = d.fetch(url, "job-1", checksum=CHECKSUM)
+    assert result.resumed_from == 0
+    assert open(result.path, "rb").read() == BODY
+
+def test_checksum_mismatch_discards_download(tmp_path):
+    d = downloader(tmp_path, RangeServer())
+    url = "http://files/t1/doc.txt"
+    with pytest.raises(ChecksumMismatchError):
+        d.fetch(url, "job-1", checksum="0" * 64)
+    assert not os.path.exists(d.path_for(url, "job-1"))
+    assert not os.path.exists(d.path_for(url, "job-1") + ".part")
+
+def test_local_storage_copy_is_reused(tmp_path):
+    server = RangeServer()
+    d = downloader(tmp_path, server)
+    os.makedirs(tmp_path / "storage" / "t1")
+    (tmp_path / "storage" / "t1" / "doc.txt").write_bytes(BODY)
+
+    result = d.fetch("http://api/storage/t1/doc.txt", "job-1", checksum=CHECKSUM)
+    assert result.reused and result.path == str(tmp_path / "storage" / "t1" / "doc.txt")
+    assert server.requests == []
+    # Without a checksum to verify against, it is downloaded
+    d.fetch("http://api/storage/t1/doc.txt", "job-1")
+    assert len(server.requests) == 1
+
+def test_jobs_for_the_same_url_keep_separate_copies(tmp_path):
+    server = RangeServer()
+    d = downloader(tmp_path, server)
+    url = "http://files/t1/doc.txt"
+    os.makedirs(d.download_dir)
+    # Another job is midway through the same URL
+    with open(d.path_for(url, "job-2") + ".part", "wb") as f:
+        f.write(BODY[:10_000])
+
+    result = d.fetch(url, "job-1", checksum=CHECKSUM)
+    assert result.resumed_from == 0 and "range" not in server.requests[0].headers
+    d.discard(url, "job-1")
+    assert not os.path.exists(result.path)
+    assert os.path.getsize(d.path_for(url, "job-2") + ".part") == 10_000
+
+def test_local_storage_copy_with_an_encoded_filename_is_reused(tmp_path):
+    server = RangeServer()
+    d = downloader(tmp_path, server)
+    os.makedirs(tmp_path / "storage" / "t 1")
+    (tmp_path / "storage" / "t 1" / "résumé q3.txt").write_bytes(BODY)
+
+    result = d.fetch("http://api/storage/t%201/r%C3%A9sum%C3%A9%20q3.txt", "job-1", checksum=CHECKSUM)
+    assert result.reused and result.path == str(tmp_path / "storage" / "t 1" / "résumé q3.txt")
+    assert server.requests == []
+
+@pytest.mark.parametrize("path", ["/%2E%2E/secret.txt", "/t1/..%2Fsecret.txt", "/t1/%2E%2E", "/..%5Csecret.txt/x"])
+def test_local_storage_copy_stays_inside_the_storage_dir(tmp_path, path):
+    server = RangeServer()
+    d = downloader(tmp_path, server)
+    os.makedirs(tmp_path / "storage" / "t1")
+    (tmp_path / "secret.txt").write_bytes(BODY)
+
+    result = d.fetch(f"http://api/storage{path}", "job-1", checksum=CHECKSUM)
+    assert not result.reused and len(server.requests) == 1
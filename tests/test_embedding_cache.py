@@ -0,0 +1,44 @@
+import pytest
+from typing import List
+from src.services.base import BaseEmbedder
+from src.services.embedding_cache import CachedEmbedder
+
+class CountingEmbedder(BaseEmbedder):
+    def __init__(self):
+        self.batches = []
+
+    async def embed_text(self, text: str) -> List[float]:
+        return (await self.embed_batch([text]))[0]
+
+    async def embed_batch(self, texts: List[str]) -> List[List[float]]:
+        self.batches.append(list(texts))
+        return [[float(len(t)), 0.5, -1.0] for t in texts]
+
+    async def embed_image(self, image_path: str) -> List[float]:
+        return [0.0]
+
+@pytest.mark.asyncio
+async def test_only_misses_reach_provider():
+    inner = CountingEmbedder()
+    embedder = CachedEmbedder(inner, provider="counting", local_size=100)
+
+    first = await embedder.embed_batch(["alpha", "beta", "alpha"])
+    assert inner.batches == [["alpha", "beta"]]
+    assert first[0] == first[2] == [5.0, 0.5, -1.0]
+
+    second = await embedder.embed_batch(["beta", "  gamma ", "alpha"])
+    assert inner.batches[-1] == ["  gamma "]
+    assert second[0] == first[1]
+
+    # Whitespace-normalized text hits the cache
+    assert await embedder.embed_text("gamma") == second[1]
+    assert len(inner.batches) == 2
+
+@pytest.mark.asyncio
+async def test_local_tier_is_bounded_lru():
+    inner = CountingEmbedder()
+    embedder = CachedEmbedder(inner, provider="counting", local_size=2)
+    await embedder.embed_batch(["a", "bb", "ccc"])
+    assert len(embedder._local) == 2
+    await embedder.embed_text("a")
+    assert inner.batches[-1] == ["a"]
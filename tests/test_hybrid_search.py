@@ -0,0 +1,43 @@
+import pytest
+from src.services.sparse_encoder import SparseEncoder, tokenize
+from src.services.vector_store import VectorStore, reciprocal_rank_fusion
+
+def test_tokenize_keeps_identifiers():
+    assert tokenize("Got ERR-4012 on SKU_1138 with v2.3.1") == ["got", "err-4012", "sku_1138", "v2.3.1"]
+
+def test_reciprocal_rank_fusion_weights():
+    dense = [{"id": "a", "score": 0.9, "payload": {}}, {"id": "b", "score": 0.8, "payload": {}}]
+    sparse = [{"id": "c", "score": 7.0, "payload": {}}, {"id": "b", "score": 3.0, "payload": {}}]
+    fused = reciprocal_rank_fusion([dense, sparse], k=60)
+    assert [h["id"] for h in fused] == ["b", "a", "c"]
+    fused = reciprocal_rank_fusion([dense, sparse], weights=[0.0, 1.0], k=60)
+    assert fused[0]["id"] == "c"
+
+def test_query_idf_prefers_rare_terms():
+    encoder = SparseEncoder()
+    query = encoder.encode_query("reset error ERR-4012", doc_count=1000, doc_freqs={"reset": 400, "error": 600, "err-4012": 2})
+    weights = sorted(query.values())
+    assert weights[-1] > 5 * weights[0]
+
+@pytest.mark.asyncio
+async def test_hybrid_search_finds_exact_identifier():
+    encoder = SparseEncoder()
+    store = VectorStore(location=":memory:")
+    texts = ["general billing question", "payment failed with code ERR-4012", "shipping delays overview"]
+    # Dense vectors that do NOT favour the identifier chunk
+    vectors = [[1.0, 0.0] + [0.0] * 1534, [0.0, 1.0] + [0.0] * 1534, [0.9, 0.1] + [0.0] * 1534]
+    await store.upsert_batch(
+        "tenant-a", vectors, [{"text": t} for t in texts],
+        sparse_vectors=[encoder.encode_document(t) for t in texts]
+    )
+
+    query = [1.0, 0.0] + [0.0] * 1534
+    dense_only = await store.search("tenant-a", query, limit=1, score_threshold=0.0)
+    assert dense_only[0]["payload"]["text"] == "general billing question"
+
+    hybrid = await store.search(
+        "tenant-a", query, limit=3, score_threshold=0.0,
+        sparse_vector=encoder.encode_query("ERR-4012"), fusion_weights=(1.0, 2.0)
+    )
+    assert hybrid[0]["payload"]["text"] == "payment failed with code ERR-4012"
+    await store.close()
@@ -0,0 +1,76 @@
+import pytest
+from src.services.ingestion.dedup import NearDuplicateIndex, chunk_point_id
+from src.services.ingestion.indexer import ChunkIndexer
+from src.services.providers import MockEmbedder
+
+class RecordingStore:
+    def __init__(self):
+        self.calls = []
+
+    async def upsert_batch(self, tenant_id, vectors, payloads, point_ids=None, sparse_vectors=None):
+        self.calls.append((tenant_id, vectors, payloads, point_ids))
+        return len(vectors)
+
+@pytest.mark.asyncio
+async def test_indexer_bulk_upserts_in_batches():
+    store = RecordingStore()
+    indexer = ChunkIndexer(embedder=MockEmbedder(), store=store, batch_size=4, concurrency=2, hybrid=False, dedup=False)
+    chunks = (f"chunk {i}" for i in range(10))
+
+    stats = await indexer.index("tenant-a", chunks, metadata={"filename": "doc.txt"})
+
+    assert stats["chunks"] == 10
+    assert stats["upserts"] == 3
+    assert sorted(len(c[1]) for c in store.calls) == [2, 4, 4]
+    indices = sorted(p["metadata"]["chunk_index"] for c in store.calls for p in c[2])
+    assert indices == list(range(10))
+    assert all(p["metadata"]["filename"] == "doc.txt" for c in store.calls for p in c[2])
+
+@pytest.mark.asyncio
+async def test_indexer_empty_input():
+    store = RecordingStore()
+    indexer = ChunkIndexer(embedder=MockEmbedder(), store=store, batch_size=4, hybrid=False, dedup=False)
+    stats = await indexer.index("tenant-a", [])
+    assert stats["chunks"] == 0
+    assert stats["vectors_per_upsert"] == 0.0
+    assert store.calls == []
+
+@pytest.mark.asyncio
+async def test_indexer_uses_deterministic_chunk_ids():
+    store = RecordingStore()
+    indexer = ChunkIndexer(embedder=MockEmbedder(), store=store, batch_size=8, hybrid=False, dedup=False)
+    await indexer.index("tenant-a", ["alpha", "beta"])
+    await indexer.index("tenant-a", ["alpha", "beta"])
+    first, second = store.calls
+    assert first[3] == second[3] == [chunk_point_id("tenant-a", "alpha"), chunk_point_id("tenant-a", "beta")]
+    assert chunk_point_id("tenant-b", "alpha") != chunk_point_id("tenant-a", "alpha")
+
+@pytest.mark.asyncio
+async def test_reindexing_and_near_duplicates_are_skipped():
+    from src.services.vector_store import VectorStore
+    store = VectorStore(location=":memory:", hybrid=False)
+    indexer = ChunkIndexer(
+        embedder=MockEmbedder(), store=store, batch_size=4, hybrid=False,
+        dedup=True, dedup_index=NearDuplicateIndex(local=True)
+    )
+    base = " ".join(f"word{i}" for i in range(120))
+    chunks = [base, f"{base} extra", "something else entirely about invoices and refunds"]
+
+    stats = await indexer.index("tenant-a", chunks)
+    assert stats["chunks"] == 2 and stats["near_duplicates"] == 1
+    assert stats["duplicate_ratio"] == round(1 / 3, 4)
+
+    # A retried job re-embeds nothing
+    stats = await indexer.index("tenant-a", chunks)
+    assert stats["chunks"] == 0 and stats["exact_duplicates"] == 2 and stats["near_duplicates"] == 1
+    assert (await store.client.count("rag_vectors")).count == 2
+
+    # Duplicates are per tenant
+    stats = await indexer.index("tenant-b", chunks[:1])
+    assert stats["chunks"] == 1
+
+    # Entries whose points were deleted no longer suppress re-indexing
+    await store.delete("tenant-a", [chunk_point_id("tenant-a", base)])
+    stats = await indexer.index("tenant-a", chunks[:1])
+    assert stats["chunks"] == 1
+    await store.close()
@@ -0,0 +1,46 @@
+import os
+import pytest
+from sqlalchemy import create_engine, inspect
+from src.core.config import settings
+from src.core.database import Base
+import src.models.chat  # noqa: F401 (registers tables on Base.metadata)
+import src.models.evaluation  # noqa: F401
+import src.models.ingestion  # noqa: F401
+import src.services.audit_logger  # noqa: F401 (AuditLog)
+
+pytest.importorskip("alembic")
+from alembic import command
+from alembic.config import Config
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def alembic_config() -> Config:
+    config = Config(os.path.join(ROOT, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(ROOT, "migrations"))
+    return config
+
+def test_fresh_database_upgrades_to_the_models_schema_and_back(tmp_path, monkeypatch):
+    path = tmp_path / "fresh.db"
+    monkeypatch.setattr(settings, "DATABASE_URL", f"sqlite+aiosqlite:///{path}")
+    command.upgrade(alembic_config(), "head")
+
+    inspector = inspect(create_engine(f"sqlite:///{path}"))
+    assert set(Base.metadata.tables) <= set(inspector.get_table_names())
+    for name, table in Base.metadata.tables.items():
+        assert {c["name"] for c in inspector.get_columns(name)} == set(table.columns.keys()), name
+
+    command.downgrade(alembic_config(), "base")
+    assert set(inspect(create_engine(f"sqlite:///{path}")).get_table_names()) <= {"alembic_version"}
+
+def test_database_that_predates_migrations_is_upgraded_in_place(tmp_path, monkeypatch):
+    path = tmp_path / "existing.db"
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.begin() as conn:
+        conn.exec_driver_sql("CREATE TABLE tenants (id VARCHAR PRIMARY KEY, name VARCHAR NOT NULL, created_at DATETIME)")
+        conn.exec_driver_sql("INSERT INTO tenants (id, name) VALUES ('t1', 'Tenant')")
+    monkeypatch.setattr(settings, "DATABASE_URL", f"sqlite+aiosqlite:///{path}")
+    command.upgrade(alembic_config(), "head")
+
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql("SELECT name FROM tenants").scalar_one() == "Tenant"
+    assert "batch_id" in {c["name"] for c in inspect(engine).get_columns("ingestion_jobs")}
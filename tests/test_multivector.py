@@ -0,0 +1,64 @@
+import math
+import random
+import pytest
+from qdrant_client.http import models
+from src.services.tenant_router import dedicated_collection_name
+from src.services.vector_store import VectorStore, truncate_vector, FULL_VECTOR_NAME, PREFIX_VECTOR_NAME
+
+def _random_vectors(n: int, rng: random.Random, dim: int = 1536):
+    return [[rng.gauss(0, 1) for _ in range(dim)] for _ in range(n)]
+
+def test_truncate_vector_is_unit_length_prefix():
+    prefix = truncate_vector([3.0, 4.0, 12.0], 2)
+    assert prefix == [0.6, 0.8]
+    assert math.isclose(sum(x * x for x in prefix), 1.0)
+
+@pytest.mark.asyncio
+async def test_two_stage_matches_single_stage_top_hits():
+    rng = random.Random(3)
+    vectors = _random_vectors(60, rng)
+    two_stage = VectorStore(location=":memory:", two_stage=True)
+    await two_stage.upsert_batch("t", vectors, [{"row": i} for i in range(60)])
+    single = VectorStore(location=":memory:", two_stage=False)
+    single.client = two_stage.client
+
+    query = vectors[17]
+    fast = await two_stage.search("t", query, limit=3, score_threshold=None, with_vectors=True)
+    exact = await single.search("t", query, limit=3, score_threshold=None)
+    assert fast[0]["payload"]["row"] == exact[0]["payload"]["row"] == 17
+    # Rescored on the full vector: same scores as the one-stage search
+    assert math.isclose(fast[0]["score"], exact[0]["score"], rel_tol=1e-5)
+    assert len(fast[0]["vector"]) == 1536
+    await two_stage.close()
+
+@pytest.mark.asyncio
+async def test_image_vectors_live_in_their_own_space():
+    store = VectorStore(location=":memory:")
+    await store.upsert("t", [1.0] + [0.0] * 1535, {"text": "caption"})
+    await store.upsert_image_batch("t", [[0.0, 1.0] + [0.0] * 510], [{"filename": "cat.png"}])
+
+    images = await store.search_images("t", [0.0, 1.0] + [0.0] * 510, limit=5)
+    assert [hit["payload"]["filename"] for hit in images] == ["cat.png"]
+    texts = await store.search("t", [1.0] + [0.0] * 1535, limit=5)
+    assert [hit["payload"]["text"] for hit in texts] == ["caption"]
+    await store.close()
+
+@pytest.mark.asyncio
+async def test_legacy_unnamed_collection_keeps_working_and_migrates():
+    store = VectorStore(location=":memory:", hybrid=False)
+    await store.client.create_collection(
+        "rag_vectors", vectors_config=models.VectorParams(size=1536, distance=models.Distance.COSINE)
+    )
+    await store.upsert("t", [1.0] + [0.0] * 1535, {"text": "old"})
+    hits = await store.search("t", [1.0] + [0.0] * 1535, limit=1, with_vectors=True)
+    assert hits[0]["payload"]["text"] == "old" and len(hits[0]["vector"]) == 1536
+    with pytest.raises(ValueError):
+        await store.search_images("t", [0.0] * 512)
+
+    # Moving the tenant re-lays its points out as named full + prefix vectors
+    assert await store.move_tenant("t", dedicated=True) == 1
+    records, _ = await store.client.scroll(dedicated_collection_name("rag_vectors", "t"), with_vectors=True)
+    assert set(records[0].vector) == {FULL_VECTOR_NAME, PREFIX_VECTOR_NAME}
+    hits = await store.search("t", [1.0] + [0.0] * 1535, limit=1)
+    assert hits[0]["payload"]["text"] == "old"
+    await store.close()
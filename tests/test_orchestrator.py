@@ -0,0 +1,126 @@
+import asyncio
+import pytest
+import pytest_asyncio
+from src.models.chat import Conversation, Message
+from src.services.rag_orchestrator import StageTimings
+
+@pytest.mark.asyncio
+async def test_stage_timings_record_concurrent_stages():
+    timings = StageTimings()
+    await asyncio.gather(
+        timings.measure("history", asyncio.sleep(0.1)),
+        timings.measure("embed", asyncio.sleep(0.1)),
+    )
+    stages = timings.as_dict()
+    assert stages["history"] >= 100 and stages["embed"] >= 100
+    # Both stages ran concurrently, so the whole query took ~one stage, not two
+    assert stages["total"] < 190
+
+class FakeCache:
+    def __init__(self, exact=None):
+        self.exact = exact
+        self.stored = []
+
+    async def get_exact(self, tenant_id, query_text):
+        return self.exact
+
+    async def get(self, tenant_id, query_vector):
+        return None
+
+    async def set(self, tenant_id, query_text, query_vector, response):
+        self.stored.append(response)
+
+class FakeLLM:
+    def __init__(self):
+        self.calls = []
+
+    async def generate(self, prompt, system_prompt=None, **kwargs):
+        self.calls.append("generate")
+        return "Refunds take 5 days [1]."
+
+    async def generate_stream(self, prompt, system_prompt=None, **kwargs):
+        self.calls.append("generate_stream")
+        for chunk in ("Refunds take ", "5 days [1]."):
+            yield chunk
+
+class FakeEmbedder:
+    async def embed_text(self, text):
+        return [0.1, 0.2]
+
+@pytest_asyncio.fixture
+async def orchestrator(monkeypatch):
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+    from src.services import rag_orchestrator as module
+    from src.services.conversation_memory import ConversationMemory
+    from src.services.conversation_state import ConversationState
+
+    async def log(*args, **kwargs):
+        pass
+
+    async def search(*args, **kwargs):
+        return [{"id": "p1", "payload": {"text": "Refunds are issued within 5 days.", "metadata": {"filename": "faq.txt"}}}]
+
+    async def rerank(query, docs, top_k, **kwargs):
+        return docs[:top_k]
+
+    async def no_evaluation(*args, **kwargs):
+        pass
+
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Conversation.__table__.create)
+        await conn.run_sync(Message.__table__.create)
+    factory = async_sessionmaker(engine, expire_on_commit=False)
+    state = ConversationState(session_factory=factory, local=True, flush_interval_ms=60_000)
+    monkeypatch.setattr(module, "conversation_state", state)
+    memory = ConversationMemory(llm=FakeLLM(), session_factory=factory, state=state, local=True)
+    monkeypatch.setattr(module, "conversation_memory", memory)
+    monkeypatch.setattr(module.audit_logger, "log", log)
+    monkeypatch.setattr(module.vector_store, "search", search)
+    monkeypatch.setattr(module.reranker, "rerank", rerank)
+    monkeypatch.setattr(module.settings, "HYBRID_SEARCH_ENABLED", False)
+
+    orchestrator = module.RAGOrchestrator.__new__(module.RAGOrchestrator)
+    orchestrator.llm = FakeLLM()
+    orchestrator.embedder = FakeEmbedder()
+    orchestrator._handle_evaluation = no_evaluation
+    orchestrator.module = module
+    orchestrator.state = state
+    yield orchestrator
+    await memory.close()
+    await state.close()
+    await engine.dispose()
+
+async def start_conversation(orchestrator):
+    orchestrator.state._local_meta["c1"] = '{"id": "c1", "tenant_id": "tenant-a"}'
+
+@pytest.mark.asyncio
+async def test_buffered_answer_is_generated_in_one_call_and_cached(orchestrator, monkeypatch):
+    cache = FakeCache()
+    monkeypatch.setattr(orchestrator.module, "semantic_cache", cache)
+    await start_conversation(orchestrator)
+
+    result = await orchestrator.answer("tenant-a", "how long do refunds take?", "c1", db=None)
+    assert orchestrator.llm.calls == ["generate"]
+    assert result["answer"] == "Refunds take 5 days [1]." and result["cached"] is False
+    assert result["references"][0]["index"] == 1 and result["sources"] == [{"name": "faq.txt", "url": "#"}]
+    # What is cached is exactly the buffered document
+    assert cache.stored == [{k: result[k] for k in ("answer", "references", "sources")}]
+
+@pytest.mark.asyncio
+async def test_cache_hit_replays_the_same_schema_in_both_modes(orchestrator, monkeypatch):
+    live_cache = FakeCache()
+    monkeypatch.setattr(orchestrator.module, "semantic_cache", live_cache)
+    await start_conversation(orchestrator)
+    live = [e async for e in orchestrator.query("tenant-a", "refunds?", "c1", db=None, stream=True)]
+
+    monkeypatch.setattr(orchestrator.module, "semantic_cache", FakeCache(exact=live_cache.stored[0]))
+    replayed = [e async for e in orchestrator.query("tenant-a", "refunds?", "c1", db=None, stream=True)]
+    assert [e["type"] for e in replayed] == ["content", "references", "source_material", "timings"]
+    assert replayed[0]["cached"] is True and replayed[0]["chunk"] == "Refunds take 5 days [1]."
+    assert replayed[1:3] == [e for e in live if e["type"] in ("references", "source_material")]
+
+    buffered = await orchestrator.answer("tenant-a", "refunds?", "c1", db=None)
+    assert buffered == {**live_cache.stored[0], "cached": True}
+    # Both turns of every exchange are in the conversation, cached or not
+    assert [m.role for m in await orchestrator.state.recent_messages(None, "c1")] == ["user", "assistant"] * 3
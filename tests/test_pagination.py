@@ -0,0 +1,116 @@
+from datetime import datetime, timedelta
+import json
+import httpx
+import pytest
+import pytest_asyncio
+from fastapi import FastAPI
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from src.api.v1.endpoints import conversations
+from src.core.database import get_db
+from src.core.pagination import InvalidCursorError, decode_cursor, encode_cursor
+from src.models.chat import Conversation, Message
+from src.services.conversation_state import ConversationState
+
+BASE = datetime(2026, 1, 1)
+
+@pytest_asyncio.fixture
+async def client(monkeypatch):
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Conversation.__table__.create)
+        await conn.run_sync(Message.__table__.create)
+    factory = async_sessionmaker(engine, expire_on_commit=False)
+    async with factory() as session:
+        for i in range(7):
+            # Pairs share a timestamp, so the id has to break ties
+            session.add(Conversation(id=f"c{i}", tenant_id="tenant-a", title=f"t{i}", updated_at=BASE + timedelta(seconds=i // 2)))
+        session.add(Conversation(id="other", tenant_id="tenant-b", updated_at=BASE))
+        for i in range(9):
+            session.add(Message(id=f"m{i}", conversation_id="c0", role="user", content=f"msg {i}", created_at=BASE + timedelta(seconds=i // 3)))
+        await session.commit()
+
+    async def override_db():
+        async with factory() as session:
+            yield session
+
+    app = FastAPI()
+    app.include_router(conversations.router, prefix="/conversations")
+    app.dependency_overrides[get_db] = override_db
+    monkeypatch.setattr(conversations, "AsyncSessionLocal", factory)
+    state = ConversationState(session_factory=factory, local=True, flush_interval_ms=60_000)
+    monkeypatch.setattr(conversations, "conversation_state", state)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as http:
+        yield http
+    await state.close()
+    await engine.dispose()
+
+async def collect(client, url, limit, **params):
+    ids, cursor = [], None
+    while True:
+        query = {"limit": limit, **params, **({"cursor": cursor} if cursor else {})}
+        page = (await client.get(url, params=query, headers={"X-Tenant-ID": "tenant-a"})).json()
+        assert len(page["items"]) <= limit
+        ids += [item["id"] for item in page["items"]]
+        cursor = page["next_cursor"]
+        if not cursor:
+            return ids
+
+def test_cursor_round_trip():
+    cursor = encode_cursor(BASE, "c1")
+    assert decode_cursor(cursor) == (BASE, "c1")
+    with pytest.raises(InvalidCursorError):
+        decode_cursor("not-a-cursor")
+
+@pytest.mark.asyncio
+async def test_conversation_pages_have_no_gaps_or_overlaps(client):
+    ids = await collect(client, "/conversations/", limit=2)
+    # Newest first, ties by id descending; other tenants excluded
+    assert ids == ["c6", "c5", "c4", "c3", "c2", "c1", "c0"]
+
+@pytest.mark.asyncio
+async def test_history_pages_both_directions(client):
+    forward = await collect(client, "/conversations/c0/history", limit=4)
+    assert forward == [f"m{i}" for i in range(9)]
+    assert await collect(client, "/conversations/c0/history", limit=4, order="desc") == forward[::-1]
+
+@pytest.mark.asyncio
+async def test_ndjson_streams_from_cursor(client):
+    page = (await client.get("/conversations/c0/history", params={"limit": 3}, headers={"X-Tenant-ID": "tenant-a"})).json()
+    response = await client.get(
+        "/conversations/c0/history", params={"format": "ndjson", "cursor": page["next_cursor"]},
+        headers={"X-Tenant-ID": "tenant-a"}
+    )
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert [json.loads(line)["id"] for line in response.text.splitlines()] == [f"m{i}" for i in range(3, 9)]
+
+@pytest.mark.asyncio
+async def test_invalid_cursor_and_foreign_conversation(client):
+    response = await client.get("/conversations/", params={"cursor": "garbage"}, headers={"X-Tenant-ID": "tenant-a"})
+    assert response.status_code == 400
+    response = await client.get("/conversations/c0/history", headers={"X-Tenant-ID": "tenant-b"})
+    assert response.status_code == 404
+
+@pytest.mark.asyncio
+async def test_conversation_not_written_behind_yet_is_listed_and_readable(client):
+    state = conversations.conversation_state
+    async with state.session_factory() as db:
+        await state.ensure(db, "hot", "tenant-a")
+    await state.flush()
+    # The conversation reached the database; its latest turns haven't
+    first = await state.append_message("hot", "user", "question")
+    second = await state.append_message("hot", "assistant", "answer")
+    headers = {"X-Tenant-ID": "tenant-a"}
+
+    history = (await client.get("/conversations/hot/history", headers=headers)).json()
+    assert [m["id"] for m in history["items"]] == [first["id"], second["id"]]
+    streamed = await client.get("/conversations/hot/history", params={"format": "ndjson", "order": "desc"}, headers=headers)
+    assert [json.loads(line)["id"] for line in streamed.text.splitlines()] == [second["id"], first["id"]]
+    assert (await client.get("/conversations/hot/history", headers={"X-Tenant-ID": "tenant-b"})).status_code == 404
+
+    # A conversation that so far exists only in the hot tier
+    async with state.session_factory() as db:
+        await state.ensure(db, "new", "tenant-a")
+    await state.append_message("new", "user", "hi")
+    assert (await client.get("/conversations/new/history", headers=headers)).json()["items"][0]["content"] == "hi"
+    listing = (await client.get("/conversations/", params={"limit": 2}, headers=headers)).json()
+    assert [c["id"] for c in listing["items"]] == ["new", "hot"]
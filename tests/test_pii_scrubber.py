@@ -0,0 +1,47 @@
+import multiprocessing
+from src.services.pii_scrubber import PIIScrubber, split_segments, has_pii_candidates, process_pool_can_start
+
+def test_split_segments_is_lossless_and_sentence_aligned():
+    text = "First sentence here. Second one follows! Third?\n" * 200
+    segments = split_segments(text, 500)
+    assert "".join(segments) == text
+    assert all(len(s) <= 500 for s in segments)
+    assert all(s[-1] in " \n" for s in segments[:-1])
+
+def test_prefilter_candidates():
+    assert has_pii_candidates("mail ops@example.com now")
+    assert has_pii_candidates("call 415 555 0134 today")
+    assert has_pii_candidates("the ticket was raised by Alice yesterday")
+    # A name that opens a sentence is the segment's only entity
+    assert has_pii_candidates("the refund was requested two days ago. Smith approved the refund.")
+    assert has_pii_candidates("Signed,\nJohn")
+    assert not has_pii_candidates("request completed in 42 ms. cache warmup finished.")
+
+def test_clean_text_skips_the_nlp_engine():
+    scrubber = PIIScrubber(processes=1)
+    text = "request completed in 42 ms.\nretry budget exhausted.\n" * 100
+    assert scrubber.scrub_text(text) == text
+    assert not scrubber.engine_loaded
+
+def test_capitalized_prose_without_names_skips_the_nlp_engine():
+    scrubber = PIIScrubber(processes=1, segment_size=500)
+    # Sentence openers are either common words or appear in lowercase elsewhere in the segment
+    text = (
+        "The refund policy changed last year. Refunds now take five days. It applies to every order, "
+        "and refunds over the limit need approval. Approval is given within a day.\n"
+    ) * 50
+    assert not any(has_pii_candidates(s) for s in split_segments(text, 500))
+    assert scrubber.scrub_text(text) == text
+    assert not scrubber.engine_loaded
+
+def _report_pool_check(results):
+    results.put(process_pool_can_start())
+
+def test_daemonic_processes_do_not_start_a_pool():
+    assert process_pool_can_start()
+    context = multiprocessing.get_context("fork")
+    results = context.Queue()
+    child = context.Process(target=_report_pool_check, args=(results,), daemon=True)
+    child.start()
+    assert results.get(timeout=10) is False
+    child.join()
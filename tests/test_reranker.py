@@ -0,0 +1,37 @@
+import pytest
+from src.services.reranker import LocalReranker
+
+DOCS = [
+    {"point_id": "1", "text": "general notes about billing cycles", "vector": [1.0, 0.0, 0.0]},
+    {"point_id": "2", "text": "error ERR-4012 means the card was declined", "vector": [0.0, 1.0, 0.0]},
+    {"point_id": "3", "text": "shipping policy and returns", "vector": [0.7, 0.7, 0.0]},
+]
+
+@pytest.mark.asyncio
+async def test_lexical_match_wins_without_vectors():
+    reranker = LocalReranker(lexical_weight=1.0, embedding_weight=0.0)
+    ranked = await reranker.rerank("what does ERR-4012 mean", DOCS, top_k=2)
+    assert ranked[0]["point_id"] == "2"
+    assert len(ranked) == 2
+
+@pytest.mark.asyncio
+async def test_embedding_similarity_blend():
+    reranker = LocalReranker(lexical_weight=0.0, embedding_weight=1.0)
+    ranked = await reranker.rerank("anything", DOCS, top_k=3, query_vector=[1.0, 0.1, 0.0])
+    assert [d["point_id"] for d in ranked] == ["1", "3", "2"]
+
+@pytest.mark.asyncio
+async def test_scores_are_cached_per_query_and_chunk():
+    reranker = LocalReranker(lexical_weight=1.0, embedding_weight=1.0, cache_size=10)
+    first = reranker.score("card declined", DOCS, [0.0, 1.0, 0.0])
+    assert len(reranker._cache) == 3
+    second = reranker.score("card declined", DOCS, [0.0, 1.0, 0.0])
+    assert (first == second).all()
+    assert len(reranker._cache) == 3
+
+@pytest.mark.asyncio
+async def test_ties_keep_first_stage_order():
+    reranker = LocalReranker(lexical_weight=1.0, embedding_weight=0.0)
+    docs = [{"text": "alpha"}, {"text": "beta"}, {"text": "gamma"}]
+    ranked = await reranker.rerank("zzz", docs, top_k=3)
+    assert [d["text"] for d in ranked] == ["alpha", "beta", "gamma"]
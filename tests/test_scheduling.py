@@ -0,0 +1,85 @@
+import pytest
+from src.models.ingestion import MediaType
+from src.services.ingestion.scheduling import IngestionScheduler, queue_for
+
+def jobs(scheduler, tenant_id, media_type, n):
+    return [scheduler.message(f"{tenant_id}-{media_type.value}-{i}", tenant_id, media_type, f"/tmp/{i}") for i in range(n)]
+
+def sent_ids(scheduler):
+    return [m["args"][0] for m in scheduler.sent]
+
+def test_media_types_have_their_own_queues():
+    assert queue_for(MediaType.TEXT) == "ingestion.text"
+    assert queue_for("video") == "ingestion.video"
+
+def test_large_text_files_go_to_the_large_text_queue(monkeypatch):
+    from src.services.ingestion import scheduling
+    monkeypatch.setattr(scheduling.settings, "INGEST_LARGE_TEXT_MIN_BYTES", 1000)
+    assert queue_for(MediaType.TEXT, 999) == "ingestion.text"
+    assert queue_for(MediaType.TEXT, 1000) == "ingestion.text_large"
+    # Unknown sizes and other media types stay on their own queues
+    assert queue_for(MediaType.TEXT) == "ingestion.text"
+    assert queue_for(MediaType.AUDIO, 10**9) == "ingestion.audio"
+    scheduler = IngestionScheduler(local=True)
+    assert scheduler.message("j", "t", MediaType.TEXT, "/tmp/x", size=5000)["queue"] == "ingestion.text_large"
+
+@pytest.mark.asyncio
+async def test_tenant_backlog_does_not_starve_others():
+    scheduler = IngestionScheduler(max_inflight=2, local=True)
+
+    # A bulk upload only puts `max_inflight` jobs in front of everyone else
+    assert await scheduler.submit("big", jobs(scheduler, "big", MediaType.TEXT, 50)) == 2
+    assert await scheduler.submit("small", jobs(scheduler, "small", MediaType.TEXT, 1)) == 1
+    assert sent_ids(scheduler) == ["big-text-0", "big-text-1", "small-text-0"]
+
+    # Queues are independent: a video backlog takes no text slots
+    assert await scheduler.submit("big", jobs(scheduler, "big", MediaType.VIDEO, 5)) == 2
+
+    # A finished job hands its slot to the tenant's next job, in order
+    handed = await scheduler.release("ingestion.text", "big")
+    assert handed["args"][0] == "big-text-2" and sent_ids(scheduler)[-1] == "big-text-2"
+    # With nothing backlogged, the slot is freed
+    assert await scheduler.release("ingestion.text", "small") is None
+    assert await scheduler.submit("small", jobs(scheduler, "small", MediaType.TEXT, 2)) == 2
+
+    stats = await scheduler.stats()
+    assert stats["ingestion.text"]["tenants"]["big"] == {"inflight": 2, "backlog": 47}
+    assert stats["ingestion.text"]["tenants"]["small"] == {"inflight": 2, "backlog": 0}
+    assert stats["ingestion.video"]["backlog"] == 3
+    assert stats["ingestion.audio"]["tenants"] == {}
+
+@pytest.mark.asyncio
+async def test_wait_times_are_recorded_per_queue():
+    scheduler = IngestionScheduler(local=True)
+    await scheduler.submit("t", jobs(scheduler, "t", MediaType.TEXT, 1))
+    schedule = scheduler.sent[0]["kwargs"]["schedule"]
+    for delay in (1.0, 2.0, 3.0):
+        await scheduler.record_wait(schedule, started_at=schedule["dispatched_at"] + delay)
+
+    waits = (await scheduler.stats())["ingestion.text"]["wait_s"]
+    assert waits["broker"]["samples"] == 3
+    assert waits["broker"]["p50"] == 2.0 and waits["broker"]["p99"] == 3.0
+    assert waits["total"]["p50"] >= 2.0
+    assert (await scheduler.stats())["ingestion.video"]["wait_s"]["total"]["p50"] is None
+
+@pytest.mark.asyncio
+async def test_jobs_the_broker_rejects_go_back_to_the_head_of_the_backlog():
+    scheduler = IngestionScheduler(max_inflight=2, local=True)
+    dispatch = scheduler.dispatch
+    broker_down = True
+
+    def flaky_dispatch(message):
+        if broker_down and message["args"][0] == "t-text-1":
+            raise ConnectionError("broker unavailable")
+        dispatch(message)
+
+    scheduler.dispatch = flaky_dispatch
+    assert await scheduler.submit("t", jobs(scheduler, "t", MediaType.TEXT, 4)) == 1
+    assert sent_ids(scheduler) == ["t-text-0"]
+    # The failed job keeps its place and its slot is free again
+    assert (await scheduler.stats())["ingestion.text"]["tenants"]["t"] == {"inflight": 1, "backlog": 3}
+
+    broker_down = False
+    assert (await scheduler.release("ingestion.text", "t"))["args"][0] == "t-text-1"
+    assert await scheduler.submit("t", [scheduler.message("t-text-4", "t", MediaType.TEXT, "/tmp/4")]) == 1
+    assert sent_ids(scheduler) == ["t-text-0", "t-text-1", "t-text-2"]
@@ -0,0 +1,113 @@
+import hashlib
+import io
+import os
+import threading
+import time
+import pytest
+from starlette.datastructures import UploadFile
+from src.services.storage import LocalStorage, S3Storage, UploadTooLargeError
+
+def make_upload(data: bytes, filename: str = "doc.bin") -> UploadFile:
+    return UploadFile(file=io.BytesIO(data), filename=filename)
+
+class InMemoryS3:
+    """S3 stand-in implementing the calls the storage backend makes, with a per-part delay."""
+
+    def __init__(self, part_delay: float = 0.0):
+        self.part_delay = part_delay
+        self.objects = {}
+        self.uploads = {}
+        self.aborted = []
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def put_object(self, Bucket, Key, Body, ContentType):
+        self.objects[Key] = Body
+
+    def create_multipart_upload(self, Bucket, Key, ContentType):
+        upload_id = f"upload-{len(self.uploads)}"
+        self.uploads[upload_id] = {}
+        return {"UploadId": upload_id}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        with self._lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(self.part_delay)
+        self.uploads[UploadId][PartNumber] = Body
+        with self._lock:
+            self.active -= 1
+        return {"ETag": f"etag-{PartNumber}"}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        parts = self.uploads.pop(UploadId)
+        assert [p["PartNumber"] for p in MultipartUpload["Parts"]] == sorted(parts)
+        self.objects[Key] = b"".join(parts[n] for n in sorted(parts))
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self.uploads.pop(UploadId, None)
+        self.aborted.append(UploadId)
+
+@pytest.mark.asyncio
+async def test_local_upload_streams_hashes_and_counts(tmp_path):
+    data = os.urandom(10_000)
+    storage = LocalStorage(base_dir=str(tmp_path), part_size=1024)
+    stored = await storage.upload(make_upload(data, "../../escape.bin"), "tenant-a")
+
+    assert stored.path == os.path.join(str(tmp_path), "tenant-a", "escape.bin")
+    assert stored.size == len(data)
+    assert stored.sha256 == hashlib.sha256(data).hexdigest()
+    with open(stored.path, "rb") as f:
+        assert f.read() == data
+
+@pytest.mark.asyncio
+async def test_local_upload_over_limit_leaves_nothing_behind(tmp_path):
+    storage = LocalStorage(base_dir=str(tmp_path), part_size=1024, max_bytes=4096)
+    with pytest.raises(UploadTooLargeError):
+        await storage.upload(make_upload(b"x" * 5000), "tenant-a")
+    assert os.listdir(tmp_path / "tenant-a") == []
+
+@pytest.mark.asyncio
+async def test_s3_small_file_uses_single_put():
+    s3 = InMemoryS3()
+    storage = S3Storage(s3_client=s3, part_size=1024)
+    stored = await storage.upload(make_upload(b"hello"), "tenant-a")
+    assert s3.objects["tenant-a/doc.bin"] == b"hello"
+    assert stored.size == 5 and stored.sha256 == hashlib.sha256(b"hello").hexdigest()
+
+@pytest.mark.asyncio
+async def test_s3_multipart_uploads_parts_in_parallel():
+    data = os.urandom(8 * 1024 + 100)
+    s3 = InMemoryS3(part_delay=0.05)
+    storage = S3Storage(s3_client=s3, part_size=1024, concurrency=4)
+    stored = await storage.upload(make_upload(data), "tenant-a")
+
+    assert s3.objects["tenant-a/doc.bin"] == data
+    assert stored.sha256 == hashlib.sha256(data).hexdigest()
+    assert 1 < s3.max_active <= 4
+
+@pytest.mark.asyncio
+async def test_s3_multipart_aborts_when_over_limit():
+    s3 = InMemoryS3()
+    storage = S3Storage(s3_client=s3, part_size=1024, max_bytes=3000)
+    with pytest.raises(UploadTooLargeError):
+        await storage.upload(make_upload(b"x" * 5000), "tenant-a")
+    assert s3.aborted and not s3.uploads and "tenant-a/doc.bin" not in s3.objects
+
+@pytest.mark.asyncio
+async def test_upload_limit_is_checked_before_the_body_is_spooled(monkeypatch):
+    import httpx
+    from src.main import app, settings as app_settings
+    monkeypatch.setattr(app_settings, "UPLOAD_MAX_BYTES", 1024)
+    headers = {"content-type": "multipart/form-data; boundary=x"}
+
+    async def chunked_body():
+        yield b"--x\r\n" + b"a" * 4096
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        # No Content-Length: the size can't be checked up front, so the upload is refused
+        response = await client.post("/api/v1/ingest", content=chunked_body(), headers=headers)
+        assert response.status_code == 411
+        response = await client.post("/api/v1/ingest", content=b"a" * (1024 + 128 * 1024), headers=headers)
+        assert response.status_code == 413
@@ -0,0 +1,71 @@
+import pytest
+from qdrant_client.http import models
+from src.services.storage_profiles import STORAGE_PROFILES, get_storage_profile
+from src.services.vector_store import VectorStore
+
+def test_default_profile_keeps_plain_float_vectors():
+    profile = get_storage_profile("default")
+    params = profile.vector_params(1536)
+    assert params.quantization_config is None and params.hnsw_config is None and not params.on_disk
+    assert profile.search_params() is None
+
+def test_quantized_profiles_rescore_with_oversampling():
+    int8 = get_storage_profile("scalar_int8")
+    assert isinstance(int8.quantization_config(), models.ScalarQuantization)
+    assert int8.vector_params(1536).on_disk
+    search = int8.search_params()
+    assert search.quantization.rescore and search.quantization.oversampling == 2.0
+
+    binary = get_storage_profile("binary")
+    assert isinstance(binary.quantization_config(), models.BinaryQuantization)
+    assert binary.search_params().quantization.oversampling > search.quantization.oversampling
+
+def test_memory_reduction_of_quantized_profiles():
+    full = get_storage_profile("default").ram_bytes_per_vector(1536)
+    assert full / get_storage_profile("scalar_int8").ram_bytes_per_vector(1536) >= 4
+    assert full / get_storage_profile("binary").ram_bytes_per_vector(1536) >= 32
+
+def test_memory_estimate_counts_the_prefix_vector():
+    # The prefix is quantized like the full vector, so the per-point saving holds with two-stage search
+    full = get_storage_profile("default").ram_bytes_per_point(1536, 256)
+    assert full == (1536 + 256) * 4
+    assert full / get_storage_profile("scalar_int8").ram_bytes_per_point(1536, 256) >= 4
+
+def test_tuned_hnsw_profile():
+    profile = get_storage_profile("high_recall")
+    assert profile.hnsw_config() == models.HnswConfigDiff(m=32, ef_construct=256)
+    assert profile.search_params().hnsw_ef == 128
+
+def test_unknown_profile_is_rejected():
+    with pytest.raises(ValueError):
+        get_storage_profile("nope")
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("profile", sorted(STORAGE_PROFILES))
+async def test_every_profile_creates_and_searches(profile):
+    store = VectorStore(location=":memory:", storage_profile=profile)
+    await store.upsert("t", [1.0] + [0.0] * 1535, {"text": "x"})
+    hits = await store.search("t", [1.0] + [0.0] * 1535, limit=1)
+    assert hits[0]["payload"]["text"] == "x"
+    await store.close()
+
+@pytest.mark.asyncio
+async def test_two_stage_search_applies_the_profile_quantization_to_both_stages():
+    store = VectorStore(location=":memory:", storage_profile="scalar_int8", two_stage=True)
+    await store.upsert("t", [1.0] + [0.0] * 1535, {"text": "x"})
+    params = (await store.client.get_collection(store.collection_name)).config.params
+    assert params.vectors["prefix"].quantization_config == get_storage_profile("scalar_int8").quantization_config()
+
+    calls = []
+    search = store.client.search
+    async def spy(**kwargs):
+        calls.append(kwargs["search_params"])
+        return await search(**kwargs)
+    store.client.search = spy
+    hits = await store.search("t", [1.0] + [0.0] * 1535, limit=1)
+    assert hits[0]["payload"]["text"] == "x"
+    # Prefetch on the prefix, then the exact rescore on the full vector
+    assert len(calls) == 2
+    assert all(p.quantization.rescore and p.quantization.oversampling == 2.0 for p in calls)
+    assert calls[1].exact
+    await store.close()
@@ -0,0 +1,102 @@
+import pytest
+from src.core.config import settings
+from src.services.tenant_router import dedicated_collection_name
+from src.services.vector_store import VectorStore
+
+def _vec(i: int):
+    v = [0.0] * 1536
+    v[i % 1536] = 1.0
+    return v
+
+async def _collection_size(store: VectorStore, name: str) -> int:
+    return (await store.client.count(collection_name=name, exact=True)).count
+
+def test_dedicated_collection_names_are_safe_and_distinct():
+    a = dedicated_collection_name("rag_vectors", "acme/eu")
+    b = dedicated_collection_name("rag_vectors", "acme_eu")
+    assert a.startswith("rag_vectors__t_acme_eu_")
+    assert a != b
+
+@pytest.mark.asyncio
+async def test_move_tenant_to_dedicated_collection_and_back():
+    store = VectorStore(location=":memory:")
+    await store.upsert_batch("big", [_vec(i) for i in range(25)], [{"text": f"big {i}"} for i in range(25)])
+    await store.upsert_batch("small", [_vec(0)], [{"text": "small"}])
+    dedicated = dedicated_collection_name("rag_vectors", "big")
+
+    assert await store.move_tenant("big", dedicated=True, batch_size=10) == 25
+    assert (await store.router.get("big")) == {"collection": dedicated, "also_write": []}
+    assert await _collection_size(store, "rag_vectors") == 1
+    assert await _collection_size(store, dedicated) == 25
+
+    # Searches and writes follow the route; other tenants are unaffected
+    hits = await store.search("big", _vec(3), limit=1)
+    assert hits[0]["payload"]["text"] == "big 3"
+    await store.upsert("big", _vec(30), {"text": "big 30"})
+    assert await _collection_size(store, dedicated) == 26
+    assert [h["payload"]["text"] for h in await store.search("small", _vec(0), limit=5)] == ["small"]
+
+    assert await store.move_tenant("big", dedicated=True) == 0
+    assert await store.move_tenant("big", dedicated=False) == 26
+    assert await _collection_size(store, "rag_vectors") == 27
+    assert await _collection_size(store, dedicated) == 0
+    await store.close()
+
+@pytest.mark.asyncio
+async def test_writes_during_a_move_go_to_both_collections():
+    store = VectorStore(location=":memory:")
+    dedicated = dedicated_collection_name("rag_vectors", "big")
+    await store._ensure_collection(dedicated)
+    await store.router.set("big", "rag_vectors", also_write=[dedicated])
+
+    await store.upsert("big", _vec(1), {"text": "mid-move"}, point_id="00000000-0000-0000-0000-000000000001")
+    assert await _collection_size(store, "rag_vectors") == 1
+    assert await _collection_size(store, dedicated) == 1
+
+    await store.delete("big", ["00000000-0000-0000-0000-000000000001"])
+    assert await _collection_size(store, "rag_vectors") == 0
+    assert await _collection_size(store, dedicated) == 0
+    await store.close()
+
+@pytest.mark.asyncio
+async def test_size_policy(monkeypatch):
+    store = VectorStore(location=":memory:")
+    monkeypatch.setattr(settings, "TENANT_DEDICATED_MIN_POINTS", 3)
+    await store.upsert_batch("t", [_vec(i) for i in range(2)], [{} for _ in range(2)])
+    assert not await store.wants_dedicated("t")
+    await store.upsert("t", _vec(5), {})
+    assert await store.wants_dedicated("t")
+
+    await store.move_tenant("t", dedicated=True)
+    assert not await store.wants_dedicated("t")
+    await store.close()
+
+@pytest.mark.asyncio
+async def test_writes_and_deletes_racing_the_copy_survive_the_move():
+    store = VectorStore(location=":memory:")
+    ids = [f"00000000-0000-0000-0000-0000000000{i:02d}" for i in range(6)]
+    await store.upsert_batch("big", [_vec(i) for i in range(6)], [{"text": f"old {i}"} for i in range(6)], point_ids=ids)
+    dedicated = dedicated_collection_name("rag_vectors", "big")
+
+    scroll = store.client.scroll
+    raced = []
+
+    async def scroll_then_write(**kwargs):
+        # The batch is read, then other workers write and delete before it lands in the target
+        page = await scroll(**kwargs)
+        if not raced:
+            raced.append(True)
+            await store.upsert("big", _vec(0), {"text": "new 0"}, point_id=ids[0])
+            await store.delete("big", [ids[1]])
+            await store.set_payloads("big", {ids[2]: {"text": "new 2"}})
+        return page
+
+    store.client.scroll = scroll_then_write
+    await store.move_tenant("big", dedicated=True, batch_size=10)
+    store.client.scroll = scroll
+
+    records = await store.client.retrieve(collection_name=dedicated, ids=ids, with_payload=True)
+    texts = {str(r.id): r.payload["text"] for r in records}
+    assert texts == {ids[0]: "new 0", ids[2]: "new 2", ids[3]: "old 3", ids[4]: "old 4", ids[5]: "old 5"}
+    assert await _collection_size(store, "rag_vectors") == 0
+    await store.close()
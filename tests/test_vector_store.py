@@ -0,0 +1,78 @@
+import asyncio
+import json
+import time
+import pytest
+from src.services.tenant_router import TenantRouter
+from src.services.vector_store import VectorStore
+
+@pytest.mark.asyncio
+async def test_local_upsert_and_search_is_tenant_scoped():
+    store = VectorStore(location=":memory:")
+    await store.upsert_batch("tenant-a", [[1.0] + [0.0] * 1535], [{"text": "a"}])
+    await store.upsert("tenant-b", [1.0] + [0.0] * 1535, {"text": "b"})
+
+    results = await asyncio.gather(*[
+        store.search("tenant-a", [1.0] + [0.0] * 1535, limit=5) for _ in range(8)
+    ])
+    assert all([hit["payload"]["text"] for hit in hits] == ["a"] for hits in results)
+    await store.close()
+
+async def _slow_qdrant(reader, writer, delay, collection_info):
+    """Minimal HTTP/1.1 stand-in for Qdrant that answers every request after `delay` seconds."""
+    try:
+        while True:
+            head = await reader.readuntil(b"\r\n\r\n")
+            request_line, *headers = head.decode().split("\r\n")
+            length = 0
+            for header in headers:
+                if header.lower().startswith("content-length:"):
+                    length = int(header.split(":", 1)[1])
+            if length:
+                await reader.readexactly(length)
+            if request_line.startswith("GET /collections "):
+                result = {"collections": [{"name": "rag_vectors"}]}
+            elif request_line.startswith("GET /collections/rag_vectors "):
+                result = collection_info
+            elif request_line.startswith("PUT /collections/rag_vectors/index"):
+                result = {"operation_id": 0, "status": "completed"}
+            else:
+                await asyncio.sleep(delay)
+                result = []
+            body = json.dumps({"result": result, "status": "ok", "time": 0.0}).encode()
+            writer.write(
+                b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                + f"Content-Length: {len(body)}\r\n\r\n".encode() + body
+            )
+            await writer.drain()
+    except (asyncio.IncompleteReadError, ConnectionResetError):
+        pass
+    finally:
+        writer.close()
+
+@pytest.mark.asyncio
+async def test_concurrent_searches_overlap():
+    delay = 0.2
+    # Describe the collection the way a real server would (named vectors, no sparse vectors)
+    local = VectorStore(location=":memory:", hybrid=False)
+    await local._ensure_collection()
+    collection_info = (await local.client.get_collection("rag_vectors")).model_dump(mode="json", exclude_none=True)
+    await local.close()
+
+    server = await asyncio.start_server(lambda r, w: _slow_qdrant(r, w, delay, collection_info), "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    store = VectorStore(
+        url=f"http://127.0.0.1:{port}",
+        prefer_grpc=False,
+        hybrid=False,
+        router=TenantRouter("rag_vectors", local=True)
+    )
+    try:
+        started = time.perf_counter()
+        await asyncio.gather(*[store.search("tenant-a", [0.1] * 1536) for _ in range(5)])
+        elapsed = time.perf_counter() - started
+        # Serial round trips would take >= 5 * delay
+        assert elapsed < 3 * delay
+    finally:
+        await store.close()
+        server.close()
+        await server.wait_closed()
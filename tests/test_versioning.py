@@ -0,0 +1,105 @@
+import pytest
+import pytest_asyncio
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from src.models.ingestion import IngestionJob, JobStatus, MediaType, Tenant
+from src.services.ingestion.dedup import NearDuplicateIndex
+from src.services.ingestion.indexer import ChunkIndexer
+from src.services.ingestion.versioning import DocumentVersioning, document_id_for
+from src.services.providers import MockEmbedder
+from src.services.vector_store import VectorStore
+
+class CountingEmbedder(MockEmbedder):
+    def __init__(self):
+        self.embedded = []
+
+    async def embed_batch(self, texts):
+        self.embedded.extend(texts)
+        return await super().embed_batch(texts)
+
+@pytest_asyncio.fixture
+async def session_factory():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:")
+    async with engine.begin() as conn:
+        await conn.run_sync(Tenant.__table__.create)
+        await conn.run_sync(IngestionJob.__table__.create)
+    factory = async_sessionmaker(engine, expire_on_commit=False)
+    async with factory() as session:
+        session.add(Tenant(id="tenant-a", name="A"))
+        await session.commit()
+    yield factory
+    await engine.dispose()
+
+async def run_job(versioning, session_factory, job_id, chunks, filename="manual.txt"):
+    async with session_factory() as session:
+        session.add(IngestionJob(
+            id=job_id, tenant_id="tenant-a", media_type=MediaType.TEXT,
+            file_path=f"storage/tenant-a/{filename}", filename=filename
+        ))
+        await session.commit()
+    result = await versioning.index(job_id, "tenant-a", chunks, metadata={"job_id": job_id})
+    async with session_factory() as session:
+        await session.execute(
+            update(IngestionJob).where(IngestionJob.id == job_id)
+            .values(status=JobStatus.COMPLETED, metadata_json={"status": "success", **result})
+        )
+        await session.commit()
+    return result
+
+@pytest.mark.asyncio
+async def test_reupload_only_embeds_changed_chunks(session_factory):
+    embedder = CountingEmbedder()
+    store = VectorStore(location=":memory:", hybrid=False)
+    indexer = ChunkIndexer(embedder=embedder, store=store, batch_size=2, hybrid=False, dedup=False)
+    versioning = DocumentVersioning(indexer=indexer, store=store, session_factory=session_factory)
+
+    v1 = await run_job(versioning, session_factory, "job-1", ["intro", "setup", "usage", "faq"])
+    assert v1["document"]["version"] == 1 and v1["document"]["previous"] is None
+    assert v1["document"]["added"] == 4
+
+    embedder.embedded.clear()
+    v2 = await run_job(versioning, session_factory, "job-2", ["intro", "setup (revised)", "usage", "appendix"])
+    assert sorted(embedder.embedded) == ["appendix", "setup (revised)"]
+    document = v2["document"]
+    assert document["version"] == 2
+    assert document["previous"] == {"job_id": "job-1", "version": 1, "chunks": 4}
+    assert (document["added"], document["unchanged"], document["removed"]) == (2, 2, 2)
+
+    document_id = document_id_for("tenant-a", "manual.txt")
+    assert len(await store.document_point_ids("tenant-a", document_id)) == 4
+    records, _ = await store.client.scroll("rag_vectors", with_payload=True)
+    texts = {r.payload["text"]: r.payload["metadata"] for r in records}
+    assert set(texts) == {"intro", "setup (revised)", "usage", "appendix"}
+    # Unchanged chunks were re-pointed at the new job and position
+    assert texts["usage"] == {"job_id": "job-2", "chunk_index": 2}
+    await store.close()
+
+@pytest.mark.asyncio
+async def test_new_version_keeps_chunks_shared_with_another_document(session_factory):
+    store = VectorStore(location=":memory:", hybrid=False)
+    indexer = ChunkIndexer(
+        embedder=CountingEmbedder(), store=store, hybrid=False, dedup=True, dedup_index=NearDuplicateIndex(local=True)
+    )
+    versioning = DocumentVersioning(indexer=indexer, store=store, session_factory=session_factory)
+    shared = "Refunds are issued within five business days of approval."
+
+    await run_job(versioning, session_factory, "job-a1", ["a intro", shared], filename="a.txt")
+    b = await run_job(versioning, session_factory, "job-b1", ["b intro", shared], filename="b.txt")
+    # B's copy was deduplicated onto A's point
+    assert b["indexing"]["exact_duplicates"] == 1
+
+    # A's next version drops the shared chunk: B still references it, so it stays
+    a2 = await run_job(versioning, session_factory, "job-a2", ["a intro"], filename="a.txt")
+    assert (a2["document"]["removed"], a2["document"]["deleted"]) == (1, 0)
+    records, _ = await store.client.scroll("rag_vectors", with_payload=True)
+    texts = {r.payload["text"]: r.payload for r in records}
+    assert set(texts) == {"a intro", "b intro", shared}
+    assert texts[shared]["document_ids"] == [document_id_for("tenant-a", "b.txt")]
+    assert len(await store.document_point_ids("tenant-a", document_id_for("tenant-a", "a.txt"))) == 1
+
+    # Once B drops it too, nothing references it and it is deleted
+    b2 = await run_job(versioning, session_factory, "job-b2", ["b intro"], filename="b.txt")
+    assert b2["document"]["deleted"] == 1
+    records, _ = await store.client.scroll("rag_vectors", with_payload=True)
+    assert {r.payload["text"] for r in records} == {"a intro", "b intro"}
+    await store.close()
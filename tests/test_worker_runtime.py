@@ -0,0 +1,34 @@
+import asyncio
+from sqlalchemy import text
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from src.core import database
+from src.worker.runtime import WorkerRuntime
+
+def test_runtime_reuses_one_loop_and_engine(tmp_path):
+    original = database.engine
+    runtime = WorkerRuntime(pool_size=2, max_overflow=0)
+    runtime.start(f"sqlite+aiosqlite:///{tmp_path / 'worker.db'}", poolclass=AsyncAdaptedQueuePool)
+    closed = []
+
+    async def close():
+        closed.append(asyncio.get_running_loop())
+
+    runtime.on_shutdown(close)
+
+    async def query():
+        async with database.AsyncSessionLocal() as session:
+            await session.execute(text("SELECT 1"))
+        return asyncio.get_running_loop(), database.engine
+
+    try:
+        results = [runtime.run(query()) for _ in range(5)]
+        loop = runtime.loop
+        assert {id(r[0]) for r in results} == {id(loop)}
+        assert {id(r[1]) for r in results} == {id(runtime.engine)}
+        assert runtime.engine.pool.size() == 2
+    finally:
+        runtime.shutdown()
+        database.engine = original
+        database.AsyncSessionLocal.configure(bind=original)
+    assert closed == [loop] and loop.is_closed()
+    assert not runtime.started